@@ -1,11 +1,23 @@
 import json
+import logging
+import time
 
 import streamlit as st
 import streamlit_authenticator as stauth
 import yaml
 from yaml.loader import SafeLoader
 
-from graig_nlp.summary_generation.extract_data import extract_data
+from graig_nlp.summary_generation.derived_features import (
+    delete_activity_features,
+    get_activity_features,
+    get_feature_store,
+)
+from graig_nlp.summary_generation.extract_cache import (
+    ExtractCache,
+    MemoryCacheBackend,
+    SQLiteCacheBackend,
+    register_invalidation_hook,
+)
 from graig_nlp.summary_generation.format_table_data import (
     display_table_details,
     format_interval_data,
@@ -15,10 +27,21 @@ from graig_nlp.summary_generation.format_table_data import (
 from graig_nlp.summary_generation.intervals.process_details_intervals import (
     process_intervals,
 )
-from graig_nlp.summary_generation.model.summary_generator_model import generate_summary
+from graig_nlp.summary_generation.model.batch_summaries import (
+    get_summary_store,
+    load_summary,
+    summary_key,
+)
+from graig_nlp.summary_generation.model.compaction import summary_input
+from graig_nlp.summary_generation.model.summary_generator_model import stream_summary
+from graig_nlp.summary_generation.page_tasks import TaskGraph, follow_tasks
 from graig_nlp.summary_generation.personal_achievements.personal_achievements import (
     process_personal_best,
 )
+from graig_nlp.summary_generation.scheduler import use_shared_slots
+
+
+logger = logging.getLogger(__name__)
 
 
 def load_config():
@@ -47,11 +70,59 @@ def clear_query_params():
     st.query_params["activity_id"] = st.session_state["activity_id_input"]
 
 
-@st.cache_data
-def generate_intervals_summary(llm_input):
-    return generate_summary(
-        llm_input
-    )  # USE generate_summary(llm_input, "bedrock") FOR AWS BEDROCK MODEL.
+@st.cache_resource
+def shared_scheduler():
+    # Batch jobs on this machine share the same slots, so that their DB and
+    # LLM concurrency counts against the same limits
+    use_shared_slots()
+
+
+@st.cache_resource
+def extract_cache():
+    return ExtractCache(SQLiteCacheBackend(".streamlit/extract_cache.sqlite"))
+
+
+@st.cache_resource
+def feature_store():
+    # Also filled by the incremental runner and streamed backfills
+    engine = get_feature_store(".streamlit/derived_features.sqlite")
+    register_invalidation_hook(
+        lambda activity_id: delete_activity_features(engine, activity_id)
+    )
+    return engine
+
+
+@st.cache_resource
+def summary_cache():
+    # Bounded LRU, older summaries remain in the summary store
+    return MemoryCacheBackend(max_entries=512, ttl_s=24 * 3600)
+
+
+@st.cache_resource
+def summary_store():
+    # Also filled by nightly summarize_batch runs
+    return get_summary_store(".streamlit/summaries.sqlite")
+
+
+def stream_intervals_summary(cache, store, llm_input, compact=True):
+    # Same key as the summary store, so a prompt or model change misses both
+    key = summary_key(llm_input, compact)
+    cached = cache.get(key)
+    if cached is None:
+        cached = load_summary(store, llm_input, compact)
+        if cached is not None:
+            cache.set(key, cached)
+    if cached is not None:
+        yield cached
+        return
+
+    summary = ""
+    for chunk in stream_summary(
+        llm_input, "router", compact=compact
+    ):  # USE stream_summary(llm_input, "bedrock") TO PIN THE AWS BEDROCK MODEL.
+        summary += chunk
+        yield chunk
+    cache.set(key, summary)
 
 
 def display_athlete_profile(athlete_profile):
@@ -66,15 +137,21 @@ def display_athlete_profile(athlete_profile):
         st.markdown(f"##### **Critical Power**: {cp} W")
 
 
-def intervals_summary(session_data, sets_data, intervals_data):
-    session_data["sets"] = sets_data
-    llm_input_intervals = json.dumps(session_data, indent=4)
-    summary = generate_intervals_summary(llm_input_intervals).content
-    interval_stats = process_intervals(intervals_data)
-    return [summary] + interval_stats
+def render_interval_stats(interval_stats):
+    for stats in interval_stats:
+        message = st.chat_message("assistant")
+        message.markdown(stats)
+
+
+def render_personal_bests(pb_llm_input):
+    if pb_llm_input:
+        st.subheader("Personal Bests")
+        message = st.chat_message("assistant")
+        message.markdown(pb_llm_input)
 
 
 st.set_page_config(layout="wide")
+page_start = time.perf_counter()
 
 config = load_config()
 authenticator = authenticate_user(config)
@@ -119,14 +196,21 @@ if not st.query_params.get("activity_id"):
     st.info("Select a session.")
     st.stop()
 
-activity_data, athlete_profile_data, activity_peaks, peak_values = extract_data(
-    st.query_params.get("activity_id"), conn, team_restrict
-)
+shared_scheduler()
+(
+    activity_data,
+    athlete_profile_data,
+    activity_peaks,
+    peak_values,
+) = extract_cache().extract(st.query_params.get("activity_id"), conn, team_restrict)
 
 if activity_data is None:
     st.error("The activity does not exist, or lacks the relevant data.")
     st.stop()
 
+graph = TaskGraph()
+graph.add("personal_bests", process_personal_best, activity_peaks, peak_values)
+
 col1, col2 = st.columns([0.2, 0.8])
 with col1:
     profile = athlete_profile_data[0]
@@ -141,24 +225,50 @@ with col2:
     intervals = json.loads(activity.pop("intervals"))
 
     session_df = format_session_data(activity)
-    intervals_df = format_interval_data(intervals)
+    intervals_df = format_interval_data(
+        get_activity_features(
+            feature_store(), int(st.query_params.get("activity_id")), intervals
+        )
+    )
     sets_df = format_set_data(intervals_df)
 
     display_table_details(title, description, session_df, sets_df, intervals_df)
 
 st.divider()
 
-interval_summary = intervals_summary(session_df, sets_df, intervals_df)
+graph.add("intervals", process_intervals, intervals_df)
+graph.add("summary_input", summary_input, session_df, sets_df)
+summary_chunks = graph.add_stream(
+    "summary",
+    stream_intervals_summary,
+    summary_cache(),
+    summary_store(),
+    after=["summary_input"],
+)
+
 st.subheader("Intervals Summary")
-for stats in interval_summary:
-    message = st.chat_message("assistant")
-    message.markdown(stats)
-
-pb_llm_input = process_personal_best(activity_peaks, peak_values)
-if pb_llm_input:
-    st.subheader("Personal Bests")
-    message = st.chat_message("assistant")
-    message.markdown(pb_llm_input)
+summary_placeholder = st.chat_message("assistant").empty()
+sections = {
+    "intervals": (st.container(), render_interval_stats),
+    "personal_bests": (st.container(), render_personal_bests),
+}
+
+summary = ""
+for name, value in follow_tasks(graph, set(sections), "summary", summary_chunks):
+    if name == "summary":
+        summary += value
+        summary_placeholder.markdown(summary + "▌")
+    else:
+        container, render = sections[name]
+        with container:
+            render(value)
+
+summary_placeholder.markdown(summary)
+logger.info(
+    "Page latency: %.2fs, task timings: %s",
+    time.perf_counter() - page_start,
+    graph.timings,
+)
 
 with open(".streamlit/config.yaml", "w") as file:
     yaml.dump(config, file, default_flow_style=False)
@@ -0,0 +1,52 @@
+import numpy as np
+
+from graig_nlp.summary_generation.alignment import align, set_compliance
+from graig_nlp.summary_generation.format_table_data import format_interval_data
+
+
+def lap(intensity, power, characteristic=None):
+    return {
+        "duration_s": 60,
+        "distance_m": 500,
+        "intensity_label_v2": intensity,
+        "characteristic": characteristic,
+        "average_power": power,
+        "average_heartrate": 150,
+        "average_speed": 8.0,
+        "average_cadence": 90,
+    }
+
+
+def test_narrow_band_is_widened_to_reach_the_last_lap():
+    costs = np.random.default_rng(0).random((4, 30))
+
+    matches, cost = align(costs, band=1)
+
+    assert np.isfinite(cost)
+    assert cost == align(costs, band=30)[1]
+    assert all(-1 <= lap_index < 30 for lap_index in matches)
+
+
+def test_default_band_matches_unbanded_alignment():
+    costs = np.random.default_rng(1).random((30, 40))
+
+    assert align(costs)[1] == align(costs, band=40)[1]
+
+
+def test_set_compliance_is_aggregated_per_set():
+    vo2max_set = [lap("V", 300), lap("A", 120, "R")] * 3
+    laps = [lap("A", 150), *vo2max_set, lap("A", 150), *vo2max_set, lap("A", 150)]
+    intervals = format_interval_data(laps)
+    # Efforts of the first set are hit, those of the second set missed
+    compliance = [
+        {"lap_index": i, "hit": i < 7}
+        for i, raw_lap in enumerate(laps)
+        if raw_lap["intensity_label_v2"] == "V"
+    ]
+
+    stats = set_compliance(intervals, compliance)
+
+    assert [
+        (s["set_index"], s["aligned_efforts"], s["hit_efforts"], s["compliance_pct"])
+        for s in stats
+    ] == [(0, 3, 3, 100), (1, 3, 0, 0)]
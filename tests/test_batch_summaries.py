@@ -0,0 +1,77 @@
+import pytest
+
+from graig_nlp.summary_generation.model import batch_summaries
+from graig_nlp.summary_generation.model.batch_stand_in import StandInBatchServer
+from graig_nlp.summary_generation.model.batch_summaries import (
+    get_batch_client,
+    get_summary_store,
+    load_summary,
+    summarize_batch,
+)
+
+INPUTS = [f"session {i}" for i in range(5)]
+
+
+def responder(params):
+    llm_input = params["messages"][0]["content"]
+    if llm_input.endswith("3"):
+        raise RuntimeError("overloaded")
+    return f"Summary of {llm_input[-1]}"
+
+
+def record_calls(monkeypatch, resource, names, calls):
+    for name in names:
+        method = getattr(resource, name)
+
+        def recorded(*args, name=name, method=method, **kwargs):
+            calls.append(name)
+            return method(*args, **kwargs)
+
+        monkeypatch.setattr(resource, name, recorded)
+
+
+@pytest.fixture
+def server():
+    server = StandInBatchServer(responder=responder, processing_s=0.05).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return get_summary_store(str(tmp_path / "summaries.sqlite"))
+
+
+def test_skips_stored_and_retries_errored_requests(server, store, monkeypatch):
+    monkeypatch.setattr(batch_summaries, "MAX_BATCH_REQUESTS", 2)
+    client = get_batch_client(server.base_url)
+    calls = []
+    record_calls(monkeypatch, client.messages.batches, ["create", "retrieve"], calls)
+
+    first = summarize_batch(store, INPUTS, client, poll_interval_s=0.01)
+
+    assert first == {"stored": 0, "succeeded": 4, "errored": 1}
+    # Every batch is created before any is polled
+    assert calls[:3] == ["create"] * 3
+    assert "create" not in calls[3:]
+    assert load_summary(store, "session 2") == "Summary of 2"
+    assert load_summary(store, "session 3") is None
+
+    server.responder = lambda params: "Summary after retry"
+    second = summarize_batch(store, INPUTS, client, poll_interval_s=0.01)
+
+    assert second == {"stored": 4, "succeeded": 1}
+    assert load_summary(store, "session 3") == "Summary after retry"
+    assert load_summary(store, "session 2") == "Summary of 2"
+
+
+def test_summaries_are_keyed_by_model_and_prompt_version(server, store, monkeypatch):
+    client = get_batch_client(server.base_url)
+    summarize_batch(store, INPUTS[:1], client, poll_interval_s=0.01)
+
+    assert load_summary(store, "session 0") == "Summary of 0"
+    assert load_summary(store, "session 0", compact=False) is None
+    assert load_summary(store, "session 0", model="another-model") is None
+    monkeypatch.setattr(batch_summaries, "PROMPT_VERSION", -1)
+    assert load_summary(store, "session 0") is None
@@ -0,0 +1,97 @@
+import json
+
+from sqlalchemy import text
+from sqlmodel import SQLModel, select
+
+from graig_nlp.database import GeneratedSessionStructure, get_local_db_engine
+from graig_nlp.database.bulk_benchmark import generated_sessions
+from graig_nlp.database.bulk_writer import write_generated_sessions
+from graig_nlp.database.migrate import add_content_hash
+
+
+def local_engine(tmp_path):
+    engine = get_local_db_engine(str(tmp_path / "sessions.db"))
+    SQLModel.metadata.create_all(engine, tables=[GeneratedSessionStructure.__table__])
+    return engine
+
+
+def stored_validity(engine):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(GeneratedSessionStructure.title, GeneratedSessionStructure.is_valid)
+        ).all()
+
+
+def test_skips_duplicates(tmp_path):
+    engine = local_engine(tmp_path)
+    sessions = generated_sessions(5)
+
+    first = write_generated_sessions(engine, sessions + sessions[:2], chunk_size=3)
+    second = write_generated_sessions(engine, sessions, chunk_size=3)
+
+    assert first == {"written": 5, "skipped": 2, "invalid": 0}
+    assert second == {"written": 0, "skipped": 5, "invalid": 0}
+    assert len(stored_validity(engine)) == 5
+
+
+def test_keeps_or_sets_validity_without_validation(tmp_path):
+    engine = local_engine(tmp_path)
+    valid, invalid, unchecked = generated_sessions(3)
+    invalid = {**invalid, "generated_structure": "[]", "is_valid": True}
+    unchecked = {**unchecked, "generated_structure": "not json"}
+
+    counts = write_generated_sessions(
+        engine, [{**valid, "is_valid": False}, invalid, unchecked], validate=False
+    )
+
+    assert counts == {"written": 3, "skipped": 0, "invalid": 2}
+    assert sorted(stored_validity(engine)) == [
+        ("Session 0", False),
+        ("Session 1", True),
+        ("Session 2", False),
+    ]
+
+
+def test_rejects_oversized_structures_before_compiling(tmp_path):
+    engine = local_engine(tmp_path)
+    valid, oversized, nested = generated_sessions(3)
+    step = {"duration_s": 3600, "target": 200}
+    oversized = {
+        **oversized,
+        "generated_structure": json.dumps(
+            [{"repeat": 1000, "steps": [{"repeat": 1000, "steps": [step]}]}]
+        ),
+    }
+    nested = {**nested, "generated_structure": "[" * 100_000 + "]" * 100_000}
+
+    counts = write_generated_sessions(engine, [valid, oversized, nested])
+
+    assert counts == {"written": 3, "skipped": 0, "invalid": 2}
+
+
+def test_migration_adds_and_backfills_content_hash(tmp_path):
+    engine = get_local_db_engine(str(tmp_path / "sessions.db"))
+    first, second = ({**row, "is_valid": True} for row in generated_sessions(2))
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE generatedsessionstructure (id INTEGER PRIMARY KEY, "
+                "title VARCHAR, description VARCHAR, generated_structure VARCHAR, "
+                "is_valid BOOLEAN, version_model VARCHAR, comment VARCHAR)"
+            )
+        )
+        connection.execute(
+            text(
+                "INSERT INTO generatedsessionstructure (title, description, "
+                "generated_structure, is_valid, version_model) VALUES (:title, "
+                ":description, :generated_structure, :is_valid, :version_model)"
+            ),
+            [first, second, first],
+        )
+
+    assert add_content_hash(engine) == 2
+    assert add_content_hash(engine) == 0
+    counts = write_generated_sessions(engine, generated_sessions(3))
+
+    assert counts == {"written": 1, "skipped": 2, "invalid": 0}
+    assert len(stored_validity(engine)) == 4
@@ -0,0 +1,57 @@
+import numpy as np
+
+from graig_nlp.summary_generation.intervals.detect_intervals import detect_intervals
+
+CRITICAL_POWER = 300
+NOISE_W = 30
+# Change points may land a few seconds off under noise
+TOLERANCE_S = 2
+
+
+def noisy(power, seed=0):
+    return power + np.random.default_rng(seed).normal(0, NOISE_W, len(power))
+
+
+def assert_durations(laps, durations):
+    assert len(laps) == len(durations)
+    for lap, duration in zip(laps, durations):
+        assert abs(lap["duration_s"] - duration) <= TOLERANCE_S
+
+
+def four_by_five():
+    parts = [np.full(600, 180.0)]
+    for _ in range(4):
+        parts += [np.full(300, 330.0), np.full(180, 150.0)]
+    parts.append(np.full(600, 160.0))
+    return np.concatenate(parts)
+
+
+def test_steady_ride_is_one_lap():
+    # 0.9 CP, right on the Tempo/Threshold boundary
+    laps = detect_intervals(noisy(np.full(3600, 270.0)), CRITICAL_POWER)
+
+    assert len(laps) == 1
+    assert laps[0]["duration_s"] == 3600
+
+
+def test_four_by_five_minutes():
+    laps = detect_intervals(
+        noisy(four_by_five()), CRITICAL_POWER, cadence=np.full(4320, 90.0)
+    )
+
+    assert_durations(laps, [600, *[300, 180] * 3, 300, 780])
+    assert [lap["intensity_label_v2"] for lap in laps] == ["A", *["V", "A"] * 4]
+    assert [lap["characteristic"] for lap in laps[2:7:2]] == ["R"] * 3
+    assert all(abs(lap["average_power"] - 330) < 5 for lap in laps[1:8:2])
+
+
+def test_sprint_survives():
+    power = np.concatenate(
+        [np.full(600, 200.0), np.full(10, 1000.0), np.full(600, 200.0)]
+    )
+
+    laps = detect_intervals(noisy(power), CRITICAL_POWER)
+
+    assert_durations(laps, [600, 10, 600])
+    assert [lap["intensity_label_v2"] for lap in laps] == ["A", "N", "A"]
+    assert laps[1]["characteristic"] == "M"
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+from graig_nlp.summary_generation.export import (
+    MAX_OPEN_FILES,
+    export_activities,
+    key_columns,
+    read_export,
+    session_row,
+    write_rows,
+)
+from graig_nlp.summary_generation.format_table_data import (
+    format_interval_data,
+    format_session_data,
+)
+
+
+def lap(intensity, power):
+    return {
+        "duration_s": 300,
+        "distance_m": 2500,
+        "intensity_label_v2": intensity,
+        "characteristic": None,
+        "average_power": power,
+        "average_heartrate": 150,
+        "average_speed": 8.0,
+        "average_cadence": 90,
+    }
+
+
+def activity(activity_id, athlete_id, day, power):
+    laps = [lap("A", 150), *[lap("T", power), lap("A", 120)] * 4, lap("A", 150)]
+    session = {
+        "training_stimulus": None,
+        "duration_s": 3000,
+        "distance_m": 25000,
+        "total_elevation_gain": 100,
+        "total_work_kj": 600,
+        "average_power": power,
+        "average_heartrate": 150,
+        "average_speed": 8.0,
+    }
+    profile = {"athlete_id": athlete_id, "activity_date": datetime(2024, 5, day)}
+    return (
+        activity_id,
+        profile,
+        format_session_data(session),
+        format_interval_data(laps),
+    )
+
+
+def test_round_trip(tmp_path):
+    export_activities(tmp_path, [activity(1, 7, 1, 300), activity(2, 7, 2, 310)])
+
+    sessions = read_export(tmp_path, "sessions").to_pylist()
+    intervals = read_export(tmp_path, "intervals", filters=[("activity_id", "=", 2)])
+
+    assert sorted((row["activity_id"], row["avg_power_w"]) for row in sessions) == [
+        (1, 300),
+        (2, 310),
+    ]
+    assert sessions[0]["duration_s"] == 3000
+    assert sessions[0]["month"] == "2024-05"
+    assert intervals.num_rows == 10
+    assert read_export(tmp_path, "sets").num_rows > 0
+
+
+def test_reexport_replaces_rows_and_appends_new_activities(tmp_path):
+    export_activities(tmp_path, [activity(1, 7, 1, 300), activity(2, 7, 2, 310)])
+
+    export_activities(tmp_path, [activity(2, 7, 2, 320), activity(3, 7, 3, 330)])
+
+    sessions = read_export(tmp_path, "sessions").to_pylist()
+    intervals = read_export(tmp_path, "intervals")
+    assert sorted((row["activity_id"], row["avg_power_w"]) for row in sessions) == [
+        (1, 300),
+        (2, 320),
+        (3, 330),
+    ]
+    assert intervals.num_rows == 30
+
+
+def test_writes_more_than_1024_partitions(tmp_path):
+    profiles = [
+        {"athlete_id": athlete_id, "activity_date": date}
+        for athlete_id in range(MAX_OPEN_FILES // 2 + 10)
+        for date in [datetime(2024, 5, 1), datetime(2024, 6, 1)]
+    ]
+    keys = [key_columns(i, profile) for i, profile in enumerate(profiles)]
+    session_data = activity(0, 0, 1, 300)[2]
+
+    write_rows(
+        tmp_path, "sessions", [session_row(key, session_data) for key in keys], keys
+    )
+
+    assert read_export(tmp_path, "sessions").num_rows == len(keys)
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from graig_nlp.summary_generation import extract_cache
+from graig_nlp.summary_generation.extract_cache import (
+    ExtractCache,
+    SQLiteCacheBackend,
+)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.ttls = []
+
+    def query(self, query, params, ttl):
+        self.ttls.append(ttl)
+        if "JSON_ARRAYAGG" in query:
+            return pd.DataFrame([{"duration_s": 3600, "intervals": "[]"}])
+        if "LATERAL" in query:
+            return pd.DataFrame(
+                [{"athlete_id": 1, "activity_date": datetime(2024, 5, 1)}]
+            )
+        return pd.DataFrame(
+            [{"duration": 60, "current_value": 400, "previous_value": 380}]
+        )
+
+
+@pytest.fixture
+def hooks(monkeypatch):
+    hooks = []
+    monkeypatch.setattr(extract_cache, "INVALIDATION_HOOKS", hooks)
+    return hooks
+
+
+def test_misses_bypass_the_connection_cache(tmp_path, hooks):
+    cache = ExtractCache(SQLiteCacheBackend(str(tmp_path / "cache.sqlite")))
+    connection = FakeConnection()
+
+    cache.extract(1, connection)
+    cache.extract(1, connection)
+
+    assert connection.ttls and set(connection.ttls) == {0}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_invalidations_of_other_processes_run_local_hooks(tmp_path, hooks):
+    path = str(tmp_path / "cache.sqlite")
+    other_process = SQLiteCacheBackend(path)
+    cache = ExtractCache(SQLiteCacheBackend(path))
+    invalidated = []
+    hooks.append(invalidated.append)
+
+    other_process.delete_activity(5)
+    cache.invalidate(6)
+    cache.apply_shared_invalidations()
+    cache.apply_shared_invalidations()
+
+    # Own invalidations already ran the hooks, and none is replayed twice
+    assert invalidated == [5]
@@ -0,0 +1,124 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, event
+
+from graig_nlp.summary_generation.derived_features import (
+    get_activity_features,
+    get_feature_store,
+)
+from graig_nlp.summary_generation.format_table_data import (
+    format_interval_data,
+    format_session_data,
+    format_set_data,
+)
+from graig_nlp.summary_generation.model.batch_stand_in import StandInBatchServer
+from graig_nlp.summary_generation.model.batch_summaries import (
+    get_batch_client,
+    get_summary_store,
+    load_summary,
+)
+from graig_nlp.summary_generation.model.compaction import summary_input
+from graig_nlp.summary_generation.nightly_summaries import summarize_activities
+
+SOURCE_SCHEMA = """
+CREATE TABLE activities_activitysummary (
+    id INTEGER PRIMARY KEY, athlete_id INT, activity_date TEXT,
+    training_stimulus TEXT, timer_time REAL, distance REAL,
+    total_elevation_gain REAL, average_power REAL, average_heartrate REAL,
+    average_speed REAL
+);
+CREATE TABLE activities_trainingpeaksworkout (
+    activity_summary_id INT, Title TEXT, Description TEXT
+);
+CREATE TABLE profiles_athlete (id INT PRIMARY KEY, team_id INT);
+CREATE TABLE activities_lap (
+    activity_summary_id INT, start INT, "end" INT, distance REAL,
+    intensity_v2 TEXT, characteristic TEXT, power_mean REAL,
+    heart_rate_mean REAL, speed_mean REAL, cadence_mean REAL
+);
+CREATE TABLE metrics_recordprofile (
+    activity_summary_id INT, duration INT, value REAL, unit TEXT,
+    relative_work INT
+);
+"""
+ACTIVITY_IDS = [1, 2, 3]
+# Columns of ACTIVITY_QUERY of the source activities
+SESSION = {
+    "training_stimulus": "V",
+    "duration_s": 3600.0,
+    "distance_m": 30000.0,
+    "total_elevation_gain": 300.0,
+    "total_work_kj": 720.0,
+    "average_power": 200.0,
+    "average_heartrate": 140.0,
+    "average_speed": 8.3,
+}
+
+
+def source_engine(path):
+    connection = sqlite3.connect(path)
+    connection.executescript(SOURCE_SCHEMA)
+    connection.execute("INSERT INTO profiles_athlete VALUES (7, 1)")
+    for activity_id in ACTIVITY_IDS:
+        connection.execute(
+            "INSERT INTO activities_activitysummary VALUES "
+            "(?, 7, '2024-05-01 08:00:00', 'V', 3600, 30000, 300, 200, 140, 8.3)",
+            (activity_id,),
+        )
+        connection.executemany(
+            "INSERT INTO activities_lap VALUES (?, ?, ?, 2500, ?, NULL, ?, 150, 8, 90)",
+            [
+                (activity_id, i * 300, (i + 1) * 300, intensity, power + activity_id)
+                for i, (intensity, power) in enumerate(
+                    [("A", 150), *[("V", 350), ("A", 120)] * 4]
+                )
+            ],
+        )
+    connection.commit()
+    connection.close()
+
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def attach(dbapi_connection, connection_record):
+        dbapi_connection.execute(f"ATTACH DATABASE '{path}' AS `interface-db-prod-1`")
+
+    return engine
+
+
+def app_llm_input(activity_id, feature_store):
+    # The page inputs, as summary_generation_app builds them from extract_data
+    session_df = format_session_data(dict(SESSION))
+    intervals_df = format_interval_data(
+        get_activity_features(feature_store, activity_id, [])
+    )
+    return summary_input(session_df, format_set_data(intervals_df))
+
+
+@pytest.fixture
+def server():
+    server = StandInBatchServer(processing_s=0.05).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_app_finds_the_nightly_summaries(tmp_path, server):
+    feature_store = get_feature_store(str(tmp_path / "features.sqlite"))
+    store = get_summary_store(str(tmp_path / "summaries.sqlite"))
+    client = get_batch_client(server.base_url)
+    engine = source_engine(str(tmp_path / "source.sqlite"))
+
+    counts = summarize_activities(
+        engine, feature_store, store, client, batch_size=2, poll_interval_s=0.01
+    )
+    rerun = summarize_activities(
+        engine, feature_store, store, client, poll_interval_s=0.01
+    )
+
+    assert counts == {"stored": 0, "succeeded": 3}
+    assert rerun == {"stored": 3}
+    for activity_id in ACTIVITY_IDS:
+        llm_input = app_llm_input(activity_id, feature_store)
+        assert load_summary(store, llm_input) is not None
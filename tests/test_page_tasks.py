@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from graig_nlp.summary_generation.page_tasks import TaskGraph, follow_tasks
+
+
+def slow_result(duration_s, result):
+    time.sleep(duration_s)
+    return result
+
+
+def instant_stream():
+    yield "cached summary"
+
+
+def failing_stream():
+    yield "partial"
+    raise RuntimeError("stream failed")
+
+
+def test_yields_results_and_chunks():
+    graph = TaskGraph()
+    graph.add("stats", slow_result, 0.05, ["stats"])
+    chunks = graph.add_stream("summary", instant_stream)
+
+    events = list(follow_tasks(graph, {"stats"}, "summary", chunks))
+
+    assert ("stats", ["stats"]) in events
+    assert "".join(value for name, value in events if name == "summary") == (
+        "cached summary"
+    )
+
+
+def test_does_not_spin_after_stream_ends(monkeypatch):
+    graph = TaskGraph()
+    graph.add("stats", slow_result, 0.5, ["stats"])
+    chunks = graph.add_stream("summary", instant_stream)
+    graph.result("summary")
+
+    waits = []
+    wait_any = graph.wait_any
+
+    def counted_wait_any(names, timeout):
+        waits.append(set(names))
+        return wait_any(names, timeout)
+
+    monkeypatch.setattr(graph, "wait_any", counted_wait_any)
+    list(follow_tasks(graph, {"stats"}, "summary", chunks, poll_interval_s=0.05))
+
+    # One wait per poll interval at most, never on the finished stream
+    assert len(waits) <= 0.5 / 0.05 + 2
+    assert all(names == {"stats"} for names in waits)
+
+
+def test_raises_stream_error():
+    graph = TaskGraph()
+    chunks = graph.add_stream("summary", failing_stream)
+
+    with pytest.raises(RuntimeError, match="stream failed"):
+        list(follow_tasks(graph, set(), "summary", chunks))
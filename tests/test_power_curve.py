@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from graig_nlp.summary_generation.personal_achievements.power_curve import (
+    compute_activity_peaks,
+    mean_max_power,
+    resample_1hz,
+)
+
+
+def brute_force_mean_max(power, duration):
+    return max(
+        sum(power[start : start + duration]) / duration
+        for start in range(len(power) - duration + 1)
+    )
+
+
+def test_mean_max_power_matches_brute_force():
+    power = np.random.default_rng(0).uniform(0, 600, 90)
+    power[[10, 40]] = np.nan
+
+    durations, values = mean_max_power(power, np.arange(0, 120))
+
+    assert durations.tolist() == list(range(1, 91))
+    expected = [
+        brute_force_mean_max(np.nan_to_num(power).tolist(), d) for d in durations
+    ]
+    np.testing.assert_allclose(values, expected)
+
+
+def test_activity_peaks_shape():
+    peaks = compute_activity_peaks([100, 300, 200], durations=[1, 2, 5])
+
+    assert peaks == [
+        {"duration": 1.0, "current_value": 300.0},
+        {"duration": 2.0, "current_value": 250.0},
+    ]
+
+
+def test_resample_fills_gaps_with_zero():
+    resampled = resample_1hz([10.0, 11.0, 14.2], [200, np.nan, 300])
+
+    assert resampled.tolist() == [200.0, 0.0, 0.0, 0.0, 300.0]
+
+
+@pytest.mark.parametrize(
+    "timestamps", [[], [5.0, 3.0], [0.0, 1.0, 1.0]], ids=["empty", "reversed", "equal"]
+)
+def test_resample_rejects_invalid_timestamps(timestamps):
+    with pytest.raises(ValueError):
+        resample_1hz(timestamps, np.ones(len(timestamps)))
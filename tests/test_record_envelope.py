@@ -0,0 +1,43 @@
+import time
+from datetime import datetime
+
+from graig_nlp.summary_generation.personal_achievements.record_envelope import (
+    RecordEnvelope,
+)
+
+ATHLETE_ID = 1
+PRIOR_DATE = datetime(2024, 5, 1)
+ACTIVITY_DATE = datetime(2024, 5, 10)
+
+
+def peaks(value):
+    return [{"duration": 60, "current_value": value}]
+
+
+def test_observed_peaks_skip_lower_activities():
+    envelope = RecordEnvelope()
+    envelope.observe(ATHLETE_ID, 1, PRIOR_DATE, peaks(400))
+
+    assert envelope.can_skip(ATHLETE_ID, ACTIVITY_DATE, peaks(350))
+    assert not envelope.can_skip(ATHLETE_ID, ACTIVITY_DATE, peaks(450))
+
+
+def test_invalidated_observation_cannot_suppress_a_record():
+    envelope = RecordEnvelope()
+    envelope.observe(ATHLETE_ID, 1, PRIOR_DATE, peaks(400))
+
+    envelope.invalidate(1)
+
+    assert not envelope.can_skip(ATHLETE_ID, ACTIVITY_DATE, peaks(350))
+
+
+def test_stale_observation_cannot_suppress_a_record():
+    # Activity 1 is then deleted or corrected downward by another process
+    envelope = RecordEnvelope(ttl_s=0.05)
+    envelope.observe(ATHLETE_ID, 1, PRIOR_DATE, peaks(400))
+
+    time.sleep(0.1)
+
+    assert not envelope.can_skip(ATHLETE_ID, ACTIVITY_DATE, peaks(350))
+    envelope.observe(ATHLETE_ID, 2, PRIOR_DATE, peaks(300))
+    assert list(envelope.observations[ATHLETE_ID]) == [2]
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import pandas as pd
+
+from graig_nlp.summary_generation import extract_data
+from graig_nlp.summary_generation.personal_achievements.record_envelope import (
+    no_peak_values,
+)
+from graig_nlp.summary_generation.replay import capture_activities, load_fixtures
+
+ACTIVITY_DATE = datetime(2024, 5, 10)
+
+
+class FakeConnection:
+    def query(self, query, params, ttl):
+        if "JSON_ARRAYAGG" in query:
+            return pd.DataFrame([{"duration_s": 3600, "intervals": "[]"}])
+        if "LATERAL" in query:
+            return pd.DataFrame([{"athlete_id": 1, "activity_date": ACTIVITY_DATE}])
+        return pd.DataFrame(
+            [{"duration": 60, "current_value": 400, "previous_value": 380}]
+        )
+
+
+def test_capture_bypasses_the_record_envelope(tmp_path):
+    envelope = extract_data.RECORD_ENVELOPE
+    envelope.observe(
+        1, 1, datetime(2024, 5, 1), [{"duration": 60, "current_value": 500}]
+    )
+    try:
+        capture_activities([2], FakeConnection(), tmp_path)
+    finally:
+        envelope.invalidate(1)
+
+    peak_values = load_fixtures(tmp_path)[2][3]
+    assert peak_values != no_peak_values()
+    assert peak_values["past_8_weeks_record"][0]["previous_value"] == 380
@@ -0,0 +1,127 @@
+import time
+
+import pytest
+
+from graig_nlp.summary_generation.model.router import (
+    MIN_SAMPLES,
+    FakeProvider,
+    LLMRouter,
+)
+
+
+def warm(router, name, latency_s, success=True):
+    for _ in range(MIN_SAMPLES):
+        router.stats[name].record(latency_s, success)
+
+
+def test_routes_to_fastest_healthy_provider():
+    providers = {
+        "slow": FakeProvider(0.0, response="slow"),
+        "fast": FakeProvider(0.0, response="fast"),
+        "failing": FakeProvider(0.0, response="failing"),
+    }
+    router = LLMRouter(providers)
+    warm(router, "slow", 0.5)
+    warm(router, "fast", 0.1)
+    warm(router, "failing", 0.01, success=False)
+
+    assert router.ranked_providers() == ["fast", "slow"]
+    name, response = router.invoke({"query": "input"})
+    assert name == "fast"
+    assert response.content == "fast"
+    assert providers["slow"].calls == 0
+    assert providers["failing"].calls == 0
+
+
+def test_fails_over_to_next_provider_on_error():
+    providers = {
+        "failing": FakeProvider(0.0, error_rate=1.0),
+        "backup": FakeProvider(0.0, response="backup"),
+    }
+    router = LLMRouter(providers)
+
+    name, response = router.invoke({"query": "input"})
+    assert name == "backup"
+    assert response.content == "backup"
+    assert providers["failing"].calls == 1
+    assert router.stats["failing"].error_rate() == 1.0
+
+
+def test_raises_last_error_when_every_provider_fails():
+    router = LLMRouter({"failing": FakeProvider(0.0, error_rate=1.0)})
+
+    with pytest.raises(RuntimeError, match="Fake provider error"):
+        router.invoke({"query": "input"})
+
+
+def test_hedges_to_next_provider_past_p95():
+    providers = {
+        "stalled": FakeProvider(1.0, response="stalled"),
+        "backup": FakeProvider(0.0, response="backup"),
+    }
+    router = LLMRouter(providers, hedge=True)
+    warm(router, "stalled", 0.05)
+    warm(router, "backup", 0.2)
+    assert router.ranked_providers()[0] == "stalled"
+
+    start = time.perf_counter()
+    name, response = router.invoke({"query": "input"})
+    assert name == "backup"
+    assert response.content == "backup"
+    assert time.perf_counter() - start < 0.5
+    assert providers["stalled"].calls == 1
+
+
+def test_does_not_hedge_without_hedging():
+    providers = {
+        "stalled": FakeProvider(0.2, response="stalled"),
+        "backup": FakeProvider(0.0, response="backup"),
+    }
+    router = LLMRouter(providers)
+    warm(router, "stalled", 0.05)
+    warm(router, "backup", 0.2)
+
+    name, _ = router.invoke({"query": "input"})
+    assert name == "stalled"
+    assert providers["backup"].calls == 0
+
+
+def test_requires_a_provider():
+    with pytest.raises(ValueError):
+        LLMRouter({})
+
+
+def test_unhealthy_provider_is_probed_after_cooldown():
+    providers = {
+        "recovered": FakeProvider(0.0, response="recovered"),
+        "backup": FakeProvider(0.0, response="backup"),
+    }
+    router = LLMRouter(providers)
+    router.stats["recovered"].cooldown_s = 0.05
+    warm(router, "recovered", 0.01, success=False)
+    warm(router, "backup", 0.2)
+
+    assert router.ranked_providers() == ["backup"]
+    time.sleep(0.1)
+    assert router.ranked_providers() == ["recovered", "backup"]
+
+    name, _ = router.invoke({"query": "input"})
+
+    assert name == "recovered"
+    assert router.stats["recovered"].error_rate() == 0.0
+    assert router.ranked_providers()[0] == "recovered"
+
+
+def test_failed_probe_restarts_the_cooldown():
+    router = LLMRouter(
+        {
+            "failing": FakeProvider(0.0, error_rate=1.0),
+            "backup": FakeProvider(0.0, response="backup"),
+        }
+    )
+    router.stats["failing"].cooldown_s = 0.05
+    warm(router, "failing", 0.01, success=False)
+    time.sleep(0.1)
+
+    assert router.invoke({"query": "input"})[0] == "backup"
+    assert router.ranked_providers() == ["backup"]
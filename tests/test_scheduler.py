@@ -0,0 +1,75 @@
+from graig_nlp.summary_generation import scheduler
+from graig_nlp.summary_generation.model.router import LLMRouter
+from graig_nlp.summary_generation.page_tasks import TaskGraph
+from graig_nlp.summary_generation.scheduler import (
+    CURRENT_PRIORITY_CLASS,
+    SHARED_DIR_ENV,
+    Scheduler,
+    SharedSlots,
+    use_shared_slots,
+    workload,
+)
+
+LIMITS = {"db": {"max_concurrency": 2, "class_limits": {"batch": 1}}}
+
+
+class PriorityClassProvider:
+    def invoke(self, llm_data):
+        return CURRENT_PRIORITY_CLASS.get()
+
+
+def test_task_graph_tasks_inherit_the_priority_class():
+    graph = TaskGraph()
+    with workload("batch"):
+        graph.add("priority_class", CURRENT_PRIORITY_CLASS.get)
+    graph.add("default", CURRENT_PRIORITY_CLASS.get)
+
+    assert graph.result("priority_class") == "batch"
+    assert graph.result("default") == "interactive"
+
+
+def test_router_calls_inherit_the_priority_class():
+    router = LLMRouter({"provider": PriorityClassProvider()})
+
+    with workload("batch"):
+        assert router.invoke({}) == ("provider", "batch")
+
+
+def test_shared_slots_limit_every_process(tmp_path):
+    # Each SharedSlots opens its own lock files, as another process would
+    app, backfill = (SharedSlots(tmp_path, "db", **LIMITS["db"]) for _ in range(2))
+
+    held = backfill.try_acquire("batch")
+
+    assert held is not None
+    assert backfill.try_acquire("batch") is None
+    interactive = app.try_acquire("interactive")
+    assert interactive is not None
+    assert app.try_acquire("interactive") is None
+
+    backfill.release(held)
+    app.release(interactive)
+    assert app.try_acquire("batch") is not None
+
+
+def test_scheduler_holds_a_shared_slot(tmp_path):
+    app, backfill = (Scheduler(LIMITS, tmp_path) for _ in range(2))
+
+    with backfill.slot("db", "batch"):
+        assert app.shared_slots["db"].try_acquire("batch") is None
+    assert app.shared_slots["db"].try_acquire("batch") is not None
+
+
+def test_batch_entry_points_share_the_app_slots(tmp_path, monkeypatch):
+    monkeypatch.setenv(SHARED_DIR_ENV, str(tmp_path))
+    monkeypatch.setattr(scheduler, "SCHEDULER", Scheduler(LIMITS))
+    app = Scheduler(LIMITS, tmp_path)
+
+    use_shared_slots()
+    configured = scheduler.SCHEDULER
+    use_shared_slots()
+
+    assert scheduler.SCHEDULER is configured
+    assert configured.resource_limits == LIMITS
+    with scheduler.slot("db", "batch"):
+        assert app.shared_slots["db"].try_acquire("batch") is None
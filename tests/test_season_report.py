@@ -0,0 +1,115 @@
+from datetime import date, datetime
+
+import pandas as pd
+
+from graig_nlp.summary_generation.format_table_data import format_interval_data
+from graig_nlp.summary_generation.intervals.process_details_intervals import (
+    process_intervals,
+)
+from graig_nlp.summary_generation.replica import create_snapshot
+from graig_nlp.summary_generation.season_report import (
+    athlete_season_report,
+    detect_sets,
+    format_season_report,
+    merge_weeks,
+)
+
+SINGLE_EFFORT = ["A", "V", "A"]
+FOUR_EFFORTS = ["A", *["V", "A"] * 4]
+
+
+def lap(activity_id, intensity):
+    return {
+        "activity_id": activity_id,
+        "duration_s": 300.0,
+        "distance_m": 2500.0,
+        "intensity_label_v2": intensity,
+        "characteristic": None,
+        "average_power": 350.0 if intensity == "V" else 150.0,
+        "average_heartrate": 150.0,
+        "average_speed": 8.0,
+        "average_cadence": 90.0,
+    }
+
+
+def activity(activity_id, day):
+    return {
+        "activity_id": activity_id,
+        "athlete_id": 7,
+        "team_id": 1,
+        "activity_date": datetime(2024, 5, day, 8),
+        "training_stimulus": "V",
+        "duration_s": 3600.0,
+        "distance_m": 30000.0,
+        "total_elevation_gain": 300.0,
+        "average_power": 200.0,
+        "average_heartrate": 140.0,
+        "average_speed": 8.3,
+        "Title": "Ride",
+        "Description": None,
+        "first_name": "A",
+        "last_name": "B",
+    }
+
+
+class SnapshotConnection:
+    def __init__(self, sessions):
+        self.activities = [activity(i, day) for i, (day, _) in enumerate(sessions)]
+        self.laps = [
+            lap(i, intensity)
+            for i, (_, intensities) in enumerate(sessions)
+            for intensity in intensities
+        ]
+
+    def query(self, query, ttl=None):
+        if "activitysummary` AS a" in query:
+            return pd.DataFrame(self.activities)
+        if "activities_lap" in query:
+            return pd.DataFrame(self.laps)
+        if "recordprofile" in query:
+            return pd.DataFrame([{"activity_id": 0, "duration": 60.0, "value": 400.0}])
+        return pd.DataFrame(
+            [{"athlete_id": 7, "date": datetime(2024, 1, 1), "value": 300.0}]
+        )
+
+
+def season_report(tmp_path, sessions):
+    create_snapshot(SnapshotConnection(sessions), tmp_path)
+    return athlete_season_report(
+        str(tmp_path), 7, datetime(2024, 5, 1), datetime(2024, 5, 31)
+    )
+
+
+def test_single_effort_is_not_a_set():
+    laps = [lap(0, intensity) for intensity in SINGLE_EFFORT]
+
+    assert process_intervals(format_interval_data(laps)) == []
+    assert detect_sets(laps) == []
+    assert len(detect_sets([lap(0, intensity) for intensity in FOUR_EFFORTS])) == 1
+
+
+def test_weekly_aggregation(tmp_path):
+    # Monday 6th and Wednesday 8th share a week, Monday 13th starts the next one
+    report = season_report(
+        tmp_path, [(6, FOUR_EFFORTS), (8, SINGLE_EFFORT), (13, FOUR_EFFORTS)]
+    )
+
+    weeks = format_season_report(report)["weeks"]
+
+    assert [week["week_start"] for week in weeks] == ["2024-05-06", "2024-05-13"]
+    assert weeks[0]["activities"] == 2
+    assert weeks[0]["duration_s"] == 7200
+    assert weeks[0]["zone_duration_s"]["VO2max"] == 5 * 300
+    assert weeks[0]["set_counts"] == {"VO2max": 1}
+    assert weeks[1]["set_counts"] == {"VO2max": 1}
+
+
+def test_merge_weeks_sums_reports(tmp_path):
+    first = season_report(tmp_path / "first", [(6, FOUR_EFFORTS)])
+    second = season_report(tmp_path / "second", [(8, FOUR_EFFORTS)])
+
+    merged = merge_weeks([first["weeks"], second["weeks"]])
+
+    assert list(merged) == [date(2024, 5, 6)]
+    assert merged[date(2024, 5, 6)].to_dict()["activities"] == 2
+    assert merged[date(2024, 5, 6)].to_dict()["set_counts"] == {"VO2max": 2}
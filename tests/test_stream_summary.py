@@ -0,0 +1,75 @@
+import pytest
+from langchain_core.messages import AIMessageChunk
+from langchain_core.prompts import ChatPromptTemplate
+
+from graig_nlp.summary_generation.model import summary_generator_model
+from graig_nlp.summary_generation.model.router import FakeProvider, LLMRouter
+
+
+class FakeStreamingChain:
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def stream(self, llm_data):
+        self.calls += 1
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise RuntimeError("Fake stream error")
+            yield AIMessageChunk(content=chunk)
+        if self.fail_after == len(self.chunks):
+            raise RuntimeError("Fake stream error")
+
+
+@pytest.fixture
+def chains(monkeypatch):
+    chains = {}
+    router = LLMRouter({"first": FakeProvider(0.0), "second": FakeProvider(0.0)})
+    prompt = ChatPromptTemplate.from_messages([("human", "{query}")])
+    monkeypatch.setattr(
+        summary_generator_model,
+        "get_chain",
+        lambda provider, model=None, compact=False: (prompt, chains[provider]),
+    )
+    monkeypatch.setattr(summary_generator_model, "get_router", lambda compact: router)
+    return chains, router
+
+
+def test_fails_over_before_first_token(chains):
+    chains, router = chains
+    chains["first"] = FakeStreamingChain(["never"], fail_after=0)
+    chains["second"] = FakeStreamingChain(["Hello", " world"])
+
+    text = "".join(summary_generator_model.stream_summary("input", "router"))
+
+    assert text == "Hello world"
+    assert chains["first"].calls == 1
+    assert router.stats["first"].error_rate() == 1.0
+    assert router.stats["second"].error_rate() == 0.0
+    assert len(router.stats["second"].latencies) == 1
+
+
+def test_raises_after_first_token(chains):
+    chains, router = chains
+    chains["first"] = FakeStreamingChain(["Hello", " world"], fail_after=1)
+    chains["second"] = FakeStreamingChain(["Other"])
+
+    streamed = []
+    with pytest.raises(RuntimeError, match="Fake stream error"):
+        for text in summary_generator_model.stream_summary("input", "router"):
+            streamed.append(text)
+
+    assert streamed == ["Hello"]
+    assert chains["second"].calls == 0
+    assert router.stats["first"].error_rate() == 1.0
+
+
+def test_raises_when_every_provider_fails(chains):
+    chains, router = chains
+    chains["first"] = FakeStreamingChain([], fail_after=0)
+    chains["second"] = FakeStreamingChain([], fail_after=0)
+
+    with pytest.raises(RuntimeError, match="Fake stream error"):
+        list(summary_generator_model.stream_summary("input", "router"))
+    assert router.stats["second"].error_rate() == 1.0
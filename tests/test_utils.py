@@ -0,0 +1,46 @@
+from itertools import islice
+
+from graig_nlp.utils import flatten_nested_repeatable_iterable, nested_enumerate
+
+
+def test_nested_enumerate_treats_strings_as_leaves():
+    nested = ["ab", [b"cd", ["ef"]]]
+
+    # Bounded, so that a regression fails instead of never terminating
+    enumerated = list(islice(nested_enumerate(nested), 10))
+
+    assert enumerated == [
+        ((0,), "ab"),
+        ((1,), [b"cd", ["ef"]]),
+        ((1, 0), b"cd"),
+        ((1, 1), ["ef"]),
+        ((1, 1, 0), "ef"),
+    ]
+
+
+def test_nested_enumerate_handles_deep_nesting():
+    nested = "leaf"
+    for _ in range(5000):
+        nested = [nested]
+
+    *_, (index, leaf) = nested_enumerate(nested)
+
+    assert len(index) == 5000
+    assert leaf == "leaf"
+
+
+def test_flatten_treats_strings_as_leaves():
+    steps = ["warmup", {"steps": ["on", "off"], "repeats": 3}, "cooldown"]
+
+    flattened = list(
+        islice(
+            flatten_nested_repeatable_iterable(
+                steps,
+                lambda step: step["steps"] if isinstance(step, dict) else step,
+                lambda step: step["repeats"],
+            ),
+            20,
+        )
+    )
+
+    assert flattened == ["warmup"] + ["on", "off"] * 3 + ["cooldown"]
@@ -1,4 +1,19 @@
-from .engine import get_db_engine
+from .bulk_writer import write_generated_sessions
+from .derived_lap import DerivedLap
+from .engine import get_db_engine, get_local_db_engine
 from .generated_session import GeneratedSessionStructure
+from .generated_summary import GeneratedSummary
+from .incremental_state import PendingRecompute, PipelineWatermark
+from .interval_set_index import IntervalSet
 
-__all__ = ["get_db_engine", "GeneratedSessionStructure"]
+__all__ = [
+    "DerivedLap",
+    "get_db_engine",
+    "get_local_db_engine",
+    "GeneratedSessionStructure",
+    "GeneratedSummary",
+    "IntervalSet",
+    "PendingRecompute",
+    "PipelineWatermark",
+    "write_generated_sessions",
+]
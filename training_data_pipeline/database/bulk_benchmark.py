@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlmodel import Session, SQLModel
+
+from graig_nlp.database.bulk_writer import prepare_row, write_generated_sessions
+from graig_nlp.database.engine import get_local_db_engine
+from graig_nlp.database.generated_session import GeneratedSessionStructure
+
+# Define constants
+DEFAULT_ROWS = 5000
+DEFAULT_ORM_ROWS = 1000
+VERSION_MODEL = "benchmark"
+
+
+def generated_sessions(n_rows, offset=0):
+    """
+    Builds distinct generated sessions with interval structures.
+
+    Args:
+        n_rows (int): Number of sessions.
+        offset (int, optional): First session number, to build other sessions.
+
+    Returns:
+        list: Generated sessions as dicts.
+    """
+    sessions = []
+    for i in range(offset, offset + n_rows):
+        structure = [
+            {"duration_s": 600, "target": 150},
+            {
+                "repeat": 2 + i % 8,
+                "steps": [
+                    {"duration_s": 30 + i % 90, "target": [380, 420]},
+                    {"duration_s": 30, "target": 120},
+                ],
+            },
+            {"duration_s": 600, "target": 150},
+        ]
+        sessions.append(
+            {
+                "title": f"Session {i}",
+                "description": "Intervals",
+                "generated_structure": json.dumps(structure),
+                "version_model": VERSION_MODEL,
+            }
+        )
+    return sessions
+
+
+def write_row_at_a_time(engine, sessions, validate=True):
+    """
+    Writes generated sessions with one ORM add and commit per row.
+
+    Args:
+        engine (Engine): Database engine.
+        sessions (list): Generated sessions as dicts.
+        validate (bool, optional): Set is_valid by compiling generated_structure.
+    """
+    with Session(engine) as session:
+        for row in sessions:
+            session.add(GeneratedSessionStructure(**prepare_row(row, validate)))
+            session.commit()
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def measure_writes(database_path, n_rows=DEFAULT_ROWS, n_orm_rows=DEFAULT_ORM_ROWS):
+    """
+    Measures bulk writes against row-at-a-time ORM inserts on a SQLite file.
+
+    Every mode writes sessions not yet stored, so no row is skipped.
+
+    Args:
+        database_path (str): Path of the SQLite file, created if missing.
+        n_rows (int, optional): Number of sessions of the bulk writes.
+        n_orm_rows (int, optional): Number of sessions of the ORM inserts.
+
+    Returns:
+        dict: Duration in seconds and rows per second of every mode.
+    """
+    engine = get_local_db_engine(database_path)
+    SQLModel.metadata.create_all(engine, tables=[GeneratedSessionStructure.__table__])
+
+    modes = [
+        ("bulk", n_rows, write_generated_sessions, {}),
+        ("bulk_unvalidated", n_rows, write_generated_sessions, {"validate": False}),
+        ("orm_row_at_a_time", n_orm_rows, write_row_at_a_time, {}),
+    ]
+    report, offset = {}, 0
+    for mode, mode_rows, write, kwargs in modes:
+        sessions = generated_sessions(mode_rows, offset)
+        if not kwargs.get("validate", True):
+            sessions = [{**row, "is_valid": True} for row in sessions]
+        offset += mode_rows
+        duration_s = timed(write, engine, sessions, **kwargs)
+        report[mode] = {
+            "rows": mode_rows,
+            "seconds": round(duration_s, 3),
+            "rows_per_s": round(mode_rows / duration_s),
+        }
+    engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark bulk writes of generated sessions."
+    )
+    parser.add_argument(
+        "--database-path",
+        help="SQLite file to write to, a temporary file by default.",
+    )
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--orm-rows", type=int, default=DEFAULT_ORM_ROWS)
+    args = parser.parse_args()
+
+    if args.database_path:
+        report = measure_writes(args.database_path, args.rows, args.orm_rows)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            report = measure_writes(
+                os.path.join(directory, "benchmark.db"), args.rows, args.orm_rows
+            )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
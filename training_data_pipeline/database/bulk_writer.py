@@ -0,0 +1,107 @@
+import hashlib
+import json
+from itertools import islice
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from graig_nlp.workout_compiler import compile_workout, expanded_size
+
+from .generated_session import GeneratedSessionStructure
+
+# Define constants
+DEFAULT_CHUNK_SIZE = 1000
+HASHED_COLUMNS = ["title", "description", "generated_structure", "version_model"]
+# Bounds of valid workouts, checked before compiling allocates the expansion
+MAX_EXPANDED_STEPS = 100_000
+MAX_WORKOUT_S = 24 * 3600
+
+
+def content_hash(row):
+    """
+    Hashes the content of a generated session.
+
+    Args:
+        row (dict): Generated session.
+
+    Returns:
+        str: SHA-256 of the hashed columns.
+    """
+    content = json.dumps([row.get(column) for column in HASHED_COLUMNS])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def validate_structure(generated_structure):
+    """
+    Checks that a generated structure compiles into a non-empty workout.
+
+    Structures expanding past MAX_EXPANDED_STEPS steps or MAX_WORKOUT_S
+    seconds are invalid, and rejected without being compiled.
+
+    Args:
+        generated_structure (str): Workout structure as JSON.
+
+    Returns:
+        bool: Whether the structure is valid.
+    """
+    try:
+        structure = json.loads(generated_structure)
+        n_steps, total_duration_s = expanded_size(structure)
+        if n_steps > MAX_EXPANDED_STEPS or total_duration_s > MAX_WORKOUT_S:
+            return False
+        return compile_workout(structure).total_duration_s > 0
+    except (
+        ValueError,
+        TypeError,
+        KeyError,
+        AttributeError,
+        MemoryError,
+        RecursionError,
+    ):
+        return False
+
+
+def prepare_row(row, validate):
+    row = dict(row)
+    # is_valid is required, so rows without one are validated regardless
+    if validate or row.get("is_valid") is None:
+        row["is_valid"] = validate_structure(row["generated_structure"])
+    row["content_hash"] = content_hash(row)
+    return row
+
+
+def write_generated_sessions(
+    engine,
+    sessions,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    validate=True,
+):
+    """
+    Writes generated sessions in batched executemany inserts.
+
+    Every chunk of rows is written in its own transaction. content_hash is
+    unique, so rows whose content is already stored, or repeated in the
+    sessions, are skipped instead of failing their chunk.
+
+    Args:
+        engine (Engine): Database engine.
+        sessions (iterable): Generated sessions as dicts.
+        chunk_size (int, optional): Number of rows per transaction.
+        validate (bool, optional): Set is_valid by compiling generated_structure.
+            Otherwise only rows without is_valid are validated.
+
+    Returns:
+        dict: Numbers of written, skipped and invalid rows.
+    """
+    statement = sqlite_insert(GeneratedSessionStructure).on_conflict_do_nothing(
+        index_elements=["content_hash"]
+    )
+
+    counts = {"written": 0, "skipped": 0, "invalid": 0}
+    sessions = iter(sessions)
+    while chunk := [prepare_row(row, validate) for row in islice(sessions, chunk_size)]:
+        with engine.begin() as connection:
+            result = connection.execute(statement, chunk)
+        counts["written"] += result.rowcount
+        counts["skipped"] += len(chunk) - result.rowcount
+        counts["invalid"] += sum(not row["is_valid"] for row in chunk)
+    return counts
@@ -3,7 +3,8 @@ from pathlib import Path
 from dotenv import dotenv_values
 from sqlmodel import SQLModel
 
-import graig_nlp.db as db
+import graig_nlp.database as db
+from graig_nlp.database.migrate import migrate
 
 env_path = Path(__file__).parents[0].joinpath(".env")
 
@@ -12,6 +13,8 @@ def main():
     env = dotenv_values(env_path)
     engine = db.get_db_engine(env["TURSO_DATABASE_URL"], env["TURSO_AUTH_TOKEN"])
     SQLModel.metadata.create_all(engine)
+    # create_all only creates missing tables, columns added since are migrated
+    migrate(engine)
 
 
 if __name__ == "__main__":
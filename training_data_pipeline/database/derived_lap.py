@@ -0,0 +1,21 @@
+from typing import Optional
+
+from sqlalchemy import UniqueConstraint
+from sqlmodel import Field, SQLModel
+
+
+class DerivedLap(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("activity_id", "lap_index"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    activity_id: int = Field(index=True)
+    lap_index: int
+    intensity_label_v2: Optional[str] = None
+    characteristic: Optional[str] = None
+    duration_s: int
+    distance_km: Optional[float] = None
+    avg_power_w: Optional[float] = None
+    avg_torque_nm: Optional[float] = None
+    avg_heartrate_bpm: Optional[float] = None
+    avg_cadence_rpm: Optional[float] = None
+    avg_speed_kph: Optional[float] = None
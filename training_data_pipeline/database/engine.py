@@ -1,5 +1,13 @@
+from sqlalchemy import event
 from sqlmodel import create_engine
 
+# Write tuning of local SQLite files
+LOCAL_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+}
+
 
 def get_db_engine(turso_database_url: str, turso_auth_token: str, **kwargs):
     return create_engine(
@@ -7,3 +15,20 @@ def get_db_engine(turso_database_url: str, turso_auth_token: str, **kwargs):
         connect_args={"check_same_thread": False},
         **kwargs,
     )
+
+
+def set_local_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in LOCAL_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def get_local_db_engine(database_path: str, **kwargs):
+    engine = create_engine(
+        f"sqlite:///{database_path}",
+        connect_args={"check_same_thread": False},
+        **kwargs,
+    )
+    event.listen(engine, "connect", set_local_pragmas)
+    return engine
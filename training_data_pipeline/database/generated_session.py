@@ -11,3 +11,4 @@ class GeneratedSessionStructure(SQLModel, table=True):
     is_valid: bool
     version_model: str
     comment: Optional[str] = None
+    content_hash: Optional[str] = Field(default=None, unique=True)
@@ -0,0 +1,14 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+class GeneratedSummary(SQLModel, table=True):
+    summary_key: str = Field(primary_key=True)
+    llm_input: str
+    summary: str
+    model: str
+    prompt_version: int
+    batch_id: Optional[str] = Field(default=None, index=True)
+    created_at: datetime
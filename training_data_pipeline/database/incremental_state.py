@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+class PipelineWatermark(SQLModel, table=True):
+    source: str = Field(primary_key=True)
+    updated_at: datetime
+
+
+class PendingRecompute(SQLModel, table=True):
+    activity_id: int = Field(primary_key=True)
+    athlete_id: Optional[int] = Field(default=None, index=True)
+    activity_date: Optional[datetime] = Field(default=None, index=True)
+    recompute_sets: bool = False
+    recompute_personal_bests: bool = False
+    recompute_profile: bool = False
+    detected_at: datetime
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Index, UniqueConstraint
+from sqlmodel import Field, SQLModel
+
+
+class IntervalSet(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint("activity_id", "set_index", "intensity_label_v2"),
+        Index(
+            "ix_intervalset_search",
+            "athlete_id",
+            "intensity_label_v2",
+            "avg_duration_s",
+            "avg_power_w",
+        ),
+        Index("ix_intervalset_athlete_date", "athlete_id", "activity_date"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    activity_id: int = Field(index=True)
+    athlete_id: int
+    activity_date: datetime
+    set_index: int
+    intensity_label_v2: Optional[str] = None
+    no_intervals: int
+    total_duration_s: int
+    avg_duration_s: float
+    avg_power_w: int
+    avg_torque_nm: int
+    avg_heartrate_bpm: int
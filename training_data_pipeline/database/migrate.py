@@ -0,0 +1,105 @@
+from itertools import islice
+
+from sqlalchemy import inspect, text
+
+from .bulk_writer import DEFAULT_CHUNK_SIZE, HASHED_COLUMNS, content_hash
+from .generated_session import GeneratedSessionStructure
+
+# Define constants
+CONTENT_HASH_INDEX = "uq_generatedsessionstructure_content_hash"
+
+
+def has_unique_index(inspector, table_name, column):
+    unique_columns = [
+        constraint["column_names"]
+        for constraint in inspector.get_unique_constraints(table_name)
+    ] + [
+        index["column_names"]
+        for index in inspector.get_indexes(table_name)
+        if index["unique"]
+    ]
+    return [column] in unique_columns
+
+
+def add_content_hash(engine, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Adds the unique content_hash column to an existing generated session table.
+
+    create_all does not alter existing tables, so the column is added, the
+    hashes of stored rows are backfilled, and the unique index that
+    write_generated_sessions conflicts on is created. Rows repeating the
+    content of an earlier row keep a NULL hash, which the index allows, so
+    that no stored row is dropped. Running it again is a no-op.
+
+    Args:
+        engine (Engine): Database engine.
+        chunk_size (int, optional): Number of rows backfilled per transaction.
+
+    Returns:
+        int: Number of backfilled rows.
+    """
+    table_name = GeneratedSessionStructure.__tablename__
+    inspector = inspect(engine)
+    if not inspector.has_table(table_name):
+        return 0
+    columns = {column["name"] for column in inspector.get_columns(table_name)}
+    if "content_hash" not in columns:
+        with engine.begin() as connection:
+            connection.execute(
+                text(f"ALTER TABLE {table_name} ADD COLUMN content_hash VARCHAR")
+            )
+
+    with engine.connect() as connection:
+        seen = set(
+            connection.execute(
+                text(
+                    f"SELECT content_hash FROM {table_name} "
+                    "WHERE content_hash IS NOT NULL"
+                )
+            ).scalars()
+        )
+        rows = (
+            connection.execute(
+                text(
+                    f"SELECT id, {', '.join(HASHED_COLUMNS)} FROM {table_name} "
+                    "WHERE content_hash IS NULL ORDER BY id"
+                )
+            )
+            .mappings()
+            .all()
+        )
+
+    backfilled = 0
+    update = text(f"UPDATE {table_name} SET content_hash = :hash WHERE id = :id")
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        hashes = []
+        for row in chunk:
+            row_hash = content_hash(row)
+            if row_hash not in seen:
+                seen.add(row_hash)
+                hashes.append({"hash": row_hash, "id": row["id"]})
+        if hashes:
+            with engine.begin() as connection:
+                connection.execute(update, hashes)
+        backfilled += len(hashes)
+
+    if not has_unique_index(inspect(engine), table_name, "content_hash"):
+        with engine.begin() as connection:
+            connection.execute(
+                text(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {CONTENT_HASH_INDEX} "
+                    f"ON {table_name} (content_hash)"
+                )
+            )
+    return backfilled
+
+
+def migrate(engine):
+    """
+    Brings the tables created by earlier versions up to the current models.
+
+    Args:
+        engine (Engine): Database engine.
+    """
+    add_content_hash(engine)
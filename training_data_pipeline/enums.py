@@ -1,4 +1,8 @@
 from enum import Enum
+from functools import cache
+
+# Index of codes and labels missing from an enum
+UNKNOWN_INDEX = -1
 
 
 class LabelledStrEnum(str, Enum):
@@ -28,6 +32,42 @@ class LabelledStrEnum(str, Enum):
     def labels(cls):
         return [member.label for member in cls]
 
+    @classmethod
+    @cache
+    def code_index(cls) -> dict[str, int]:
+        """
+        Map each code to the small-int index of its member.
+        """
+        return {member.value: index for index, member in enumerate(cls)}
+
+    @classmethod
+    @cache
+    def label_index(cls) -> dict[str, int]:
+        """
+        Map each label to the small-int index of its member.
+        """
+        return {member.label: index for index, member in enumerate(cls)}
+
+    @classmethod
+    @cache
+    def label_table(cls) -> tuple[str, ...]:
+        return tuple(cls.labels())
+
+    @classmethod
+    def encode(cls, code) -> int:
+        return cls.code_index().get(code, UNKNOWN_INDEX)
+
+    @classmethod
+    def encode_label(cls, label) -> int:
+        return cls.label_index().get(label, UNKNOWN_INDEX)
+
+    @classmethod
+    def decode(cls, index: int):
+        """
+        Return the label of an index, or None for UNKNOWN_INDEX.
+        """
+        return None if index == UNKNOWN_INDEX else cls.label_table()[index]
+
     def __str__(self) -> str:
         return self.value
 
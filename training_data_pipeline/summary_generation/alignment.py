@@ -0,0 +1,234 @@
+import math
+
+import numpy as np
+
+from graig_nlp.summary_generation.intervals.identify_sets import (
+    create_dataframes,
+    identify_interval_sets,
+)
+from graig_nlp.summary_generation.intervals.process_details_intervals import (
+    get_grouped_stats,
+)
+
+# Define constants
+DURATION_WEIGHT = 1.0
+POWER_WEIGHT = 2.0
+SKIP_STEP_COST = 1.5
+EXTRA_LAP_COST = 1.0
+BAND_MIN = 8
+DURATION_TOLERANCE = 0.1
+POWER_TOLERANCE = 0.05
+
+
+def match_costs(step_durations, step_targets, lap_durations, lap_powers):
+    """
+    Computes the cost of matching every planned step with every lap.
+
+    Args:
+        step_durations (ndarray): Planned duration of every step.
+        step_targets (ndarray): Planned power of every step, NaN if free.
+        lap_durations (ndarray): Duration of every lap.
+        lap_powers (ndarray): Average power of every lap.
+
+    Returns:
+        ndarray: Cost matrix with one row per step and one column per lap.
+    """
+    duration_costs = np.abs(
+        np.log(np.maximum(lap_durations, 1)[None, :])
+        - np.log(np.maximum(step_durations, 1)[:, None])
+    )
+    targets = np.maximum(step_targets, 1)[:, None]
+    power_costs = np.abs(lap_powers[None, :] - targets) / targets
+    power_costs = np.where(np.isnan(power_costs), 0.0, power_costs)
+    return DURATION_WEIGHT * duration_costs + POWER_WEIGHT * power_costs
+
+
+def align(costs, band=None):
+    """
+    Aligns steps with laps by dynamic programming over a cost matrix.
+
+    Every step is matched with one lap or skipped, and every lap is matched
+    or extra. Each row is filled with NumPy: the extra-lap moves along a row
+    reduce to a prefix minimum. Cells further than the band from the
+    diagonal are pruned; a band too narrow to reach the last lap is widened
+    to the whole table.
+
+    Args:
+        costs (ndarray): Cost matrix from match_costs.
+        band (int, optional): Half-width of the band around the diagonal.
+
+    Returns:
+        tuple: Matched lap of every step (-1 if skipped), and the total cost.
+
+    Raises:
+        ValueError: If no alignment has a finite cost.
+    """
+    n, m = costs.shape
+    if band is None:
+        band = max(BAND_MIN, abs(n - m) + BAND_MIN)
+    table = np.full((n + 1, m + 1), np.inf)
+    table[0, : min(m, band) + 1] = EXTRA_LAP_COST * np.arange(min(m, band) + 1)
+    columns = np.arange(m + 1)
+
+    for i in range(1, n + 1):
+        center = round(i * m / n) if n else 0
+        lo, hi = max(0, center - band), min(m, center + band)
+        row = table[i - 1]
+        # Match with lap j, or skip step i
+        entries = np.full(hi - lo + 1, np.inf)
+        if lo == 0:
+            entries[1:] = row[lo:hi] + costs[i - 1, lo:hi]
+        else:
+            entries = row[lo - 1 : hi] + costs[i - 1, lo - 1 : hi]
+        entries = np.minimum(entries, row[lo : hi + 1] + SKIP_STEP_COST)
+        # Extra laps: min over k <= j of entries[k] + (j - k) * cost
+        offsets = EXTRA_LAP_COST * columns[lo : hi + 1]
+        table[i, lo : hi + 1] = np.minimum.accumulate(entries - offsets) + offsets
+
+    if not np.isfinite(table[n, m]):
+        if band >= max(n, m):
+            raise ValueError("No alignment of the steps and laps has a finite cost")
+        return align(costs, band=max(n, m))
+
+    matches = np.full(n, -1)
+    i, j = n, m
+    while i > 0:
+        if j > 0 and math.isclose(
+            table[i, j], table[i - 1, j - 1] + costs[i - 1, j - 1], abs_tol=1e-9
+        ):
+            matches[i - 1] = j - 1
+            i, j = i - 1, j - 1
+        elif math.isclose(table[i, j], table[i - 1, j] + SKIP_STEP_COST, abs_tol=1e-9):
+            i -= 1
+        else:
+            j -= 1
+    return matches, float(table[n, m])
+
+
+def align_workout(workout, laps, band=None):
+    """
+    Aligns the expanded steps of a compiled workout with recorded laps.
+
+    Args:
+        workout (CompiledWorkout): The planned workout.
+        laps (list): Raw laps of the activity.
+        band (int, optional): Half-width of the band around the diagonal.
+
+    Returns:
+        list: Compliance of every planned step.
+    """
+    sequence = workout.sequence
+    step_durations = workout.durations[sequence].astype(np.float64)
+    target_low = workout.target_low[sequence]
+    target_high = workout.target_high[sequence]
+    step_targets = (target_low + target_high) / 2
+    lap_durations = np.array([lap["duration_s"] or 0 for lap in laps], dtype=float)
+    lap_powers = np.array(
+        [lap.get("average_power") or 0 for lap in laps], dtype=np.float64
+    )
+
+    matches, _ = align(
+        match_costs(step_durations, step_targets, lap_durations, lap_powers), band
+    )
+
+    compliance = []
+    for step, lap in enumerate(matches):
+        planned = {
+            "step": step,
+            "planned_duration_s": int(step_durations[step]),
+            "target_low": None
+            if np.isnan(target_low[step])
+            else float(target_low[step]),
+            "target_high": None
+            if np.isnan(target_high[step])
+            else float(target_high[step]),
+        }
+        if lap < 0:
+            compliance.append(
+                {
+                    **planned,
+                    "lap_index": None,
+                    "duration_ratio": None,
+                    "power_ratio": None,
+                    "hit": False,
+                }
+            )
+            continue
+
+        duration_ratio = lap_durations[lap] / max(step_durations[step], 1)
+        power_ratio = (
+            lap_powers[lap] / step_targets[step] if step_targets[step] > 0 else None
+        )
+        power_hit = np.isnan(step_targets[step]) or (
+            target_low[step] * (1 - POWER_TOLERANCE)
+            <= lap_powers[lap]
+            <= target_high[step] * (1 + POWER_TOLERANCE)
+        )
+        compliance.append(
+            {
+                **planned,
+                "lap_index": int(lap),
+                "duration_ratio": round(float(duration_ratio), 2),
+                "power_ratio": None
+                if power_ratio is None
+                else round(float(power_ratio), 2),
+                "hit": bool(
+                    power_hit and abs(duration_ratio - 1) <= DURATION_TOLERANCE
+                ),
+            }
+        )
+    return compliance
+
+
+def set_compliance(intervals, compliance):
+    """
+    Computes the stats of every detected set with its compliance.
+
+    Sets are detected as for the set exports; an aligned step is counted in
+    the set and intensity of its lap, so sets sharing an intensity label are
+    scored separately. Steps aligned with laps outside every set, e.g.
+    recoveries, are not counted.
+
+    Args:
+        intervals (list): Formatted laps of the activity.
+        compliance (list): Compliance of every planned step from align_workout.
+
+    Returns:
+        list: Stats of get_grouped_stats per set and intensity, with set_index,
+        aligned_efforts, hit_efforts and compliance_pct.
+    """
+    filtered_intervals, aerobic_indices = identify_interval_sets(intervals)
+    separate_sets = [
+        df for df in create_dataframes(filtered_intervals, aerobic_indices) if df
+    ]
+    # Sets hold the lap dicts of intervals themselves
+    lap_sets = {
+        id(lap): set_index
+        for set_index, separate_set in enumerate(separate_sets)
+        for lap in separate_set
+    }
+
+    aligned, hits = {}, {}
+    for step in compliance:
+        if step["lap_index"] is None:
+            continue
+        lap = intervals[step["lap_index"]]
+        set_index = lap_sets.get(id(lap))
+        if set_index is None:
+            continue
+        key = (set_index, lap["intensity_label_v2"])
+        aligned[key] = aligned.get(key, 0) + 1
+        hits[key] = hits.get(key, 0) + step["hit"]
+
+    set_stats = []
+    for set_index, separate_set in enumerate(separate_sets):
+        for stats in get_grouped_stats(separate_set):
+            key = (set_index, stats["intensity_label_v2"])
+            stats["set_index"] = set_index
+            stats["aligned_efforts"] = aligned.get(key, 0)
+            stats["hit_efforts"] = hits.get(key, 0)
+            stats["compliance_pct"] = (
+                round(100 * hits[key] / aligned[key]) if aligned.get(key) else None
+            )
+            set_stats.append(stats)
+    return set_stats
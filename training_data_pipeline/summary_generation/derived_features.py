@@ -0,0 +1,215 @@
+import math
+
+from sqlmodel import Session, delete, insert, select
+
+from graig_nlp.database import DerivedLap, get_local_db_engine
+from graig_nlp.enums import Characteristic, IntensityV2
+
+# Define constants
+MAXIMUM = Characteristic.encode(Characteristic.MAXIMUM)
+
+FEATURE_COLUMNS = [
+    "intensity_label_v2",
+    "characteristic",
+    "duration_s",
+    "distance_km",
+    "avg_power_w",
+    "avg_torque_nm",
+    "avg_heartrate_bpm",
+    "avg_cadence_rpm",
+    "avg_speed_kph",
+]
+# Lap averages passed through as the source returns them
+SOURCE_COLUMNS = ["avg_power_w", "avg_heartrate_bpm", "avg_cadence_rpm"]
+
+
+def source_number(value):
+    """
+    Restores the integer type of an integral lap average.
+
+    SQLite returns REAL columns as floats, while the source laps hold integer
+    averages; both then render alike, e.g. "250 W" rather than "250.0 W".
+
+    Args:
+        value: Lap average.
+
+    Returns:
+        The value, as an int if it is an integral float.
+    """
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def derive_lap_features(lap):
+    """
+    Computes the display features of a raw lap.
+
+    Args:
+        lap (dict): Raw lap as returned in the activity intervals.
+
+    Returns:
+        dict: Derived features, None where a value is missing.
+    """
+    distance_m = lap.get("distance_m")
+    average_speed = lap.get("average_speed")
+    average_power = lap.get("average_power", 0)
+    average_cadence = lap.get("average_cadence", 0)
+
+    characteristic = Characteristic.encode(lap.get("characteristic"))
+    intensity_label = IntensityV2.decode(
+        IntensityV2.encode(lap.get("intensity_label_v2"))
+    )
+    if characteristic == MAXIMUM:
+        intensity_label = Characteristic.MAXIMUM.label
+
+    return {
+        "intensity_label_v2": intensity_label,
+        "characteristic": Characteristic.decode(characteristic),
+        "duration_s": int(lap["duration_s"]),
+        "distance_km": round(distance_m / 1000, 1)
+        if isinstance(distance_m, (int, float))
+        else None,
+        "avg_power_w": source_number(average_power),
+        "avg_torque_nm": round(
+            (average_power * 60) / (average_cadence * 2 * math.pi), 0
+        )
+        if average_cadence and average_power is not None
+        else None,
+        "avg_heartrate_bpm": source_number(lap.get("average_heartrate", 0)),
+        "avg_cadence_rpm": source_number(average_cadence),
+        "avg_speed_kph": round(average_speed * 3.6, 1)
+        if average_speed not in [None, 0]
+        else None,
+    }
+
+
+def get_feature_store(path):
+    """
+    Opens the local derived-lap table, creating it if needed.
+
+    Args:
+        path (str): Path of the SQLite file.
+
+    Returns:
+        Engine: Engine of the feature store.
+    """
+    engine = get_local_db_engine(path)
+    DerivedLap.__table__.create(engine, checkfirst=True)
+    return engine
+
+
+def ingest_activity_features(engine, activity_id, intervals):
+    """
+    Derives and stores the features of every lap of an activity.
+
+    Previously stored features of the activity are replaced.
+
+    Args:
+        engine (Engine): Engine of the feature store.
+        activity_id (int): The ID of the activity.
+        intervals (list): Raw laps of the activity.
+
+    Returns:
+        list: Derived features of every lap.
+    """
+    features = [derive_lap_features(lap) for lap in intervals]
+    with Session(engine) as session:
+        session.exec(delete(DerivedLap).where(DerivedLap.activity_id == activity_id))
+        session.add_all(
+            DerivedLap(activity_id=activity_id, lap_index=i, **lap_features)
+            for i, lap_features in enumerate(features)
+        )
+        session.commit()
+    return features
+
+
+def load_activity_features(engine, activity_id):
+    """
+    Loads the stored features of an activity.
+
+    Args:
+        engine (Engine): Engine of the feature store.
+        activity_id (int): The ID of the activity.
+
+    Returns:
+        list: Derived features of every lap, or None if never ingested.
+    """
+    with Session(engine) as session:
+        laps = session.exec(
+            select(DerivedLap)
+            .where(DerivedLap.activity_id == activity_id)
+            .order_by(DerivedLap.lap_index)
+        ).all()
+    if not laps:
+        return None
+    features = [
+        {column: getattr(lap, column) for column in FEATURE_COLUMNS} for lap in laps
+    ]
+    for lap_features in features:
+        for column in SOURCE_COLUMNS:
+            lap_features[column] = source_number(lap_features[column])
+    return features
+
+
+def get_activity_features(engine, activity_id, intervals):
+    """
+    Loads the stored features of an activity, ingesting them if missing.
+
+    Args:
+        engine (Engine): Engine of the feature store.
+        activity_id (int): The ID of the activity.
+        intervals (list): Raw laps of the activity.
+
+    Returns:
+        list: Derived features of every lap.
+    """
+    features = load_activity_features(engine, activity_id)
+    if features is None:
+        features = ingest_activity_features(engine, activity_id, intervals)
+    return features
+
+
+def ingest_batch_features(engine, activities):
+    """
+    Derives and stores the lap features of many activities in one transaction.
+
+    Previously stored features of the activities are replaced.
+
+    Args:
+        engine (Engine): Engine of the feature store.
+        activities (dict): Raw laps keyed by activity ID.
+
+    Returns:
+        dict: Derived features of every lap, keyed by activity ID.
+    """
+    features = {
+        activity_id: [derive_lap_features(lap) for lap in intervals]
+        for activity_id, intervals in activities.items()
+    }
+    rows = [
+        {"activity_id": activity_id, "lap_index": i, **lap_features}
+        for activity_id, activity_features in features.items()
+        for i, lap_features in enumerate(activity_features)
+    ]
+    with Session(engine) as session:
+        session.exec(
+            delete(DerivedLap).where(DerivedLap.activity_id.in_(list(features)))
+        )
+        if rows:
+            session.exec(insert(DerivedLap), params=rows)
+        session.commit()
+    return features
+
+
+def delete_activity_features(engine, activity_id):
+    """
+    Deletes the stored features of an activity, e.g. after a re-upload.
+
+    Args:
+        engine (Engine): Engine of the feature store.
+        activity_id (int): The ID of the activity.
+    """
+    with Session(engine) as session:
+        session.exec(delete(DerivedLap).where(DerivedLap.activity_id == activity_id))
+        session.commit()
@@ -0,0 +1,361 @@
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from graig_nlp.summary_generation.intervals.identify_sets import (
+    create_dataframes,
+    identify_interval_sets,
+)
+from graig_nlp.summary_generation.intervals.process_details_intervals import (
+    get_grouped_stats,
+)
+from graig_nlp.utils import time_to_seconds
+
+# Define constants
+PARTITION_COLUMNS = ["athlete_id", "month"]
+MAX_OPEN_FILES = 1024
+
+KEY_COLUMNS = [
+    ("activity_id", pa.int64()),
+    ("athlete_id", pa.int64()),
+    ("activity_date", pa.timestamp("s")),
+    ("month", pa.string()),
+]
+
+SESSION_METRICS = [
+    "distance_km",
+    "elevation_gain_m",
+    "total_work_kj",
+    "avg_power_w",
+    "avg_heartrate_bpm",
+    "avg_speed_kph",
+]
+
+INTERVAL_METRICS = [
+    "distance_km",
+    "avg_power_w",
+    "avg_torque_nm",
+    "avg_heartrate_bpm",
+    "avg_cadence_rpm",
+    "avg_speed_kph",
+]
+
+SET_METRICS = [
+    "total_distance_km",
+    "avg_power_w",
+    "avg_torque_nm",
+    "avg_heartrate_bpm",
+    "avg_cadence_rpm",
+    "avg_speed_kph",
+]
+
+SESSION_SCHEMA = pa.schema(
+    KEY_COLUMNS
+    + [
+        ("training_stimulus", pa.string()),
+        ("duration_s", pa.int32()),
+    ]
+    + [(column, pa.float64()) for column in SESSION_METRICS]
+)
+
+INTERVAL_SCHEMA = pa.schema(
+    KEY_COLUMNS
+    + [
+        ("interval_index", pa.int32()),
+        ("intensity_label_v2", pa.string()),
+        ("characteristic", pa.string()),
+        ("duration_s", pa.int32()),
+    ]
+    + [(column, pa.float64()) for column in INTERVAL_METRICS]
+)
+
+SET_SCHEMA = pa.schema(
+    KEY_COLUMNS
+    + [
+        ("set_index", pa.int32()),
+        ("intensity_label_v2", pa.string()),
+        ("no_intervals", pa.int32()),
+        ("total_duration_s", pa.int32()),
+        ("avg_duration_s", pa.int32()),
+    ]
+    + [(column, pa.float64()) for column in SET_METRICS]
+)
+
+SCHEMAS = {
+    "sessions": SESSION_SCHEMA,
+    "intervals": INTERVAL_SCHEMA,
+    "sets": SET_SCHEMA,
+}
+
+PARTITIONING = ds.partitioning(
+    pa.schema([column for column in KEY_COLUMNS if column[0] in PARTITION_COLUMNS]),
+    flavor="hive",
+)
+
+
+def numeric_or_none(value):
+    """
+    Converts the "NA" display placeholder back to a null value.
+
+    Args:
+        value: Formatted value.
+
+    Returns:
+        The value, or None if it is not numeric.
+    """
+    return value if isinstance(value, (int, float)) else None
+
+
+def key_columns(activity_id, profile):
+    """
+    Builds the key and partition columns shared by every exported row.
+
+    Args:
+        activity_id (int): The ID of the activity.
+        profile (dict): Profile details containing athlete_id and activity_date.
+
+    Returns:
+        dict: Key columns.
+    """
+    activity_date = profile["activity_date"]
+    return {
+        "activity_id": int(activity_id),
+        "athlete_id": int(profile["athlete_id"]),
+        "activity_date": activity_date,
+        "month": activity_date.strftime("%Y-%m"),
+    }
+
+
+def session_row(keys, session_data):
+    """
+    Converts formatted session data to a typed session row.
+
+    Args:
+        keys (dict): Key columns.
+        session_data (dict): Formatted session data.
+
+    Returns:
+        dict: Session row.
+    """
+    training_stimulus = session_data.get("training_stimulus")
+    return {
+        **keys,
+        "training_stimulus": None if training_stimulus == "NA" else training_stimulus,
+        "duration_s": time_to_seconds(session_data["duration_hms"]),
+        **{
+            column: numeric_or_none(session_data.get(column))
+            for column in SESSION_METRICS
+        },
+    }
+
+
+def interval_rows(keys, intervals_data):
+    """
+    Converts formatted interval data to typed interval rows.
+
+    Args:
+        keys (dict): Key columns.
+        intervals_data (list): Formatted interval data.
+
+    Returns:
+        list: Interval rows.
+    """
+    return [
+        {
+            **keys,
+            "interval_index": i,
+            "intensity_label_v2": interval["intensity_label_v2"],
+            "characteristic": interval["characteristic"],
+            "duration_s": time_to_seconds(interval["duration_hms"]),
+            **{
+                column: numeric_or_none(interval.get(column))
+                for column in INTERVAL_METRICS
+            },
+        }
+        for i, interval in enumerate(intervals_data)
+    ]
+
+
+def set_rows(keys, intervals_data):
+    """
+    Detects sets in formatted interval data and converts their stats to rows.
+
+    Args:
+        keys (dict): Key columns.
+        intervals_data (list): Formatted interval data.
+
+    Returns:
+        list: Set rows, one per intensity label within each set.
+    """
+    filtered_intervals, aerobic_indices = identify_interval_sets(intervals_data)
+    separate_sets = [
+        df for df in create_dataframes(filtered_intervals, aerobic_indices) if df
+    ]
+
+    rows = []
+    for set_index, separate_set in enumerate(separate_sets):
+        for stats in get_grouped_stats(separate_set):
+            rows.append(
+                {
+                    **keys,
+                    "set_index": set_index,
+                    "intensity_label_v2": stats["intensity_label_v2"],
+                    "no_intervals": stats["no_intervals"],
+                    "total_duration_s": int(stats["total_duration_s"]),
+                    "avg_duration_s": int(stats["avg_duration_s"]),
+                    **{
+                        column: numeric_or_none(stats.get(column))
+                        for column in SET_METRICS
+                    },
+                }
+            )
+    return rows
+
+
+def activity_rows(activity_id, profile, session_data, intervals_data):
+    """
+    Converts the formatted outputs of one activity to typed rows per table.
+
+    Args:
+        activity_id (int): The ID of the activity.
+        profile (dict): Profile details containing athlete_id and activity_date.
+        session_data (dict): Formatted session data.
+        intervals_data (list): Formatted interval data.
+
+    Returns:
+        dict: Rows keyed by table name.
+    """
+    keys = key_columns(activity_id, profile)
+    return {
+        "sessions": [session_row(keys, session_data)],
+        "intervals": interval_rows(keys, intervals_data),
+        "sets": set_rows(keys, intervals_data),
+    }
+
+
+def partition_keys(rows):
+    return {tuple(row[column] for column in PARTITION_COLUMNS) for row in rows}
+
+
+def kept_rows(path, table_name, activity_keys):
+    """
+    Reads the rows of the touched partitions, except those of the activities.
+
+    Args:
+        path (str): Directory of the exported table.
+        table_name (str): One of "sessions", "intervals" or "sets".
+        activity_keys (list): Key columns of the written activities.
+
+    Returns:
+        Table: Rows of other activities in the touched partitions.
+    """
+    schema = SCHEMAS[table_name]
+    if not os.path.isdir(path):
+        return schema.empty_table()
+    touched = partition_keys(activity_keys)
+    existing = ds.dataset(
+        path, schema=schema, format="parquet", partitioning=PARTITIONING
+    ).to_table(
+        filter=pc.field("athlete_id").isin(list({key[0] for key in touched}))
+        & pc.field("month").isin(list({key[1] for key in touched}))
+        & ~pc.field("activity_id").isin([key["activity_id"] for key in activity_keys])
+    )
+    # The athlete and month filters also match untouched athlete-months
+    in_touched = [
+        tuple(row[column] for column in PARTITION_COLUMNS) in touched
+        for row in existing.select(PARTITION_COLUMNS).to_pylist()
+    ]
+    return existing.filter(pa.array(in_touched, pa.bool_())).select(schema.names)
+
+
+def write_rows(root, table_name, rows, activity_keys, max_open_files=MAX_OPEN_FILES):
+    """
+    Writes rows of activities to a Parquet table partitioned by athlete and month.
+
+    Every athlete-month partition of the activities is rewritten with the
+    rows of its other activities and the new rows, so exporting new
+    activities appends to the table while exporting an activity again
+    replaces its rows.
+
+    Args:
+        root (str): Root directory of the export.
+        table_name (str): One of "sessions", "intervals" or "sets".
+        rows (list): Rows to write.
+        activity_keys (list): Key columns of the written activities, see key_columns.
+        max_open_files (int, optional): Number of files written at once.
+    """
+    path = f"{root}/{table_name}"
+    table = pa.concat_tables(
+        [
+            kept_rows(path, table_name, activity_keys),
+            pa.Table.from_pylist(rows, schema=SCHEMAS[table_name]),
+        ]
+    )
+    # Partitions left without rows are not rewritten, so remove them
+    for athlete_id, month in partition_keys(activity_keys) - partition_keys(
+        table.select(PARTITION_COLUMNS).to_pylist()
+    ):
+        shutil.rmtree(f"{path}/athlete_id={athlete_id}/month={month}", True)
+    if table.num_rows == 0:
+        return
+    # Sorted, so that every partition is written in one go
+    table = table.sort_by(
+        [(column, "ascending") for column in PARTITION_COLUMNS + ["activity_id"]]
+    )
+    ds.write_dataset(
+        table,
+        path,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template="part-{i}.parquet",
+        existing_data_behavior="delete_matching",
+        max_partitions=len(partition_keys(activity_keys)),
+        max_open_files=max_open_files,
+    )
+
+
+def export_activities(root, activities):
+    """
+    Exports the formatted outputs of several activities in a single write.
+
+    Activities exported again replace their previous rows.
+
+    Args:
+        root (str): Root directory of the export.
+        activities (list): Tuples of activity ID, profile details,
+            formatted session data and formatted interval data.
+    """
+    tables = {table_name: [] for table_name in SCHEMAS}
+    for activity in activities:
+        for table_name, rows in activity_rows(*activity).items():
+            tables[table_name].extend(rows)
+    activity_keys = [key_columns(activity[0], activity[1]) for activity in activities]
+
+    for table_name, rows in tables.items():
+        write_rows(root, table_name, rows, activity_keys)
+
+
+def read_export(root, table_name, filters=None, columns=None):
+    """
+    Reads an exported table with memory-mapped file access.
+
+    Args:
+        root (str): Root directory of the export.
+        table_name (str): One of "sessions", "intervals" or "sets".
+        filters (list, optional): Row filters, e.g. [("athlete_id", "=", 12)].
+        columns (list, optional): Columns to read.
+
+    Returns:
+        Table: The matching rows.
+    """
+    return pq.read_table(
+        f"{root}/{table_name}",
+        columns=columns,
+        filters=filters,
+        partitioning=PARTITIONING,
+        memory_map=True,
+    )
@@ -0,0 +1,249 @@
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from graig_nlp.summary_generation.extract_data import RECORD_ENVELOPE, extract_data
+
+# Define constants
+DEFAULT_MAX_ENTRIES = 2048
+# Same as the st.connection query TTL: re-uploads handled by other processes
+# never reach notify_activity_reuploaded, so entries must expire as quickly
+DEFAULT_TTL_S = 600
+# Invalidations are shared through the SQLite backend for this long
+INVALIDATION_LOG_S = 24 * 3600
+
+# Called with the activity ID whenever an activity is re-uploaded
+INVALIDATION_HOOKS = [RECORD_ENVELOPE.invalidate]
+
+
+def register_invalidation_hook(hook):
+    INVALIDATION_HOOKS.append(hook)
+
+
+def notify_activity_reuploaded(activity_id):
+    """
+    Invalidates every registered cache entry of a re-uploaded activity.
+
+    Args:
+        activity_id (int): The ID of the re-uploaded activity.
+    """
+    for hook in INVALIDATION_HOOKS:
+        hook(int(activity_id))
+
+
+class MemoryCacheBackend:
+    """
+    In-process cache with LRU and TTL eviction.
+
+    Values are stored pickled so callers mutating a result never alter the
+    cached copy.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_s=DEFAULT_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl_s:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        return pickle.loads(value)
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.time(), pickle.dumps(value))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete_activity(self, activity_id):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == activity_id]:
+                del self.entries[key]
+
+    def shared_invalidations(self):
+        return []
+
+
+class SQLiteCacheBackend:
+    """
+    Cache in a local SQLite file with LRU and TTL eviction.
+
+    The file can be shared by app workers and batch jobs on the same machine,
+    and survives restarts. Deleted activities are also logged in the file, so
+    that the other processes sharing it can run their invalidation hooks.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, ttl_s=DEFAULT_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS extract_cache (
+                    activity_id INTEGER NOT NULL,
+                    team_restrict INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    payload BLOB NOT NULL,
+                    PRIMARY KEY (activity_id, team_restrict)
+                )
+                """
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS extract_cache_accessed_at "
+                "ON extract_cache (accessed_at)"
+            )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS extract_cache_invalidations (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    activity_id INTEGER NOT NULL,
+                    origin TEXT NOT NULL,
+                    invalidated_at REAL NOT NULL
+                )
+                """
+            )
+            # Only invalidations logged after opening are replayed
+            self.origin = uuid.uuid4().hex
+            self.last_seq = self.connection.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM extract_cache_invalidations"
+            ).fetchone()[0]
+
+    def get(self, key):
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT stored_at, payload FROM extract_cache "
+                "WHERE activity_id = ? AND team_restrict = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[0] > self.ttl_s:
+                self.connection.execute(
+                    "DELETE FROM extract_cache "
+                    "WHERE activity_id = ? AND team_restrict = ?",
+                    key,
+                )
+                return None
+            self.connection.execute(
+                "UPDATE extract_cache SET accessed_at = ? "
+                "WHERE activity_id = ? AND team_restrict = ?",
+                (now, *key),
+            )
+        return pickle.loads(row[1])
+
+    def set(self, key, value):
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO extract_cache VALUES (?, ?, ?, ?, ?)",
+                (*key, now, now, pickle.dumps(value)),
+            )
+            self.connection.execute(
+                "DELETE FROM extract_cache WHERE rowid IN ("
+                "SELECT rowid FROM extract_cache "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete_activity(self, activity_id):
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM extract_cache WHERE activity_id = ?", (activity_id,)
+            )
+            self.connection.execute(
+                "INSERT INTO extract_cache_invalidations "
+                "(activity_id, origin, invalidated_at) VALUES (?, ?, ?)",
+                (activity_id, self.origin, now),
+            )
+            self.connection.execute(
+                "DELETE FROM extract_cache_invalidations WHERE invalidated_at < ?",
+                (now - INVALIDATION_LOG_S,),
+            )
+
+    def shared_invalidations(self):
+        """
+        Reads the activities invalidated by other processes since the last call.
+
+        Returns:
+            list: IDs of the invalidated activities.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT seq, activity_id, origin FROM extract_cache_invalidations "
+                "WHERE seq > ? ORDER BY seq",
+                (self.last_seq,),
+            ).fetchall()
+            if rows:
+                self.last_seq = rows[-1][0]
+        return [activity_id for _, activity_id, origin in rows if origin != self.origin]
+
+
+class ExtractCache:
+    """
+    Caches normalized extract_data results by activity and team restriction.
+
+    Misses query the database without the connection cache, so that results
+    stored after an invalidation are fresh. Invalidations made by other
+    processes sharing the backend run the local invalidation hooks.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        register_invalidation_hook(self.invalidate)
+
+    def extract(self, activity_id, connection, restrict=None):
+        """
+        Returns the cached extract_data result, extracting it on a miss.
+
+        Results of missing activities or failed extractions are not cached.
+
+        Args:
+            activity_id (int): The ID of the activity to extract.
+            connection (object): Database connection object.
+            restrict (int, optional): Restrict data by team ID.
+
+        Returns:
+            tuple: Contains activity details, profile details, activity peaks, and peak values.
+        """
+        self.apply_shared_invalidations()
+        key = (int(activity_id), restrict or 0)
+        result = self.backend.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = extract_data(activity_id, connection, restrict, ttl=0)
+        if result[0] is not None:
+            self.backend.set(key, result)
+        return result
+
+    def apply_shared_invalidations(self):
+        # The backend entries are already deleted by the other process
+        for activity_id in self.backend.shared_invalidations():
+            for hook in INVALIDATION_HOOKS:
+                if hook != self.invalidate:
+                    hook(activity_id)
+
+    def invalidate(self, activity_id):
+        self.backend.delete_activity(int(activity_id))
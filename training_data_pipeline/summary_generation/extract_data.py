@@ -1,5 +1,11 @@
 from datetime import datetime, timedelta
 
+from graig_nlp.summary_generation.personal_achievements.record_envelope import (
+    RecordEnvelope,
+    no_peak_values,
+)
+from graig_nlp.summary_generation.scheduler import scheduled_query
+
 # Define query constants
 ACTIVITY_QUERY = """
 SELECT
@@ -78,15 +84,36 @@ WHERE
 GROUP BY `metrics_recordprofile`.`duration`
 """
 
+# Seconds st.connection caches query results, 0 to always query
+QUERY_TTL_S = 600
+
+# Peaks of the processed activities, to skip window queries when no record can be broken
+RECORD_ENVELOPE = RecordEnvelope()
 
-def extract_data(activity_id, connection, restrict=None):
+
+def extract_data(
+    activity_id,
+    connection,
+    restrict=None,
+    raise_errors=False,
+    ttl=QUERY_TTL_S,
+    envelope=RECORD_ENVELOPE,
+):
     """
     Extracts data for a given activity ID from the database.
 
+    Peak values are left empty, without querying, when the record envelope
+    shows that the activity cannot break any record.
+
     Args:
         activity_id (int): The ID of the activity to extract.
         connection (object): Database connection object.
         restrict (int, optional): Restrict data by team ID.
+        raise_errors (bool, optional): Raise query errors instead of returning
+            Nones, so that a failure is not mistaken for a missing activity.
+        ttl (int, optional): Seconds query results are cached by the connection.
+        envelope (RecordEnvelope, optional): Envelope of the processed activities,
+            None to always query the peak values.
 
     Returns:
         tuple: Contains activity details, profile details, activity peaks, and peak values.
@@ -97,27 +124,40 @@ def extract_data(activity_id, connection, restrict=None):
 
     try:
         activity_details = fetch_activity_details(
-            activity_query, connection, activity_id
+            activity_query, connection, activity_id, ttl
         )
         if activity_details is None:
             return None, None, None, None
 
         profile_details = fetch_profile_details(
-            ATHLETE_PROFILE_QUERY, connection, activity_id
+            ATHLETE_PROFILE_QUERY, connection, activity_id, ttl
         )
         activity_peaks = fetch_activity_peaks(
-            ACTIVITY_PEAKS_QUERY, connection, activity_id
+            ACTIVITY_PEAKS_QUERY, connection, activity_id, ttl
         )
-        peak_values = fetch_peak_values(PEAKS_VALUE_QUERY, connection, profile_details)
+        athlete_id = profile_details[0].get("athlete_id")
+        activity_date = profile_details[0].get("activity_date")
+        if envelope is not None and envelope.can_skip(
+            athlete_id, activity_date, activity_peaks
+        ):
+            peak_values = no_peak_values()
+        else:
+            peak_values = fetch_peak_values(
+                PEAKS_VALUE_QUERY, connection, profile_details, ttl
+            )
+        if envelope is not None:
+            envelope.observe(athlete_id, activity_id, activity_date, activity_peaks)
 
         return activity_details, profile_details, activity_peaks, peak_values
 
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"Error fetching data: {e}")
         return None, None, None, None
 
 
-def fetch_activity_details(query, connection, activity_id):
+def fetch_activity_details(query, connection, activity_id, ttl=QUERY_TTL_S):
     """
     Fetches activity details from the database.
 
@@ -125,19 +165,20 @@ def fetch_activity_details(query, connection, activity_id):
         query (str): SQL query to execute.
         connection (object): Database connection object.
         activity_id (int): The ID of the activity to fetch.
+        ttl (int, optional): Seconds the result is cached by the connection.
 
     Returns:
         DataFrame: Activity details.
     """
-    activity_details = connection.query(
-        query, params={"activity_summary_id": activity_id}, ttl=600
+    activity_details = scheduled_query(
+        connection, query, params={"activity_summary_id": activity_id}, ttl=ttl
     )
     if activity_details.iloc[0].isnull().all():
         return None
     return activity_details.to_dict(orient="records")
 
 
-def fetch_profile_details(query, connection, activity_id):
+def fetch_profile_details(query, connection, activity_id, ttl=QUERY_TTL_S):
     """
     Fetches athlete profile details from the database.
 
@@ -145,17 +186,18 @@ def fetch_profile_details(query, connection, activity_id):
         query (str): SQL query to execute.
         connection (object): Database connection object.
         activity_id (int): The ID of the activity to fetch.
+        ttl (int, optional): Seconds the result is cached by the connection.
 
     Returns:
         dict: Profile details.
     """
-    profile_details = connection.query(
-        query, params={"activity_summary_id": activity_id}, ttl=600
+    profile_details = scheduled_query(
+        connection, query, params={"activity_summary_id": activity_id}, ttl=ttl
     )
     return profile_details.to_dict(orient="records")
 
 
-def fetch_activity_peaks(query, connection, activity_id):
+def fetch_activity_peaks(query, connection, activity_id, ttl=QUERY_TTL_S):
     """
     Fetches activity peaks details from the database.
 
@@ -163,17 +205,18 @@ def fetch_activity_peaks(query, connection, activity_id):
         query (str): SQL query to execute.
         connection (object): Database connection object.
         activity_id (int): The ID of the activity to fetch.
+        ttl (int, optional): Seconds the result is cached by the connection.
 
     Returns:
         dict: Activity peaks.
     """
-    activity_peaks = connection.query(
-        query, params={"activity_summary_id": activity_id}, ttl=600
+    activity_peaks = scheduled_query(
+        connection, query, params={"activity_summary_id": activity_id}, ttl=ttl
     )
     return activity_peaks.to_dict(orient="records")
 
 
-def fetch_peak_values(query, connection, profile_details):
+def fetch_peak_values(query, connection, profile_details, ttl=QUERY_TTL_S):
     """
     Fetches peak values from the database within specified date ranges.
 
@@ -181,7 +224,7 @@ def fetch_peak_values(query, connection, profile_details):
         query (str): SQL query to execute.
         connection (object): Database connection object.
         profile_details (dict): Profile details containing athlete_id.
-        activity_date (datetime): The date of the activity.
+        ttl (int, optional): Seconds the results are cached by the connection.
 
     Returns:
         dict: Peak values.
@@ -197,14 +240,15 @@ def fetch_peak_values(query, connection, profile_details):
     peak_values = {}
 
     for key, start_date in date_ranges.items():
-        peak_values[key] = connection.query(
+        peak_values[key] = scheduled_query(
+            connection,
             query,
             params={
                 "start_date": start_date,
                 "end_date": end_date,
                 "athlete_id": athlete_id,
             },
-            ttl=600,
+            ttl=ttl,
         ).to_dict(orient="records")
 
     return peak_values
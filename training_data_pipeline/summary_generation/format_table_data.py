@@ -3,43 +3,12 @@ import time
 
 import streamlit as st
 
+from graig_nlp.enums import TrainingStimulus
+from graig_nlp.summary_generation.derived_features import derive_lap_features
 from graig_nlp.summary_generation.intervals.process_details_intervals import (
     get_grouped_stats,
 )
 
-# Define constants
-TRAINING_STIMULI = {
-    "N": "Neuromuscular",
-    "AN": "Anaerobic",
-    "V": "VO2max",
-    "T": "Threshold",
-    "A": "Aerobic",
-    "RV": "Recovery",
-    "LC": "Lactate Clearance",
-    "FR": "Fatigue Resistance",
-    "AV": "Activation",
-    "TS": "Test",
-    "R": "Race",
-}
-
-INTENSITY_V2 = {
-    "A": "Aerobic",
-    "T": "Threshold",
-    "V": "VO2max",
-    "AN": "Anaerobic",
-    "N": "Neuromuscular",
-    "TP": "Tempo",
-}
-
-CHARACTERISTICS = {
-    "M": "Maximum",
-    "T": "Torque",
-    "C": "Cadence",
-    # "P": "Progressive",
-    "R": "Intra-Recovery",
-    "D": "Dynamic",
-}
-
 
 def format_session_data(session_data):
     """
@@ -79,8 +48,11 @@ def format_session_data(session_data):
         ):
             session_data[key] = round(value)
 
-    session_data["training_stimulus"] = TRAINING_STIMULI.get(
-        session_data.get("training_stimulus"), "NA"
+    session_data["training_stimulus"] = (
+        TrainingStimulus.decode(
+            TrainingStimulus.encode(session_data.get("training_stimulus"))
+        )
+        or "NA"
     )
     return session_data
 
@@ -90,47 +62,23 @@ def format_interval_data(interval_data):
     Formats interval data for display.
 
     Args:
-        interval_data (list): List of raw interval data.
+        interval_data (list): List of raw or precomputed interval data.
 
     Returns:
         list: Formatted interval data.
     """
     formatted_intervals = []
     for interval in interval_data:
-        formatted_interval = {}
-        formatted_interval["distance_km"] = (
-            round(interval["distance_m"] / 1000, 1)
-            if isinstance(interval["distance_m"], (int, float))
-            else "NA"
-        )
+        # Laps read from the feature store are already derived
+        if "avg_torque_nm" not in interval:
+            interval = derive_lap_features(interval)
+        formatted_interval = dict(interval)
         formatted_interval["duration_hms"] = str(
             datetime.timedelta(seconds=int(interval["duration_s"]))
         )
-        formatted_interval["avg_speed_kph"] = (
-            round(interval["average_speed"] * 3.6, 1)
-            if interval["average_speed"] not in [None, 0]
-            else "NA"
-        )
-        formatted_interval["avg_power_w"] = interval.pop("average_power", 0)
-        formatted_interval["avg_cadence_rpm"] = interval.pop("average_cadence", 0)
-        formatted_interval["avg_heartrate_bpm"] = interval.pop("average_heartrate", 0)
-        if formatted_interval["avg_cadence_rpm"]:
-            formatted_interval["avg_torque_nm"] = round(
-                (formatted_interval["avg_power_w"] * 60)
-                / (formatted_interval["avg_cadence_rpm"] * 2 * 3.14),
-                0,
-            )
-        else:
-            formatted_interval["avg_torque_nm"] = None
-
-        formatted_interval["characteristic"] = CHARACTERISTICS.get(
-            interval["characteristic"]
-        )
-        formatted_interval["intensity_label_v2"] = INTENSITY_V2.get(
-            interval["intensity_label_v2"]
-        )
-        if formatted_interval["characteristic"] == "Maximum":
-            formatted_interval["intensity_label_v2"] = "Maximum"
+        for key in ["distance_km", "avg_speed_kph"]:
+            if formatted_interval[key] is None:
+                formatted_interval[key] = "NA"
 
         formatted_intervals.append(formatted_interval)
 
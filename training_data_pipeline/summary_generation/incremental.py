@@ -0,0 +1,356 @@
+import json
+from datetime import datetime
+
+from sqlmodel import Session, SQLModel, select
+
+from graig_nlp.database import PendingRecompute, PipelineWatermark
+from graig_nlp.summary_generation.derived_features import ingest_activity_features
+from graig_nlp.summary_generation.extract_cache import notify_activity_reuploaded
+from graig_nlp.summary_generation.extract_data import extract_data
+from graig_nlp.summary_generation.format_table_data import (
+    format_interval_data,
+    format_set_data,
+)
+from graig_nlp.summary_generation.personal_achievements.personal_achievements import (
+    process_personal_best,
+)
+from graig_nlp.summary_generation.profile_resolver import ProfileResolver
+from graig_nlp.summary_generation.scheduler import (
+    scheduled_query,
+    use_shared_slots,
+    workload,
+)
+
+# Define query constants
+CHANGED_ACTIVITIES_QUERY = """
+SELECT a.id AS activity_id, a.athlete_id, a.activity_date, MAX(GREATEST(a.updated_at, COALESCE(l.updated_at, a.updated_at))) AS updated_at
+FROM `interface-db-prod-1`.`activities_activitysummary` AS a
+LEFT JOIN `interface-db-prod-1`.`activities_lap` AS l ON a.id = l.activity_summary_id
+WHERE a.updated_at > :watermark OR l.updated_at > :watermark
+GROUP BY a.id, a.athlete_id, a.activity_date
+"""
+
+CHANGED_RECORD_PROFILES_QUERY = """
+SELECT a.athlete_id, MIN(a.activity_date) AS activity_date, MAX(rp.updated_at) AS updated_at
+FROM `interface-db-prod-1`.`metrics_recordprofile` AS rp
+INNER JOIN `interface-db-prod-1`.`activities_activitysummary` AS a ON a.id = rp.activity_summary_id
+WHERE rp.updated_at > :watermark
+AND rp.unit = 'W'
+AND rp.relative_work = 0
+GROUP BY a.athlete_id
+"""
+
+CHANGED_ATHLETE_METRICS_QUERY = """
+SELECT athlete_id, previous_date, next_date, updated_at
+FROM (
+    SELECT
+        m.athlete_id,
+        m.updated_at,
+        COALESCE(LAG(m.date) OVER (PARTITION BY m.athlete_id ORDER BY m.date), '2000-01-01') AS previous_date,
+        COALESCE(LEAD(m.date) OVER (PARTITION BY m.athlete_id ORDER BY m.date), CURRENT_DATE) AS next_date
+    FROM `interface-db-prod-1`.`metrics_metric` AS m
+    WHERE m.metric_type = 'WG' AND m.unit = 'kg'
+    UNION ALL
+    SELECT
+        e.athlete_id,
+        e.updated_at,
+        COALESCE(LAG(e.date) OVER (PARTITION BY e.athlete_id ORDER BY e.date), '2000-01-01') AS previous_date,
+        COALESCE(LEAD(e.date) OVER (PARTITION BY e.athlete_id ORDER BY e.date), CURRENT_DATE) AS next_date
+    FROM `interface-db-prod-1`.`daily_metrics_dailyestimation` AS e
+) AS metrics
+WHERE updated_at > :watermark
+"""
+
+ATHLETE_ACTIVITIES_QUERY = """
+SELECT a.id AS activity_id, a.athlete_id, a.activity_date
+FROM `interface-db-prod-1`.`activities_activitysummary` AS a
+WHERE a.athlete_id = :athlete_id
+AND a.activity_date >= :start_date
+AND a.activity_date <= :end_date
+"""
+
+WATERMARK_SOURCES = ["activity_summary", "record_profile", "athlete_metrics"]
+
+
+def read_watermarks(engine):
+    """
+    Reads the last processed update time of every change source.
+
+    Args:
+        engine (Engine): Engine of the local state database.
+
+    Returns:
+        dict: Watermark per source, datetime(2000, 1, 1) when never processed.
+    """
+    with Session(engine) as session:
+        stored = {
+            row.source: row.updated_at
+            for row in session.exec(select(PipelineWatermark))
+        }
+    return {
+        source: stored.get(source, datetime(2000, 1, 1)) for source in WATERMARK_SOURCES
+    }
+
+
+def collect_changes(connection, watermarks):
+    """
+    Collects the activities affected by changes since the given watermarks.
+
+    Changed activities or laps need their set stats and personal bests
+    recomputed. A changed record profile shifts the personal-best baselines of
+    every later activity of the same athlete, and a changed weight or critical
+    power only affects the activities whose nearest metric date it became.
+
+    Args:
+        connection (object): Database connection object.
+        watermarks (dict): Watermark per source.
+
+    Returns:
+        tuple: Affected activities keyed by activity ID, and new watermarks.
+    """
+    affected = {}
+    new_watermarks = dict(watermarks)
+
+    def mark(row, **flags):
+        entry = affected.setdefault(
+            row["activity_id"],
+            {
+                "athlete_id": row["athlete_id"],
+                "activity_date": row["activity_date"],
+                "recompute_sets": False,
+                "recompute_personal_bests": False,
+                "recompute_profile": False,
+            },
+        )
+        for flag, value in flags.items():
+            entry[flag] = entry[flag] or value
+
+    changed_activities = scheduled_query(
+        connection,
+        CHANGED_ACTIVITIES_QUERY,
+        params={"watermark": watermarks["activity_summary"]},
+        ttl=0,
+    ).to_dict(orient="records")
+    for row in changed_activities:
+        mark(row, recompute_sets=True, recompute_personal_bests=True)
+        new_watermarks["activity_summary"] = max(
+            new_watermarks["activity_summary"], row["updated_at"]
+        )
+
+    changed_profiles = scheduled_query(
+        connection,
+        CHANGED_RECORD_PROFILES_QUERY,
+        params={"watermark": watermarks["record_profile"]},
+        ttl=0,
+    ).to_dict(orient="records")
+    for row in changed_profiles:
+        for dependent in fetch_athlete_activities(
+            connection, row["athlete_id"], row["activity_date"], datetime.now()
+        ):
+            mark(dependent, recompute_personal_bests=True)
+        new_watermarks["record_profile"] = max(
+            new_watermarks["record_profile"], row["updated_at"]
+        )
+
+    changed_metrics = scheduled_query(
+        connection,
+        CHANGED_ATHLETE_METRICS_QUERY,
+        params={"watermark": watermarks["athlete_metrics"]},
+        ttl=0,
+    ).to_dict(orient="records")
+    for row in changed_metrics:
+        for dependent in fetch_athlete_activities(
+            connection, row["athlete_id"], row["previous_date"], row["next_date"]
+        ):
+            mark(dependent, recompute_profile=True)
+        new_watermarks["athlete_metrics"] = max(
+            new_watermarks["athlete_metrics"], row["updated_at"]
+        )
+
+    return affected, new_watermarks
+
+
+def fetch_athlete_activities(connection, athlete_id, start_date, end_date):
+    """
+    Fetches the activities of an athlete within a date range.
+
+    Args:
+        connection (object): Database connection object.
+        athlete_id (int): The ID of the athlete.
+        start_date (datetime): First activity date to include.
+        end_date (datetime): Last activity date to include.
+
+    Returns:
+        list: Activity IDs, athlete IDs and activity dates.
+    """
+    return scheduled_query(
+        connection,
+        ATHLETE_ACTIVITIES_QUERY,
+        params={
+            "athlete_id": athlete_id,
+            "start_date": start_date,
+            "end_date": end_date,
+        },
+        ttl=0,
+    ).to_dict(orient="records")
+
+
+def record_changes(engine, affected, new_watermarks):
+    """
+    Appends affected activities to the change log and advances the watermarks.
+
+    Both writes share one transaction, so a crash never advances a watermark
+    past changes that were not logged.
+
+    Args:
+        engine (Engine): Engine of the local state database.
+        affected (dict): Affected activities keyed by activity ID.
+        new_watermarks (dict): Watermark per source.
+    """
+    detected_at = datetime.now()
+    with Session(engine) as session:
+        for activity_id, flags in affected.items():
+            pending = session.get(PendingRecompute, activity_id)
+            if pending is None:
+                pending = PendingRecompute(
+                    activity_id=activity_id,
+                    athlete_id=flags["athlete_id"],
+                    activity_date=flags["activity_date"],
+                    detected_at=detected_at,
+                )
+            pending.recompute_sets = pending.recompute_sets or flags["recompute_sets"]
+            pending.recompute_personal_bests = (
+                pending.recompute_personal_bests or flags["recompute_personal_bests"]
+            )
+            pending.recompute_profile = (
+                pending.recompute_profile or flags["recompute_profile"]
+            )
+            session.add(pending)
+
+        for source, updated_at in new_watermarks.items():
+            session.merge(PipelineWatermark(source=source, updated_at=updated_at))
+        session.commit()
+
+
+def is_profile_only(pending):
+    return (
+        pending.recompute_profile
+        and pending.athlete_id is not None
+        and not (pending.recompute_sets or pending.recompute_personal_bests)
+    )
+
+
+def recompute_activity(
+    connection, pending, restrict=None, profiles=None, feature_store=None
+):
+    """
+    Recomputes the derived outputs flagged on a pending change.
+
+    Args:
+        connection (object): Database connection object.
+        pending (PendingRecompute): The change log entry.
+        restrict (int, optional): Restrict data by team ID.
+        profiles (dict, optional): Profile details resolved in batch, keyed by
+            activity ID, used instead of extracting profile-only changes.
+        feature_store (Engine, optional): Feature store where the lap features
+            of activities with changed laps are re-ingested.
+
+    Returns:
+        dict: Recomputed outputs, only containing the flagged ones, or None
+        when the activity is missing or restricted.
+
+    Raises:
+        Exception: Any extraction error, so that the entry stays in the log.
+    """
+    if profiles is not None and is_profile_only(pending):
+        profile = profiles.get(pending.activity_id)
+        if profile is None:
+            return None
+        return {"activity_id": pending.activity_id, "profile": profile}
+
+    activity_data, profile_data, activity_peaks, peak_values = extract_data(
+        pending.activity_id, connection, restrict, raise_errors=True
+    )
+    if activity_data is None:
+        return None
+
+    result = {"activity_id": pending.activity_id}
+    if pending.recompute_sets:
+        intervals = json.loads(activity_data[0]["intervals"])
+        if feature_store is not None:
+            intervals = ingest_activity_features(
+                feature_store, pending.activity_id, intervals
+            )
+        result["sets"] = format_set_data(format_interval_data(intervals))
+    if pending.recompute_personal_bests:
+        result["personal_bests"] = process_personal_best(activity_peaks, peak_values)
+    if pending.recompute_profile:
+        result["profile"] = profile_data[0]
+    return result
+
+
+def run_incremental(connection, engine, on_result, restrict=None, feature_store=None):
+    """
+    Recomputes only the activities affected by changes since the last run.
+
+    Changes are first appended to the change log and the watermarks advanced,
+    and cached extracts of the affected activities are invalidated. The log is
+    then drained in activity date order; entries whose recompute
+    fails stay in the log and are retried on the next run, while entries of
+    missing or restricted activities are dropped. Profiles of
+    entries only flagged for a profile recompute are resolved up front, with
+    one metric history query per athlete. Queries run as batch work of the
+    shared scheduler, behind interactive requests of every process.
+
+    Args:
+        connection (object): Database connection object.
+        engine (Engine): Engine of the local state database.
+        on_result (callable): Called with every recomputed result.
+        restrict (int, optional): Restrict data by team ID.
+        feature_store (Engine, optional): Feature store of the app, see
+            get_feature_store, kept current with the changed laps.
+
+    Returns:
+        dict: Number of recomputed, missing and failed activities.
+    """
+    use_shared_slots()
+    with workload("batch"):
+        SQLModel.metadata.create_all(engine)
+
+        affected, new_watermarks = collect_changes(connection, read_watermarks(engine))
+        record_changes(engine, affected, new_watermarks)
+        for activity_id in affected:
+            notify_activity_reuploaded(activity_id)
+
+        counts = {"recomputed": 0, "missing": 0, "failed": 0}
+        with Session(engine) as session:
+            pending_changes = session.exec(
+                select(PendingRecompute).order_by(PendingRecompute.activity_date)
+            ).all()
+            profiles = ProfileResolver(connection).resolve_activities(
+                [
+                    pending.model_dump()
+                    for pending in pending_changes
+                    if is_profile_only(pending)
+                ],
+                restrict,
+            )
+            for pending in pending_changes:
+                try:
+                    result = recompute_activity(
+                        connection, pending, restrict, profiles, feature_store
+                    )
+                except Exception as e:
+                    print(f"Error recomputing activity {pending.activity_id}: {e}")
+                    counts["failed"] += 1
+                    continue
+
+                if result is None:
+                    counts["missing"] += 1
+                else:
+                    on_result(result)
+                    counts["recomputed"] += 1
+                session.delete(pending)
+                session.commit()
+
+    return counts
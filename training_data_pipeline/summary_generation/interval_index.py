@@ -0,0 +1,214 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, delete, insert, select
+
+from graig_nlp.database import IntervalSet, get_local_db_engine
+from graig_nlp.summary_generation.format_table_data import format_interval_data
+from graig_nlp.summary_generation.intervals.identify_sets import (
+    create_dataframes,
+    identify_interval_sets,
+)
+from graig_nlp.summary_generation.intervals.process_details_intervals import (
+    get_grouped_stats,
+)
+from graig_nlp.summary_generation.replica import fetch_replica_activity_details
+
+# Define constants
+EPOCH = datetime(1970, 1, 1)
+BATCH_SIZE = 5000
+
+SET_COLUMNS = [
+    "intensity_label_v2",
+    "no_intervals",
+    "total_duration_s",
+    "avg_duration_s",
+    "avg_power_w",
+    "avg_torque_nm",
+    "avg_heartrate_bpm",
+]
+
+
+def get_interval_index(path):
+    """
+    Opens the local interval set index, creating it if needed.
+
+    Args:
+        path (str): Path of the SQLite file.
+
+    Returns:
+        Engine: Engine of the index.
+    """
+    engine = get_local_db_engine(path)
+    IntervalSet.__table__.create(engine, checkfirst=True)
+    return engine
+
+
+def set_rows(activity_id, athlete_id, activity_date, intervals):
+    """
+    Computes the index rows of every set of an activity.
+
+    Each set detected by identify_interval_sets yields one row per intensity,
+    with the weighted averages of get_grouped_stats.
+
+    Args:
+        activity_id (int): The ID of the activity.
+        athlete_id (int): The ID of the athlete.
+        activity_date (datetime): Date of the activity.
+        intervals (list): Raw laps of the activity.
+
+    Returns:
+        list: IntervalSet rows as dicts.
+    """
+    filtered_intervals, aerobic_indices = identify_interval_sets(
+        format_interval_data(intervals)
+    )
+    separate_sets = [
+        df for df in create_dataframes(filtered_intervals, aerobic_indices) if df
+    ]
+    return [
+        {
+            "activity_id": activity_id,
+            "athlete_id": athlete_id,
+            "activity_date": activity_date,
+            "set_index": set_index,
+            **{column: stats[column] for column in SET_COLUMNS},
+        }
+        for set_index, interval_set in enumerate(separate_sets)
+        for stats in get_grouped_stats(interval_set)
+    ]
+
+
+def index_activity(engine, activity_id, athlete_id, activity_date, intervals):
+    """
+    Indexes the sets of an activity, replacing previously indexed sets.
+
+    Args:
+        engine (Engine): Engine of the index.
+        activity_id (int): The ID of the activity.
+        athlete_id (int): The ID of the athlete.
+        activity_date (datetime): Date of the activity.
+        intervals (list): Raw laps of the activity.
+    """
+    with Session(engine) as session:
+        session.exec(delete(IntervalSet).where(IntervalSet.activity_id == activity_id))
+        rows = set_rows(activity_id, athlete_id, activity_date, intervals)
+        if rows:
+            session.exec(insert(IntervalSet), params=rows)
+        session.commit()
+
+
+def delete_activity_sets(engine, activity_id):
+    """
+    Deletes the indexed sets of an activity, e.g. after a re-upload.
+
+    Args:
+        engine (Engine): Engine of the index.
+        activity_id (int): The ID of the activity.
+    """
+    with Session(engine) as session:
+        session.exec(delete(IntervalSet).where(IntervalSet.activity_id == activity_id))
+        session.commit()
+
+
+def build_index_from_replica(engine, replica, athlete_ids=None):
+    """
+    Indexes every activity of a local replica.
+
+    Rows are inserted in batches with executemany; previously indexed sets of
+    the athletes are replaced.
+
+    Args:
+        engine (Engine): Engine of the index.
+        replica (LocalReplica): The local replica.
+        athlete_ids (list, optional): Athletes to index, all athletes by default.
+
+    Returns:
+        int: Number of indexed sets.
+    """
+    if athlete_ids is None:
+        athlete_ids = [int(a) for a in replica.athletes]
+    activities = replica.tables["activities"]
+
+    indexed_sets = 0
+    with Session(engine) as session:
+        session.exec(delete(IntervalSet).where(IntervalSet.athlete_id.in_(athlete_ids)))
+        rows = []
+        for athlete_id in athlete_ids:
+            athlete = replica.athlete_slice("activities", athlete_id)
+            for position in range(athlete.start, athlete.stop):
+                activity_details = fetch_replica_activity_details(replica, position)
+                if activity_details is None:
+                    continue
+                activity_date = EPOCH + timedelta(
+                    seconds=int(activities["activity_date"][position])
+                )
+                rows.extend(
+                    set_rows(
+                        int(activities["activity_id"][position]),
+                        athlete_id,
+                        activity_date,
+                        json.loads(activity_details[0]["intervals"]),
+                    )
+                )
+            if len(rows) >= BATCH_SIZE:
+                session.exec(insert(IntervalSet), params=rows)
+                indexed_sets += len(rows)
+                rows = []
+        if rows:
+            session.exec(insert(IntervalSet), params=rows)
+            indexed_sets += len(rows)
+        session.commit()
+    return indexed_sets
+
+
+def search_sets(
+    engine,
+    athlete_id,
+    intensity_label_v2=None,
+    min_intervals=None,
+    min_duration_s=None,
+    max_duration_s=None,
+    min_power_w=None,
+    start_date=None,
+    end_date=None,
+):
+    """
+    Finds the indexed sets of an athlete matching the given criteria.
+
+    For example, ">= 4 x VO2max efforts of 3-5 minutes above 400 W" is
+    search_sets(engine, athlete_id, "VO2max", 4, 180, 300, 400).
+
+    Args:
+        engine (Engine): Engine of the index.
+        athlete_id (int): The ID of the athlete.
+        intensity_label_v2 (str, optional): Intensity label of the set.
+        min_intervals (int, optional): Minimum number of intervals.
+        min_duration_s (float, optional): Minimum average interval duration.
+        max_duration_s (float, optional): Maximum average interval duration.
+        min_power_w (int, optional): Minimum weighted average power.
+        start_date (datetime, optional): First activity date.
+        end_date (datetime, optional): Last activity date.
+
+    Returns:
+        list: Matching sets, most recent first.
+    """
+    query = select(IntervalSet).where(IntervalSet.athlete_id == athlete_id)
+    if intensity_label_v2 is not None:
+        query = query.where(IntervalSet.intensity_label_v2 == intensity_label_v2)
+    if min_duration_s is not None:
+        query = query.where(IntervalSet.avg_duration_s >= min_duration_s)
+    if max_duration_s is not None:
+        query = query.where(IntervalSet.avg_duration_s <= max_duration_s)
+    if min_power_w is not None:
+        query = query.where(IntervalSet.avg_power_w >= min_power_w)
+    if min_intervals is not None:
+        query = query.where(IntervalSet.no_intervals >= min_intervals)
+    if start_date is not None:
+        query = query.where(IntervalSet.activity_date >= start_date)
+    if end_date is not None:
+        query = query.where(IntervalSet.activity_date <= end_date)
+    query = query.order_by(IntervalSet.activity_date.desc(), IntervalSet.set_index)
+
+    with Session(engine) as session:
+        return [row.model_dump() for row in session.exec(query).all()]
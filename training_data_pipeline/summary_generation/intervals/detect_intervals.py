@@ -0,0 +1,293 @@
+import numpy as np
+
+from graig_nlp.enums import Characteristic, IntensityV2
+
+# Define constants
+SMOOTHING_S = 5
+MIN_SEGMENT_S = 10
+SPRINT_MIN_S = 5
+MAX_RECOVERY_S = 300
+SPRINT_MAX_S = 30
+TORQUE_MAX_RPM = 70
+CADENCE_MIN_RPM = 105
+# Penalty of a change point, in noise variances per log of the stream length
+CHANGE_PENALTY = 3.0
+# Neighbouring segments closer than this fraction of critical power are merged
+MERGE_FRACTION = 0.05
+# Floor of the noise estimate in watts, for streams without noise
+MIN_NOISE_W = 1.0
+MAD_TO_STD = 1.4826
+
+# Upper bound of every zone as a fraction of critical power, from low to high
+ZONE_UPPER_BOUNDS = [0.8, 0.9, 1.05, 1.3, 2.0]
+ZONES = [
+    IntensityV2.AEROBIC,
+    IntensityV2.TEMPO,
+    IntensityV2.THRESHOLD,
+    IntensityV2.VO2MAX,
+    IntensityV2.ANAEROBIC,
+    IntensityV2.NEUROMUSCULAR,
+]
+AEROBIC_ZONE = 0
+ANAEROBIC_ZONE = len(ZONES) - 2
+NEUROMUSCULAR_ZONE = len(ZONES) - 1
+
+
+def rolling_mean(values, window):
+    """
+    Computes a centered rolling mean with a prefix sum.
+
+    Args:
+        values (ndarray): Values of every second.
+        window (int): Window length in seconds.
+
+    Returns:
+        ndarray: Rolling mean, over shorter windows at the edges.
+    """
+    prefix = np.concatenate(([0.0], np.cumsum(values)))
+    positions = np.arange(len(values))
+    starts = np.clip(positions - window // 2, 0, len(values))
+    ends = np.clip(positions + (window - window // 2), 0, len(values))
+    return (prefix[ends] - prefix[starts]) / (ends - starts)
+
+
+def classify_power(power, critical_power):
+    return np.searchsorted(
+        np.asarray(ZONE_UPPER_BOUNDS) * critical_power, power, side="right"
+    )
+
+
+def noise_scale(power, smoothing_s):
+    """
+    Estimates the standard deviation of the power noise around its rolling mean.
+
+    Args:
+        power (ndarray): Power of every second in watts.
+        smoothing_s (int): Rolling mean window in seconds.
+
+    Returns:
+        float: Noise standard deviation in watts.
+    """
+    residuals = power - rolling_mean(power, smoothing_s)
+    # The rolling mean includes the sample itself, which shrinks its residual
+    correction = np.sqrt(smoothing_s / max(smoothing_s - 1, 1))
+    return max(MAD_TO_STD * np.median(np.abs(residuals)) * correction, MIN_NOISE_W)
+
+
+def best_split(prefix, start, end, min_length):
+    """
+    Finds the split of a segment that most reduces its squared error around
+    the segment means.
+
+    Args:
+        prefix (ndarray): Prefix sum of the power.
+        start (int): Start of the segment.
+        end (int): End of the segment.
+        min_length (int): Minimum length of both parts in seconds.
+
+    Returns:
+        tuple: Split position and its cost reduction, None and 0 when the
+        segment is too short to split.
+    """
+    splits = np.arange(start + min_length, end - min_length + 1)
+    if not len(splits):
+        return None, 0.0
+    left_lengths = splits - start
+    right_lengths = end - splits
+    left_sums = prefix[splits] - prefix[start]
+    right_sums = prefix[end] - prefix[splits]
+    gains = (
+        (left_sums / left_lengths - right_sums / right_lengths) ** 2
+        * left_lengths
+        * right_lengths
+        / (end - start)
+    )
+    best = np.argmax(gains)
+    return splits[best], gains[best]
+
+
+def change_points(power, penalty, min_length):
+    """
+    Segments a stream by binary segmentation on mean shifts.
+
+    A segment is split where the split most reduces its squared error, as
+    long as that reduction exceeds the penalty.
+
+    Args:
+        power (ndarray): Power of every second in watts.
+        penalty (float): Minimum cost reduction of a change point.
+        min_length (int): Minimum segment length in seconds.
+
+    Returns:
+        tuple: Start of every segment, and the segment ends.
+    """
+    prefix = np.concatenate(([0.0], np.cumsum(power)))
+    splits = []
+    pending = [(0, len(power))]
+    while pending:
+        start, end = pending.pop()
+        split, gain = best_split(prefix, start, end, min_length)
+        if split is not None and gain > penalty:
+            splits.append(split)
+            pending.extend([(start, split), (split, end)])
+    starts = np.array([0, *sorted(splits)], dtype=np.int64)
+    return starts, np.append(starts[1:], len(power))
+
+
+def merge_similar_segments(power, starts, ends, min_difference):
+    """
+    Merges neighbouring segments whose means differ by less than min_difference,
+    closest pair first.
+
+    Args:
+        power (ndarray): Power of every second in watts.
+        starts (ndarray): Start of every segment.
+        ends (ndarray): End of every segment.
+        min_difference (float): Minimum mean difference in watts.
+
+    Returns:
+        tuple: Starts and ends of the merged segments.
+    """
+    starts = list(starts)
+    ends = list(ends)
+    sums = list(np.add.reduceat(power, starts))
+    while len(starts) > 1:
+        means = np.array(sums) / (np.array(ends) - np.array(starts))
+        differences = np.abs(np.diff(means))
+        i = int(np.argmin(differences))
+        if differences[i] >= min_difference:
+            break
+        ends[i] = ends.pop(i + 1)
+        starts.pop(i + 1)
+        sums[i] += sums.pop(i + 1)
+    return np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64)
+
+
+def merge_short_segments(zones, starts, ends, min_segment_s):
+    """
+    Relabels segments shorter than min_segment_s with the preceding segment's
+    zone, then merges neighbouring segments of equal zones. Anaerobic and
+    neuromuscular segments only need SPRINT_MIN_S, so that sprints survive.
+
+    Args:
+        zones (ndarray): Zone of every segment.
+        starts (ndarray): Start of every segment.
+        ends (ndarray): End of every segment.
+        min_segment_s (int): Minimum segment length in seconds.
+
+    Returns:
+        tuple: Starts and ends of the merged segments.
+    """
+    min_lengths = np.where(zones >= ANAEROBIC_ZONE, SPRINT_MIN_S, min_segment_s)
+    kept = (ends - starts) >= min_lengths
+    kept[0] = True
+    # Index of the last kept segment at or before every segment
+    source = np.maximum.accumulate(np.where(kept, np.arange(len(zones)), 0))
+    zones = zones[source]
+    boundaries = np.concatenate(([True], zones[1:] != zones[:-1]))
+    return starts[boundaries], np.append(starts[boundaries][1:], ends[-1])
+
+
+def segment_means(values, starts, ends):
+    return np.add.reduceat(values, starts) / (ends - starts)
+
+
+def detect_intervals(
+    power,
+    critical_power,
+    cadence=None,
+    heartrate=None,
+    speed=None,
+    smoothing_s=SMOOTHING_S,
+    min_segment_s=MIN_SEGMENT_S,
+):
+    """
+    Detects laps in a raw 1 Hz stream and classifies them against critical power.
+
+    Change points are placed by binary segmentation on mean shifts, with a
+    penalty scaled to the noise of the power around its rolling mean, so that
+    noise around a zone boundary does not split a steady effort. Neighbouring
+    segments closer than MERGE_FRACTION of critical power are merged, then
+    segments are classified on their average power and merged when too short.
+
+    Args:
+        power (array): Power of every second in watts; NaN counts as 0 W.
+        critical_power (float): Critical power of the athlete in watts.
+        cadence (array, optional): Cadence of every second in rpm.
+        heartrate (array, optional): Heart rate of every second in bpm.
+        speed (array, optional): Speed of every second in m/s.
+        smoothing_s (int, optional): Rolling mean window of the noise estimate
+            in seconds.
+        min_segment_s (int, optional): Minimum lap length in seconds.
+
+    Returns:
+        list: Laps in the shape of the activity intervals.
+    """
+    power = np.nan_to_num(np.asarray(power, dtype=np.float64))
+    if not len(power):
+        return []
+
+    penalty = CHANGE_PENALTY * noise_scale(power, smoothing_s) ** 2 * np.log(len(power))
+    starts, ends = change_points(power, penalty, SPRINT_MIN_S)
+    starts, ends = merge_similar_segments(
+        power, starts, ends, MERGE_FRACTION * critical_power
+    )
+    # Two passes: merging changes segment averages, which may change their zone
+    for _ in range(2):
+        zones = classify_power(segment_means(power, starts, ends), critical_power)
+        starts, ends = merge_short_segments(zones, starts, ends, min_segment_s)
+    zones = classify_power(segment_means(power, starts, ends), critical_power)
+
+    durations = ends - starts
+    averages = {"average_power": segment_means(power, starts, ends)}
+    for name, stream in [
+        ("average_cadence", cadence),
+        ("average_heartrate", heartrate),
+        ("average_speed", speed),
+    ]:
+        if stream is not None:
+            averages[name] = segment_means(
+                np.nan_to_num(np.asarray(stream, dtype=np.float64)), starts, ends
+            )
+
+    characteristics = np.full(len(zones), None, dtype=object)
+    efforts = zones > AEROBIC_ZONE
+    characteristics[
+        (zones == NEUROMUSCULAR_ZONE) & (durations <= SPRINT_MAX_S)
+    ] = Characteristic.MAXIMUM.value
+    if "average_cadence" in averages:
+        cadences = averages["average_cadence"]
+        unset = efforts & (characteristics == None)  # noqa: E711
+        characteristics[
+            unset & (cadences < TORQUE_MAX_RPM)
+        ] = Characteristic.TORQUE.value
+        characteristics[
+            unset & (cadences >= CADENCE_MIN_RPM)
+        ] = Characteristic.CADENCE.value
+    # Short aerobic segments between two efforts are recoveries within a set
+    between_efforts = np.zeros(len(zones), dtype=bool)
+    between_efforts[1:-1] = efforts[:-2] & efforts[2:]
+    characteristics[
+        (zones == AEROBIC_ZONE) & between_efforts & (durations <= MAX_RECOVERY_S)
+    ] = Characteristic.INTRA_RECOVERY.value
+
+    def lap_average(name, i, digits=None):
+        if name not in averages:
+            return None
+        return round(float(averages[name][i]), digits)
+
+    return [
+        {
+            "duration_s": int(durations[i]),
+            "distance_m": float(averages["average_speed"][i] * durations[i])
+            if "average_speed" in averages
+            else None,
+            "intensity_label_v2": ZONES[zones[i]].value,
+            "characteristic": characteristics[i],
+            "average_power": lap_average("average_power", i),
+            "average_heartrate": lap_average("average_heartrate", i),
+            "average_speed": lap_average("average_speed", i, 2),
+            "average_cadence": lap_average("average_cadence", i),
+        }
+        for i in range(len(zones))
+    ]
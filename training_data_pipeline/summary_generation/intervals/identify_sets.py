@@ -1,3 +1,11 @@
+from graig_nlp.enums import Characteristic, IntensityV2
+
+# Define constants
+# Labels of the shared enums, as carried by formatted intervals
+AEROBIC = IntensityV2.AEROBIC.label
+INTRA_RECOVERY = Characteristic.INTRA_RECOVERY.label
+
+
 def identify_interval_sets(intervals):
     """
     Identifies and filters interval sets based on specific criteria.
@@ -13,8 +21,8 @@ def identify_interval_sets(intervals):
         interval
         for interval in intervals
         if not (
-            interval.get("intensity_label_v2") == "Aerobic"
-            and interval.get("characteristic") == "Intra-Recovery"
+            interval.get("intensity_label_v2") == AEROBIC
+            and interval.get("characteristic") == INTRA_RECOVERY
         )
     ]
 
@@ -22,30 +30,31 @@ def identify_interval_sets(intervals):
     aerobic_indices = [
         i
         for i, interval in enumerate(filtered_intervals)
-        if interval.get("intensity_label_v2") == "Aerobic"
+        if interval.get("intensity_label_v2") == AEROBIC
     ]
 
     # Compute indices to remove based on consecutive 'Aerobic' intervals
-    indices_to_remove = []
+    indices_to_remove = set()
     if len(aerobic_indices) > 2:
         for i in range(1, len(aerobic_indices) - 1):
             if (aerobic_indices[i] - aerobic_indices[i - 1] == 2) and (
                 aerobic_indices[i + 1] - aerobic_indices[i] == 2
             ):
-                indices_to_remove.append(aerobic_indices[i])
+                indices_to_remove.add(aerobic_indices[i])
 
     # Filter out the identified indices
-    filtered_intervals = [
-        interval
-        for i, interval in enumerate(filtered_intervals)
-        if i not in indices_to_remove
-    ]
+    if indices_to_remove:
+        filtered_intervals = [
+            interval
+            for i, interval in enumerate(filtered_intervals)
+            if i not in indices_to_remove
+        ]
 
     # Update 'Aerobic' indices in the filtered intervals
     new_aerobic_indices = [
         i
         for i, interval in enumerate(filtered_intervals)
-        if interval.get("intensity_label_v2") == "Aerobic"
+        if interval.get("intensity_label_v2") == AEROBIC
     ]
 
     return filtered_intervals, new_aerobic_indices
@@ -3,6 +3,7 @@ import datetime
 from collections import defaultdict
 
 from graig_nlp.summary_generation.intervals.identify_sets import (
+    AEROBIC,
     create_dataframes,
     identify_interval_sets,
 )
@@ -191,30 +192,49 @@ def get_grouped_stats(data):
     return grouped_stats
 
 
-def process_intervals(intervals):
+def detect_separate_sets(intervals, intervals_length=None):
     """
-    Processes interval data to identify sets and generate formatted statistics.
+    Detects the sets of an activity, none when it has fewer than 2 efforts.
 
     Args:
-        intervals (list): List of interval data dictionaries.
+        intervals (list): List of formatted interval data dictionaries.
+        intervals_length (int, optional): Number of non 'Aerobic' intervals,
+            counted when not given.
 
     Returns:
-        list: List of formatted interval statistics.
+        list: Formatted intervals of every set.
     """
-    # Filter out 'Aerobic' intervals
-    intervals_ex_aerobic = [
-        entry for entry in intervals if entry["intensity_label_v2"] != "Aerobic"
-    ]
-    intervals_length = len(intervals_ex_aerobic)
+    if intervals_length is None:
+        intervals_length = sum(
+            entry["intensity_label_v2"] != AEROBIC for entry in intervals
+        )
 
     if intervals_length < 2:
         return []
 
     # Identify sets and create dataframes
     filtered_intervals, aerobic_indices = identify_interval_sets(intervals)
-    separate_sets = [
-        df for df in create_dataframes(filtered_intervals, aerobic_indices) if df
-    ]
+    return [df for df in create_dataframes(filtered_intervals, aerobic_indices) if df]
+
+
+def process_intervals(intervals):
+    """
+    Processes interval data to identify sets and generate formatted statistics.
+
+    Args:
+        intervals (list): List of interval data dictionaries.
+
+    Returns:
+        list: List of formatted interval statistics.
+    """
+    # Count non 'Aerobic' intervals
+    intervals_length = sum(
+        entry["intensity_label_v2"] != AEROBIC for entry in intervals
+    )
+
+    separate_sets = detect_separate_sets(intervals, intervals_length)
+    if not separate_sets:
+        return []
 
     # Get grouped statistics
     grouped_stats = [get_grouped_stats(s) for s in separate_sets]
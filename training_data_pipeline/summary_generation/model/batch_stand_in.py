@@ -0,0 +1,202 @@
+import argparse
+import json
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Define constants
+BATCHES_PATH = "/v1/messages/batches"
+DEFAULT_PROCESSING_S = 1.0
+STAND_IN_SUMMARY = "Stand-in summary."
+
+
+def stand_in_responder(params):
+    return STAND_IN_SUMMARY
+
+
+class StandInBatchHandler(BaseHTTPRequestHandler):
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != BATCHES_PATH:
+            self.send_json(404, {"type": "error", "error": {"type": "not_found_error"}})
+            return
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        batch_id = self.server.create_batch(body["requests"])
+        self.send_json(200, self.server.batch_object(batch_id))
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].rstrip("/")
+        if not parts.startswith(BATCHES_PATH + "/"):
+            self.send_json(404, {"type": "error", "error": {"type": "not_found_error"}})
+            return
+        batch_id, _, resource = parts[len(BATCHES_PATH) + 1 :].partition("/")
+        if batch_id not in self.server.batches:
+            self.send_json(404, {"type": "error", "error": {"type": "not_found_error"}})
+        elif resource == "results":
+            payload = "".join(
+                json.dumps(result) + "\n" for result in self.server.results(batch_id)
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/binary")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        else:
+            self.send_json(200, self.server.batch_object(batch_id))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInBatchServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the message batches API.
+
+    Batches end processing_s seconds after they are created. Every request is
+    answered with the text returned by responder(params); requests for which
+    it raises are reported as errored.
+    """
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        responder=stand_in_responder,
+        processing_s=DEFAULT_PROCESSING_S,
+    ):
+        super().__init__(address, StandInBatchHandler)
+        self.responder = responder
+        self.processing_s = processing_s
+        self.batches = {}
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def create_batch(self, requests):
+        batch_id = f"msgbatch_{uuid.uuid4().hex}"
+        with self.lock:
+            self.batches[batch_id] = {
+                "created_at": datetime.now(timezone.utc),
+                "requests": requests,
+            }
+        return batch_id
+
+    def has_ended(self, batch):
+        return datetime.now(timezone.utc) >= batch["created_at"] + timedelta(
+            seconds=self.processing_s
+        )
+
+    def batch_object(self, batch_id):
+        batch = self.batches[batch_id]
+        ended = self.has_ended(batch)
+        counts = dict.fromkeys(["succeeded", "errored", "canceled", "expired"], 0)
+        if ended:
+            for result in self.results(batch_id):
+                counts[result["result"]["type"]] += 1
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else len(batch["requests"]),
+                **counts,
+            },
+            "created_at": batch["created_at"].isoformat(),
+            "ended_at": (
+                batch["created_at"] + timedelta(seconds=self.processing_s)
+            ).isoformat()
+            if ended
+            else None,
+            "expires_at": (batch["created_at"] + timedelta(days=1)).isoformat(),
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"{self.base_url}{BATCHES_PATH}/{batch_id}/results"
+            if ended
+            else None,
+        }
+
+    def results(self, batch_id):
+        """
+        Answers every request of a batch once, on first access.
+
+        Args:
+            batch_id (str): ID of the batch.
+
+        Returns:
+            list: Result of every request, in request order.
+        """
+        batch = self.batches[batch_id]
+        with self.lock:
+            if "results" not in batch:
+                batch["results"] = [
+                    {"custom_id": request["custom_id"], "result": self.answer(request)}
+                    for request in batch["requests"]
+                ]
+        return batch["results"]
+
+    def answer(self, request):
+        params = request["params"]
+        try:
+            text = self.responder(params)
+        except Exception as e:
+            return {
+                "type": "errored",
+                "error": {
+                    "type": "error",
+                    "error": {"type": "api_error", "message": str(e)},
+                },
+            }
+        return {
+            "type": "succeeded",
+            "message": {
+                "id": f"msg_{uuid.uuid4().hex}",
+                "type": "message",
+                "role": "assistant",
+                "model": params["model"],
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {
+                    "input_tokens": len(json.dumps(params)) // 4,
+                    "output_tokens": len(text) // 4,
+                },
+            },
+        }
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve a local stand-in for the message batches API."
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--processing-s", type=float, default=DEFAULT_PROCESSING_S)
+    args = parser.parse_args()
+
+    server = StandInBatchServer(
+        ("127.0.0.1", args.port), processing_s=args.processing_s
+    )
+    print(f"Serving message batches at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
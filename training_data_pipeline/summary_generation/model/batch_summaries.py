@@ -0,0 +1,256 @@
+import hashlib
+import json
+import time
+from datetime import datetime
+
+import anthropic
+import streamlit as st
+from sqlmodel import Session, insert, select
+
+from graig_nlp.database import GeneratedSummary, get_local_db_engine
+from graig_nlp.summary_generation.model.summary_generator_model import (
+    DEFAULT_MODELS,
+    PROMPT_VERSION,
+    prompt_generator,
+)
+from graig_nlp.summary_generation.scheduler import slot, use_shared_slots
+
+# Define constants
+MAX_TOKENS = 1024
+# Same sampling as the interactive Anthropic chain of build_llm
+TEMPERATURE = 0.6
+MAX_BATCH_REQUESTS = 10000
+POLL_INTERVAL_S = 60
+BATCH_TIMEOUT_S = 24 * 3600
+
+
+def summary_key(llm_input, compact=True, model=None):
+    """
+    Hashes an LLM input with the prompt and model that summarize it.
+
+    Args:
+        llm_input (str): Encoded LLM input.
+        compact (bool, optional): Whether llm_input uses the compact encoding.
+        model (str, optional): Model name, the Anthropic default if omitted.
+
+    Returns:
+        str: SHA-256 of the input, encoding, model and PROMPT_VERSION.
+    """
+    model = model or DEFAULT_MODELS["anthropic"]
+    content = json.dumps([PROMPT_VERSION, model, compact, llm_input])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def get_summary_store(path):
+    """
+    Opens the local summary store, creating it if needed.
+
+    Args:
+        path (str): Path of the SQLite file.
+
+    Returns:
+        Engine: Engine of the summary store.
+    """
+    engine = get_local_db_engine(path)
+    GeneratedSummary.__table__.create(engine, checkfirst=True)
+    return engine
+
+
+def load_summary(engine, llm_input, compact=True, model=None):
+    """
+    Loads the stored summary of an LLM input.
+
+    Only summaries generated with the current PROMPT_VERSION and the given
+    model are returned.
+
+    Args:
+        engine (Engine): Engine of the summary store.
+        llm_input (str): Encoded LLM input.
+        compact (bool, optional): Whether llm_input uses the compact encoding.
+        model (str, optional): Model name, the Anthropic default if omitted.
+
+    Returns:
+        str: The summary, or None if it was never generated.
+    """
+    with Session(engine) as session:
+        stored = session.get(GeneratedSummary, summary_key(llm_input, compact, model))
+    return None if stored is None else stored.summary
+
+
+def get_batch_client(base_url=None):
+    """
+    Creates an Anthropic client for the message batches API.
+
+    Args:
+        base_url (str, optional): API base URL, e.g. of the local stand-in.
+
+    Returns:
+        Anthropic: The client.
+    """
+    if base_url is not None:
+        return anthropic.Anthropic(api_key="stand-in", base_url=base_url)
+    return anthropic.Anthropic(api_key=st.secrets.api_key.anthropic)
+
+
+def batch_request(llm_input, compact, model):
+    """
+    Renders the summary prompt of an LLM input as a batch request.
+
+    Args:
+        llm_input (str): Encoded LLM input.
+        compact (bool, optional): Whether llm_input uses the compact encoding.
+        model (str, optional): Model name, the Anthropic default if omitted.
+
+    Returns:
+        dict: Request with the summary key as custom_id.
+    """
+    system_message, human_message = prompt_generator(
+        compact, prompt_caching=True
+    ).format_messages(query=llm_input)
+    return {
+        "custom_id": summary_key(llm_input, compact, model),
+        "params": {
+            "model": model,
+            "max_tokens": MAX_TOKENS,
+            "temperature": TEMPERATURE,
+            "system": system_message.content,
+            "messages": [{"role": "user", "content": human_message.content}],
+        },
+    }
+
+
+def ended_batches(client, batch_ids, poll_interval_s, timeout_s):
+    """
+    Polls message batches, yielding every batch as soon as it has ended.
+
+    Args:
+        client (Anthropic): The client.
+        batch_ids (list): IDs of the message batches.
+        poll_interval_s (float): Seconds between polls.
+        timeout_s (float): Maximum wait for all batches in seconds.
+
+    Yields:
+        str: ID of an ended batch.
+    """
+    deadline = time.monotonic() + timeout_s
+    remaining = list(batch_ids)
+    while True:
+        for batch_id in list(remaining):
+            batch = client.messages.batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                remaining.remove(batch_id)
+                yield batch_id
+        if not remaining:
+            return
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Message batches {remaining} have not ended")
+        time.sleep(poll_interval_s)
+
+
+def store_batch_results(engine, client, batch_id, llm_inputs, model):
+    """
+    Writes the succeeded results of an ended batch to the summary store.
+
+    Args:
+        engine (Engine): Engine of the summary store.
+        client (Anthropic): The client.
+        batch_id (str): ID of the ended message batch.
+        llm_inputs (dict): LLM inputs keyed by summary key.
+        model (str): Model name.
+
+    Returns:
+        dict: Result counts by result type.
+    """
+    counts = {}
+    rows = []
+    created_at = datetime.now()
+    for response in client.messages.batches.results(batch_id):
+        counts[response.result.type] = counts.get(response.result.type, 0) + 1
+        if response.result.type != "succeeded":
+            continue
+        rows.append(
+            {
+                "summary_key": response.custom_id,
+                "llm_input": llm_inputs[response.custom_id],
+                "summary": "".join(
+                    block.text
+                    for block in response.result.message.content
+                    if block.type == "text"
+                ),
+                "model": model,
+                "prompt_version": PROMPT_VERSION,
+                "batch_id": batch_id,
+                "created_at": created_at,
+            }
+        )
+    if rows:
+        with engine.begin() as connection:
+            connection.execute(insert(GeneratedSummary).prefix_with("OR REPLACE"), rows)
+    return counts
+
+
+def summarize_batch(
+    engine,
+    llm_inputs,
+    client,
+    compact=True,
+    model=None,
+    poll_interval_s=POLL_INTERVAL_S,
+    timeout_s=BATCH_TIMEOUT_S,
+):
+    """
+    Generates the summaries of many LLM inputs through message batches.
+
+    Inputs already summarized with the model and PROMPT_VERSION are skipped.
+    The others are submitted at once in batches of up to MAX_BATCH_REQUESTS,
+    which are then polled together; the succeeded summaries of every batch
+    are written to the store as soon as it ends. Errored or expired requests
+    are left out of the store and are resubmitted by the next run. Batches
+    are created in batch class "llm" slots of the shared scheduler.
+
+    Args:
+        engine (Engine): Engine of the summary store.
+        llm_inputs (list): Encoded LLM inputs.
+        client (Anthropic): The client, see get_batch_client.
+        compact (bool, optional): Whether the inputs use the compact encoding.
+        model (str, optional): Model name, the Anthropic default if omitted.
+        poll_interval_s (float, optional): Seconds between polls.
+        timeout_s (float, optional): Maximum wait for all batches in seconds.
+
+    Returns:
+        dict: Number of stored inputs skipped and batch result counts by type.
+    """
+    model = model or DEFAULT_MODELS["anthropic"]
+    pending = {
+        summary_key(llm_input, compact, model): llm_input for llm_input in llm_inputs
+    }
+    keys = list(pending)
+    stored = set()
+    with Session(engine) as session:
+        for start in range(0, len(keys), MAX_BATCH_REQUESTS):
+            stored.update(
+                session.exec(
+                    select(GeneratedSummary.summary_key).where(
+                        GeneratedSummary.summary_key.in_(
+                            keys[start : start + MAX_BATCH_REQUESTS]
+                        )
+                    )
+                )
+            )
+    counts = {"stored": len(stored)}
+
+    missing = [key for key in keys if key not in stored]
+    use_shared_slots()
+    batch_ids = []
+    for start in range(0, len(missing), MAX_BATCH_REQUESTS):
+        requests = [
+            batch_request(pending[key], compact, model)
+            for key in missing[start : start + MAX_BATCH_REQUESTS]
+        ]
+        with slot("llm", "batch"):
+            batch_ids.append(client.messages.batches.create(requests=requests).id)
+    for batch_id in ended_batches(client, batch_ids, poll_interval_s, timeout_s):
+        batch_counts = store_batch_results(engine, client, batch_id, pending, model)
+        for result_type, count in batch_counts.items():
+            counts[result_type] = counts.get(result_type, 0) + count
+    return counts
@@ -0,0 +1,159 @@
+import json
+import math
+
+# Define constants
+KEY_ALIASES = {
+    "training_stimulus": "ts",
+    "duration_hms": "dur",
+    "distance_km": "km",
+    "elevation_gain_m": "elev_m",
+    "total_work_kj": "kj",
+    "avg_power_w": "w",
+    "avg_heartrate_bpm": "bpm",
+    "avg_speed_kph": "kph",
+    "avg_cadence_rpm": "rpm",
+    "avg_torque_nm": "nm",
+    "sets": "sets",
+    "intensity_label_v2": "int",
+    "no_intervals": "n",
+    "total_duration_hms": "tot_dur",
+    "avg_duration_hms": "avg_dur",
+    "total_distance_km": "tot_km",
+}
+
+KEY_DESCRIPTIONS = {
+    "ts": "training stimulus",
+    "dur": "duration",
+    "km": "distance in km",
+    "elev_m": "elevation gain in m",
+    "kj": "total work in kJ",
+    "w": "average power in W",
+    "bpm": "average heart rate",
+    "kph": "average speed in km/h",
+    "rpm": "average cadence",
+    "nm": "average torque in Nm",
+    "int": "intensity",
+    "n": "number of efforts",
+    "tot_dur": "total duration",
+    "avg_dur": "average duration",
+    "tot_km": "total distance in km",
+}
+
+# Sets are trimmed from the end of this order first
+INTENSITY_PRIORITY = [
+    "Maximum",
+    "Neuromuscular",
+    "Anaerobic",
+    "VO2max",
+    "Threshold",
+    "Tempo",
+    "Aerobic",
+    None,
+]
+
+CHARS_PER_TOKEN = 3.5
+DEFAULT_TOKEN_BUDGET = 800
+
+
+def estimate_tokens(text):
+    """
+    Estimates the number of LLM tokens of a text.
+
+    Args:
+        text (str): Text sent to or received from the LLM.
+
+    Returns:
+        int: Estimated number of tokens.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def compact_value(value):
+    """
+    Minifies keys and drops null or "NA" fields, recursively.
+
+    Args:
+        value: Value of the LLM input.
+
+    Returns:
+        The compacted value.
+    """
+    if isinstance(value, dict):
+        return {
+            KEY_ALIASES.get(key, key): compact_value(item)
+            for key, item in value.items()
+            if item not in [None, "NA"]
+        }
+    if isinstance(value, list):
+        return [compact_value(item) for item in value]
+    return value
+
+
+def set_priority(set_data):
+    """
+    Sort key of a set, most important first.
+
+    Args:
+        set_data (dict): Formatted set data.
+
+    Returns:
+        tuple: Intensity rank and negated number of intervals.
+    """
+    intensity = set_data.get("intensity_label_v2")
+    rank = (
+        INTENSITY_PRIORITY.index(intensity)
+        if intensity in INTENSITY_PRIORITY
+        else len(INTENSITY_PRIORITY)
+    )
+    return rank, -set_data.get("no_intervals", 0)
+
+
+def encode_llm_input(session_data, compact=False, token_budget=None):
+    """
+    Encodes session data, including its sets, as the LLM input.
+
+    Args:
+        session_data (dict): Formatted session data with a "sets" entry.
+        compact (bool, optional): Minify keys, drop null fields and whitespace.
+        token_budget (int, optional): Maximum estimated tokens. Sets are
+            trimmed by priority until the input fits.
+
+    Returns:
+        str: Encoded LLM input.
+    """
+
+    def encode(data):
+        if compact:
+            return json.dumps(compact_value(data), separators=(",", ":"))
+        return json.dumps(data, indent=4)
+
+    llm_input = encode(session_data)
+    if token_budget is None or estimate_tokens(llm_input) <= token_budget:
+        return llm_input
+
+    sets = session_data.get("sets", [])
+    kept = sorted(range(len(sets)), key=lambda i: set_priority(sets[i]))
+    while kept and estimate_tokens(llm_input) > token_budget:
+        kept.pop()
+        llm_input = encode({**session_data, "sets": [sets[i] for i in sorted(kept)]})
+    return llm_input
+
+
+def summary_input(session_data, sets_data, compact=True):
+    """
+    Encodes the LLM input of the intervals summary, as the app requests it.
+
+    Summaries are stored and cached by this input, so the app and the batch
+    jobs filling the summary store must both encode it here.
+
+    Args:
+        session_data (dict): Formatted session data.
+        sets_data (list): Formatted sets of the session.
+        compact (bool, optional): Whether to use the compact encoding.
+
+    Returns:
+        str: Encoded LLM input, within DEFAULT_TOKEN_BUDGET.
+    """
+    return encode_llm_input(
+        {**session_data, "sets": sets_data}, compact, DEFAULT_TOKEN_BUDGET
+    )
@@ -0,0 +1,196 @@
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from langchain_core.messages import AIMessage
+
+# Define constants
+WINDOW_SIZE = 100
+MIN_SAMPLES = 5
+MAX_ERROR_RATE = 0.5
+# An unhealthy provider is probed again after this long without calls
+HEALTH_COOLDOWN_S = 30.0
+
+
+def percentile(values, quantile):
+    """
+    Computes a percentile by the nearest-rank method.
+
+    Args:
+        values (list): Observed values.
+        quantile (float): Quantile between 0 and 1.
+
+    Returns:
+        float: The percentile, or None without values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[round(quantile * (len(ordered) - 1))]
+
+
+class ProviderStats:
+    """
+    Rolling latency and error statistics of one LLM provider.
+
+    A provider whose error rate is too high is unhealthy until cooldown_s
+    has passed since its last call; it is then healthy again for a probe.
+    A successful call of an unhealthy provider clears its error history.
+    """
+
+    def __init__(self, window_size=WINDOW_SIZE, cooldown_s=HEALTH_COOLDOWN_S):
+        self.latencies = deque(maxlen=window_size)
+        self.outcomes = deque(maxlen=window_size)
+        self.cooldown_s = cooldown_s
+        self.last_call_at = None
+        self.lock = threading.Lock()
+
+    def record(self, latency_s, success):
+        with self.lock:
+            if success and self.has_failed():
+                self.outcomes.clear()
+            self.outcomes.append(success)
+            self.last_call_at = time.monotonic()
+            if success:
+                self.latencies.append(latency_s)
+
+    def p50(self):
+        with self.lock:
+            return percentile(list(self.latencies), 0.5)
+
+    def p95(self):
+        with self.lock:
+            return percentile(list(self.latencies), 0.95)
+
+    def error_rate(self):
+        with self.lock:
+            if not self.outcomes:
+                return 0.0
+            return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def has_failed(self):
+        # Called under the lock
+        return (
+            len(self.outcomes) >= MIN_SAMPLES
+            and 1 - sum(self.outcomes) / len(self.outcomes) > MAX_ERROR_RATE
+        )
+
+    def is_healthy(self):
+        with self.lock:
+            return (
+                not self.has_failed()
+                or time.monotonic() - self.last_call_at >= self.cooldown_s
+            )
+
+    def snapshot(self):
+        return {
+            "p50_s": self.p50(),
+            "p95_s": self.p95(),
+            "error_rate": self.error_rate(),
+            "healthy": self.is_healthy(),
+        }
+
+
+class FakeProvider:
+    """
+    Local stand-in for an LLM chain with configurable latency and failures.
+    """
+
+    def __init__(self, latency_s, error_rate=0.0, response="Fake summary."):
+        self.latency_s = latency_s
+        self.error_rate = error_rate
+        self.response = response
+        self.calls = 0
+
+    def invoke(self, llm_data):
+        self.calls += 1
+        time.sleep(self.latency_s)
+        if random.random() < self.error_rate:
+            raise RuntimeError("Fake provider error")
+        return AIMessage(content=self.response)
+
+
+class LLMRouter:
+    """
+    Routes each request to the fastest healthy provider.
+
+    Providers are ranked by their rolling p50 latency; providers without
+    enough samples are tried first so that every provider gets measured.
+    With hedging, a duplicate request is sent to the next provider when the
+    first one has not answered within its p95 latency, and the first response
+    wins. A failed request fails over to the next provider.
+    """
+
+    def __init__(self, providers, hedge=False, max_workers=8):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = providers
+        self.stats = {name: ProviderStats() for name in providers}
+        self.hedge = hedge
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def ranked_providers(self):
+        healthy = [name for name in self.providers if self.stats[name].is_healthy()]
+        candidates = healthy or list(self.providers)
+        return sorted(
+            candidates,
+            key=lambda name: (
+                len(self.stats[name].latencies) >= MIN_SAMPLES,
+                self.stats[name].p50() or 0.0,
+            ),
+        )
+
+    def submit(self, name, llm_data):
+        # In a copy of the caller context, e.g. with its scheduler priority class
+        return self.executor.submit(
+            contextvars.copy_context().run, self.call, name, llm_data
+        )
+
+    def call(self, name, llm_data):
+        start = time.perf_counter()
+        try:
+            response = self.providers[name].invoke(llm_data)
+        except Exception:
+            self.stats[name].record(time.perf_counter() - start, False)
+            raise
+        self.stats[name].record(time.perf_counter() - start, True)
+        return name, response
+
+    def invoke(self, llm_data):
+        """
+        Sends a request to the best provider, hedging and failing over as configured.
+
+        Args:
+            llm_data (dict): Prompt variables.
+
+        Returns:
+            tuple: Name of the provider that answered, and its response.
+        """
+        ranked = self.ranked_providers()
+        pending = {self.submit(ranked[0], llm_data)}
+        remaining = ranked[1:]
+        error = None
+
+        hedge_after = self.stats[ranked[0]].p95() if self.hedge else None
+        if hedge_after is not None and remaining:
+            done, _ = wait(pending, timeout=hedge_after)
+            if not done:
+                pending.add(self.submit(remaining.pop(0), llm_data))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    error = e
+            if not pending and remaining:
+                pending = {self.submit(remaining.pop(0), llm_data)}
+
+        raise error
+
+    def snapshot(self):
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
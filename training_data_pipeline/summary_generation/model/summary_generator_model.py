@@ -1,62 +1,313 @@
+import time
+from collections import deque
+from functools import lru_cache
+
 import boto3
 import streamlit as st
 from langchain_anthropic import ChatAnthropic
 from langchain_aws import ChatBedrock
-from langchain_core.prompts.few_shot import FewShotPromptTemplate
-from langchain_core.prompts.prompt import PromptTemplate
-
-from graig_nlp.summary_generation.model.template import (
-    TEMPLATE,
-    EXAMPLES,
-)
-
-
-def prompt_generator():
-    example_prompt = PromptTemplate.from_template("input: {input}\n AI: {output}")
-    instructions = TEMPLATE
-    examples = EXAMPLES
-    input_query = """
-    input: {query}
-    """
-    prompt = FewShotPromptTemplate(
-        examples=examples,
-        example_prompt=example_prompt,
-        prefix=instructions,
-        suffix=input_query,
-        input_variables=["query"],
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+from graig_nlp.summary_generation.model.compaction import estimate_tokens
+from graig_nlp.summary_generation.model.router import LLMRouter
+from graig_nlp.summary_generation.model.template import few_shot_prefix
+from graig_nlp.summary_generation.scheduler import slot
+
+# Define constants
+DEFAULT_MODELS = {
+    "anthropic": "claude-3-haiku-20240307",
+    "bedrock": "anthropic.claude-3-haiku-20240307-v1:0",
+}
+# Bump whenever prompt_generator or the few-shot template changes, so that
+# summaries stored with the previous prompt are generated again
+PROMPT_VERSION = 1
+
+# Token counts and latency of the most recent LLM calls
+USAGE_LOG = deque(maxlen=1000)
+
+# Prebuilt chains keyed by provider, model and input encoding
+CHAINS = {}
+
+# Routers over the configured providers keyed by input encoding and hedging
+ROUTERS = {}
+
+
+@lru_cache(maxsize=None)
+def prompt_generator(compact=False, prompt_caching=False):
+    """
+    Builds the summary prompt once per configuration.
+
+    The instructions and few-shot examples are rendered into a static system
+    message, so only the query is formatted per call. With prompt_caching the
+    system message is marked as cacheable for providers that support it.
+
+    Args:
+        compact (bool, optional): Use the compact input encoding.
+        prompt_caching (bool, optional): Mark the static prefix as cacheable.
+
+    Returns:
+        ChatPromptTemplate: The summary prompt.
+    """
+    prefix = few_shot_prefix(compact)
+    if prompt_caching:
+        system_message = SystemMessage(
+            content=[
+                {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}
+            ]
+        )
+    else:
+        system_message = SystemMessage(content=prefix)
+    return ChatPromptTemplate.from_messages(
+        [system_message, ("human", "input: {query}")]
     )
-    return prompt
 
 
-def generate_summary(data, llm_client="anthropic"):
+def build_llm(llm_client, model):
+    """
+    Creates the chat model client of a provider.
+
+    Args:
+        llm_client (str): "anthropic" or "bedrock".
+        model (str): Model name or ID.
+
+    Returns:
+        BaseChatModel: The chat model.
+    """
     if llm_client == "anthropic":
         anthropic_api_key = st.secrets.api_key.anthropic
-        llm = ChatAnthropic(
-            model="claude-3-haiku-20240307",
+        return ChatAnthropic(
+            model=model,
             temperature=0.6,
             anthropic_api_key=anthropic_api_key,
-        )
-    else:
-        # Bedrock Client
-        bedrock_client = boto3.client(
-            "bedrock-runtime",
-            region_name=st.secrets.aws.AWS_REGION,
-            aws_access_key_id=st.secrets.aws.ACCESS_KEY,
-            aws_secret_access_key=st.secrets.aws.SECRET_ACCESS_KEY,
-            aws_session_token=st.secrets.aws.AWS_SESSION_TOKEN,
+            default_headers={"anthropic-beta": "prompt-caching-2024-07-31"},
         )
 
-        # Bedrock model
-        llm = ChatBedrock(
-            model_id="anthropic.claude-3-haiku-20240307-v1:0",
-            client=bedrock_client,
-            model_kwargs={"temperature": 0.2},
-        )
+    # Bedrock Client
+    bedrock_client = boto3.client(
+        "bedrock-runtime",
+        region_name=st.secrets.aws.AWS_REGION,
+        aws_access_key_id=st.secrets.aws.ACCESS_KEY,
+        aws_secret_access_key=st.secrets.aws.SECRET_ACCESS_KEY,
+        aws_session_token=st.secrets.aws.AWS_SESSION_TOKEN,
+    )
+
+    # Bedrock model
+    return ChatBedrock(
+        model_id=model,
+        client=bedrock_client,
+        model_kwargs={"temperature": 0.2},
+    )
+
+
+def get_chain(llm_client="anthropic", model=None, compact=False):
+    """
+    Returns the prebuilt prompt and model chain of a configuration.
+
+    Args:
+        llm_client (str, optional): "anthropic" or "bedrock".
+        model (str, optional): Model name or ID, the provider default if omitted.
+        compact (bool, optional): Use the compact input encoding.
+
+    Returns:
+        tuple: The prompt and the chain.
+    """
+    model = model or DEFAULT_MODELS[llm_client]
+    key = (llm_client, model, compact)
+    if key not in CHAINS:
+        prompt = prompt_generator(compact, prompt_caching=llm_client == "anthropic")
+        CHAINS[key] = (prompt, prompt | build_llm(llm_client, model))
+    return CHAINS[key]
+
+
+def record_usage(prompt, summary, latency_s, llm_client, compact):
+    """
+    Records the prompt and response token counts of an LLM call.
+
+    Provider-reported counts are used when available, estimates otherwise.
+
+    Args:
+        prompt (str): The rendered prompt.
+        summary (AIMessage): The LLM response.
+        latency_s (float): Duration of the call in seconds.
+        llm_client (str): The LLM provider.
+        compact (bool): Whether the compact input encoding was used.
+    """
+    usage = getattr(summary, "usage_metadata", None) or {}
+    USAGE_LOG.append(
+        {
+            "llm_client": llm_client,
+            "compact": compact,
+            "prompt_tokens": usage.get("input_tokens", estimate_tokens(prompt)),
+            "response_tokens": usage.get(
+                "output_tokens", estimate_tokens(message_text(summary))
+            ),
+            "latency_s": latency_s,
+        }
+    )
 
+
+def usage_stats(compact=None):
+    """
+    Averages the recorded token counts and latency.
+
+    Args:
+        compact (bool, optional): Only include calls with this input encoding.
+
+    Returns:
+        dict: Number of calls and average prompt tokens, response tokens and latency.
+    """
+    records = [
+        record
+        for record in USAGE_LOG
+        if compact is None or record["compact"] == compact
+    ]
+    if not records:
+        return {"calls": 0}
+    return {
+        "calls": len(records),
+        **{
+            f"avg_{key}": sum(record[key] for record in records) / len(records)
+            for key in ["prompt_tokens", "response_tokens", "latency_s"]
+        },
+    }
+
+
+def configured_providers():
+    """
+    Lists the providers whose credentials are present in the secrets.
+
+    Returns:
+        list: Provider names.
+    """
+    secret_sections = {"anthropic": "api_key", "bedrock": "aws"}
+    return [
+        provider
+        for provider, section in secret_sections.items()
+        if section in st.secrets
+    ]
+
+
+def get_router(compact=False, hedge=True):
+    """
+    Returns the router over warm chains of every configured provider.
+
+    Args:
+        compact (bool, optional): Use the compact input encoding.
+        hedge (bool, optional): Send hedged duplicates to the next provider.
+
+    Returns:
+        LLMRouter: The router.
+
+    Raises:
+        ValueError: If no provider has credentials in the secrets.
+    """
+    key = (compact, hedge)
+    if key not in ROUTERS:
+        providers = {
+            provider: get_chain(provider, compact=compact)[1]
+            for provider in configured_providers()
+        }
+        if not providers:
+            raise ValueError(
+                "No LLM provider is configured: add an [api_key] or [aws] "
+                "section to the Streamlit secrets"
+            )
+        ROUTERS[key] = LLMRouter(providers, hedge=hedge)
+    return ROUTERS[key]
+
+
+def generate_summary(data, llm_client="anthropic", compact=False, model=None):
     # intervals
     llm_data = {"query": data}
-    prompt = prompt_generator()
-    chain = prompt | llm
-    summary = chain.invoke(llm_data)
+    start = time.perf_counter()
+    with slot("llm"):
+        if llm_client == "router":
+            llm_client, summary = get_router(compact).invoke(llm_data)
+            prompt, _ = get_chain(llm_client, compact=compact)
+        else:
+            prompt, chain = get_chain(llm_client, model, compact)
+            summary = chain.invoke(llm_data)
+    record_usage(
+        prompt.format(**llm_data),
+        summary,
+        time.perf_counter() - start,
+        llm_client,
+        compact,
+    )
 
     return summary
+
+
+def message_text(message):
+    """
+    Extracts the text of a message or streamed message chunk.
+
+    Args:
+        message (BaseMessage): The message or chunk.
+
+    Returns:
+        str: Text of the message.
+    """
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(
+        block.get("text", "") for block in message.content if isinstance(block, dict)
+    )
+
+
+def stream_summary(data, llm_client="anthropic", compact=False, model=None):
+    """
+    Streams the summary text as the LLM generates it.
+
+    With the router, providers are tried in their ranked order: a provider
+    failing before its first text chunk fails over to the next one, while a
+    failure after text was streamed is raised. The latency or error of every
+    attempt is recorded in the router statistics. The response holds a
+    scheduler "llm" slot until it is fully streamed.
+
+    Args:
+        data (str): Encoded LLM input.
+        llm_client (str, optional): "anthropic", "bedrock" or "router".
+        compact (bool, optional): Use the compact input encoding.
+        model (str, optional): Model name or ID, the provider default if omitted.
+
+    Yields:
+        str: Text chunks of the summary.
+    """
+    llm_data = {"query": data}
+    router = None
+    candidates = [(llm_client, model)]
+    if llm_client == "router":
+        router = get_router(compact)
+        candidates = [(provider, None) for provider in router.ranked_providers()]
+
+    with slot("llm"):
+        for attempt, (provider, provider_model) in enumerate(candidates, start=1):
+            prompt, chain = get_chain(provider, provider_model, compact)
+            start = time.perf_counter()
+            summary = None
+            streamed = False
+            try:
+                for chunk in chain.stream(llm_data):
+                    summary = chunk if summary is None else summary + chunk
+                    text = message_text(chunk)
+                    if text:
+                        streamed = True
+                        yield text
+            except Exception as e:
+                if router is not None:
+                    router.stats[provider].record(time.perf_counter() - start, False)
+                if streamed or attempt == len(candidates):
+                    raise
+                print(f"Error streaming from {provider}, failing over: {e}")
+                continue
+
+            latency_s = time.perf_counter() - start
+            if router is not None:
+                router.stats[provider].record(latency_s, True)
+            if summary is not None:
+                record_usage(
+                    prompt.format(**llm_data), summary, latency_s, provider, compact
+                )
+            return
@@ -0,0 +1,116 @@
+import argparse
+import json
+from datetime import datetime
+
+import streamlit as st
+
+from graig_nlp.summary_generation.derived_features import get_feature_store
+from graig_nlp.summary_generation.format_table_data import (
+    format_interval_data,
+    format_session_data,
+    format_set_data,
+)
+from graig_nlp.summary_generation.model.batch_summaries import (
+    POLL_INTERVAL_S,
+    get_batch_client,
+    get_summary_store,
+    summarize_batch,
+)
+from graig_nlp.summary_generation.model.compaction import summary_input
+from graig_nlp.summary_generation.stream_extract import (
+    DEFAULT_BATCH_SIZE,
+    stream_activities,
+)
+
+# Define constants
+# Stores of the app, relative to the directory it runs from
+SUMMARY_STORE_PATH = ".streamlit/summaries.sqlite"
+FEATURE_STORE_PATH = ".streamlit/derived_features.sqlite"
+
+
+def activity_llm_input(activity):
+    """
+    Encodes the LLM input of a streamed activity, as the app does for its page.
+
+    Args:
+        activity (dict): Activity yielded by stream_activities with a feature
+            store, whose lap_features the app reads from the same store.
+
+    Returns:
+        str: Encoded LLM input.
+    """
+    details = dict(activity["activity_details"][0])
+    for key in ["Title", "Description", "intervals"]:
+        details.pop(key)
+    sets_data = format_set_data(format_interval_data(activity["lap_features"]))
+    return summary_input(format_session_data(details), sets_data)
+
+
+def summarize_activities(
+    source_engine,
+    feature_store,
+    store,
+    client,
+    batch_size=DEFAULT_BATCH_SIZE,
+    poll_interval_s=POLL_INTERVAL_S,
+    **filters,
+):
+    """
+    Fills the summary store with the summaries of the streamed activities.
+
+    Inputs are encoded as the app encodes them, so that the app finds the
+    stored summaries under the same summary_key. Activities already
+    summarized with the current model and prompt are skipped by
+    summarize_batch.
+
+    Args:
+        source_engine (Engine): Engine of the source database.
+        feature_store (Engine): Feature store of the app, see get_feature_store.
+        store (Engine): Summary store of the app, see get_summary_store.
+        client (Anthropic): The client, see get_batch_client.
+        batch_size (int, optional): Number of activities per streamed batch.
+        poll_interval_s (float, optional): Seconds between batch polls.
+        **filters: athlete_id, team_id, start_date and end_date of
+            stream_activities.
+
+    Returns:
+        dict: Result counts of summarize_batch.
+    """
+    llm_inputs = [
+        activity_llm_input(activity)
+        for batch in stream_activities(
+            source_engine, batch_size, feature_store=feature_store, **filters
+        )
+        for activity in batch
+    ]
+    return summarize_batch(store, llm_inputs, client, poll_interval_s=poll_interval_s)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarize activities through message batches for the app."
+    )
+    parser.add_argument("--athlete-id", type=int)
+    parser.add_argument("--team-id", type=int)
+    parser.add_argument("--start-date", type=datetime.fromisoformat)
+    parser.add_argument("--end-date", type=datetime.fromisoformat)
+    parser.add_argument("--summary-store", default=SUMMARY_STORE_PATH)
+    parser.add_argument("--feature-store", default=FEATURE_STORE_PATH)
+    parser.add_argument("--base-url", help="Base URL of e.g. the local stand-in")
+    args = parser.parse_args()
+
+    counts = summarize_activities(
+        st.connection("mysql", type="sql").engine,
+        get_feature_store(args.feature_store),
+        get_summary_store(args.summary_store),
+        get_batch_client(args.base_url),
+        athlete_id=args.athlete_id,
+        team_id=args.team_id,
+        start_date=args.start_date,
+        end_date=args.end_date,
+    )
+    print(json.dumps(counts, indent=2))
+
+
+if __name__ == "__main__":
+    main()
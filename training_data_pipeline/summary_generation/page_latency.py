@@ -0,0 +1,175 @@
+import argparse
+import copy
+import json
+import time
+from collections import defaultdict
+
+from graig_nlp.summary_generation.format_table_data import (
+    format_interval_data,
+    format_session_data,
+    format_set_data,
+)
+from graig_nlp.summary_generation.intervals.process_details_intervals import (
+    process_intervals,
+)
+from graig_nlp.summary_generation.model.compaction import summary_input
+from graig_nlp.summary_generation.model.summary_generator_model import stream_summary
+from graig_nlp.summary_generation.page_tasks import TaskGraph, follow_tasks
+from graig_nlp.summary_generation.personal_achievements.personal_achievements import (
+    process_personal_best,
+)
+from graig_nlp.summary_generation.replay import load_fixtures, timing_percentiles
+
+# Define constants
+FAKE_CHUNKS = 20
+DEFAULT_FAKE_LLM_S = 1.0
+SECTIONS = ["intervals", "personal_bests"]
+
+
+def fake_summary_stream(latency_s):
+    """
+    Builds a stand-in for stream_summary spreading latency_s over its chunks.
+
+    Args:
+        latency_s (float): Total duration of the streamed summary.
+
+    Returns:
+        callable: Generator function taking the LLM input.
+    """
+
+    def stream(llm_input):
+        for i in range(FAKE_CHUNKS):
+            time.sleep(latency_s / FAKE_CHUNKS)
+            yield f"chunk {i} "
+
+    return stream
+
+
+def router_summary_stream(llm_input):
+    return stream_summary(llm_input, "router", compact=True)
+
+
+def page_inputs(extract_result):
+    """
+    Prepares the tables the page renders before its summary stages.
+
+    Args:
+        extract_result (tuple): Result of extract_data.
+
+    Returns:
+        tuple: Activity peaks, peak values, session, sets and intervals data.
+    """
+    activity_data, _, activity_peaks, peak_values = copy.deepcopy(extract_result)
+    activity = activity_data[0]
+    activity.pop("Title")
+    activity.pop("Description")
+    intervals = json.loads(activity.pop("intervals"))
+    session_data = format_session_data(activity)
+    intervals_data = format_interval_data(intervals)
+    sets_data = format_set_data(intervals_data)
+    return activity_peaks, peak_values, session_data, sets_data, intervals_data
+
+
+def sequential_page(inputs, summary_stream):
+    """
+    Runs the summary stages one after the other, as the page did before TaskGraph.
+
+    The page blocked on the whole summary, then rendered it with the interval
+    stats as its first section, and the personal bests last.
+
+    Args:
+        inputs (tuple): Result of page_inputs.
+        summary_stream (callable): Generator function streaming the summary.
+
+    Returns:
+        dict: Total latency and latency of the first rendered section in seconds.
+    """
+    activity_peaks, peak_values, session_data, sets_data, intervals_data = inputs
+    start = time.perf_counter()
+    for _ in summary_stream(summary_input(session_data, sets_data)):
+        pass
+    process_intervals(intervals_data)
+    first_section_s = time.perf_counter() - start
+    process_personal_best(activity_peaks, peak_values)
+    return {"total": time.perf_counter() - start, "first_section": first_section_s}
+
+
+def concurrent_page(inputs, summary_stream):
+    """
+    Runs the summary stages on a TaskGraph, as the page does.
+
+    Args:
+        inputs (tuple): Result of page_inputs.
+        summary_stream (callable): Generator function streaming the summary.
+
+    Returns:
+        dict: Total latency and latency of the first rendered section in seconds.
+    """
+    activity_peaks, peak_values, session_data, sets_data, intervals_data = inputs
+    start = time.perf_counter()
+    graph = TaskGraph()
+    graph.add("personal_bests", process_personal_best, activity_peaks, peak_values)
+    graph.add("intervals", process_intervals, intervals_data)
+    graph.add("summary_input", summary_input, session_data, sets_data)
+    chunks = graph.add_stream("summary", summary_stream, after=["summary_input"])
+
+    first_section_s = None
+    for name, _ in follow_tasks(graph, set(SECTIONS), "summary", chunks):
+        if first_section_s is None and name in SECTIONS:
+            first_section_s = time.perf_counter() - start
+    return {"total": time.perf_counter() - start, "first_section": first_section_s}
+
+
+def measure_page_latency(fixtures_dir, summary_stream, repeat=1):
+    """
+    Measures page latency before and after running the stages concurrently.
+
+    Args:
+        fixtures_dir (str): Directory of fixtures captured by capture_activities.
+        summary_stream (callable): Generator function streaming the summary.
+        repeat (int, optional): Number of runs per fixture and mode.
+
+    Returns:
+        dict: Latency percentiles in milliseconds per mode and measure.
+    """
+    timings = defaultdict(list)
+    for extract_result in load_fixtures(fixtures_dir).values():
+        inputs = page_inputs(extract_result)
+        for _ in range(repeat):
+            for mode, page in [
+                ("sequential", sequential_page),
+                ("concurrent", concurrent_page),
+            ]:
+                for measure, value in page(inputs, summary_stream).items():
+                    timings[f"{mode}_{measure}"].append(value)
+    return timing_percentiles(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the page latency of captured activities."
+    )
+    parser.add_argument("fixtures_dir")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--fake-llm-s",
+        type=float,
+        default=DEFAULT_FAKE_LLM_S,
+        help="Duration of the stand-in summary stream.",
+    )
+    parser.add_argument(
+        "--router",
+        action="store_true",
+        help="Stream real summaries through the LLM router instead.",
+    )
+    args = parser.parse_args()
+
+    summary_stream = (
+        router_summary_stream if args.router else fake_summary_stream(args.fake_llm_s)
+    )
+    report = measure_page_latency(args.fixtures_dir, summary_stream, args.repeat)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+# Define constants
+POLL_INTERVAL_S = 0.05
+
+# Shared by every page run of the process
+SHARED_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="page-task")
+
+
+class TaskGraph:
+    """
+    Runs page stages on a shared executor as soon as their dependencies finish.
+
+    Each task is called with its own arguments followed by the results of its
+    dependencies. Task functions must not call Streamlit; results are rendered
+    by the script thread as they become ready. Tasks run in a copy of the
+    context they were added in, e.g. with its scheduler priority class.
+    """
+
+    def __init__(self, executor=SHARED_EXECUTOR):
+        self.executor = executor
+        self.futures = {}
+        self.timings = {}
+        self.submitted = set()
+        self.lock = threading.Lock()
+
+    def add(self, name, fn, *args, after=()):
+        """
+        Adds a task, submitting it once all its dependencies are done.
+
+        Args:
+            name (str): Name of the task.
+            fn (callable): Function computing the result.
+            *args: Arguments passed before the dependency results.
+            after (list, optional): Names of previously added tasks this task depends on.
+
+        Returns:
+            Future: The future result of the task.
+        """
+        future = Future()
+        self.futures[name] = future
+        context = contextvars.copy_context()
+
+        def execute():
+            start = time.perf_counter()
+            try:
+                dependency_results = [self.futures[d].result() for d in after]
+                result = fn(*args, *dependency_results)
+            except Exception as e:
+                self.timings[name] = time.perf_counter() - start
+                future.set_exception(e)
+            else:
+                self.timings[name] = time.perf_counter() - start
+                future.set_result(result)
+
+        def submit_when_ready(_=None):
+            with self.lock:
+                if name in self.submitted or not all(
+                    self.futures[d].done() for d in after
+                ):
+                    return
+                self.submitted.add(name)
+            self.executor.submit(context.run, execute)
+
+        for dependency in after:
+            self.futures[dependency].add_done_callback(submit_when_ready)
+        submit_when_ready()
+        return future
+
+    def add_stream(self, name, generator_fn, *args, after=()):
+        """
+        Adds a task consuming a generator, forwarding every item to a queue.
+
+        The task result is the concatenation of all items.
+
+        Args:
+            name (str): Name of the task.
+            generator_fn (callable): Function returning the generator.
+            *args: Arguments passed before the dependency results.
+            after (list, optional): Names of previously added tasks this task depends on.
+
+        Returns:
+            Queue: Items in the order they were produced.
+        """
+        items = queue.Queue()
+
+        def consume(*fn_args):
+            result = ""
+            for item in generator_fn(*fn_args):
+                result += item
+                items.put(item)
+            return result
+
+        self.add(name, consume, *args, after=after)
+        return items
+
+    def result(self, name):
+        return self.futures[name].result()
+
+    def done(self, name):
+        return self.futures[name].done()
+
+    def wait_any(self, names, timeout):
+        """
+        Waits until one of the given tasks is done or the timeout expires.
+
+        Args:
+            names (set): Names of the tasks to wait for.
+            timeout (float): Maximum wait in seconds.
+
+        Returns:
+            set: Names of the given tasks that are done.
+        """
+        wait(
+            [self.futures[name] for name in names],
+            timeout=timeout,
+            return_when=FIRST_COMPLETED,
+        )
+        return {name for name in names if self.futures[name].done()}
+
+
+def drain_queue(items):
+    """
+    Takes every item currently in a queue without blocking.
+
+    Args:
+        items (Queue): Queue of text chunks.
+
+    Returns:
+        str: The concatenated chunks.
+    """
+    chunks = []
+    while True:
+        try:
+            chunks.append(items.get_nowait())
+        except queue.Empty:
+            return "".join(chunks)
+
+
+def follow_tasks(graph, names, stream_name, items, poll_interval_s=POLL_INTERVAL_S):
+    """
+    Yields task results and streamed items as they become ready.
+
+    Only tasks that are not done yet are waited for, so the caller never
+    spins once the stream has ended before the other tasks.
+
+    Args:
+        graph (TaskGraph): The task graph.
+        names (set): Names of the tasks whose results are yielded.
+        stream_name (str): Name of the stream task, see TaskGraph.add_stream.
+        items (Queue): Queue returned by add_stream.
+        poll_interval_s (float, optional): Maximum wait between stream drains.
+
+    Yields:
+        tuple: Name of a task and its result, or stream_name and the text
+        streamed since the previous yield.
+    """
+    pending = set(names)
+    while pending or not graph.done(stream_name):
+        waiting = pending if graph.done(stream_name) else pending | {stream_name}
+        for name in graph.wait_any(waiting, timeout=poll_interval_s) & pending:
+            pending.remove(name)
+            yield name, graph.result(name)
+
+        chunk = drain_queue(items)
+        if chunk:
+            yield stream_name, chunk
+
+    chunk = drain_queue(items)
+    if chunk:
+        yield stream_name, chunk
+    # Raises the error of a failed stream
+    graph.result(stream_name)
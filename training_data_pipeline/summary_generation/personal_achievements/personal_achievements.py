@@ -1,22 +1,6 @@
 from datetime import datetime
 
-
-# Function to convert seconds to specified format
-def format_duration(seconds):
-    if seconds < 60:
-        return f"{int(seconds)}s"
-    elif seconds < 3600:
-        minutes = seconds / 60
-        if minutes.is_integer():
-            return f"{int(minutes)}m"
-        else:
-            return f"{minutes:.1f}m"
-    else:
-        hours = seconds / 3600
-        if hours.is_integer():
-            return f"{int(hours)}h"
-        else:
-            return f"{hours:.1f}h"
+from graig_nlp.utils import format_record_duration
 
 
 def create_record_dict(records):
@@ -34,7 +18,7 @@ def update_stats(stats, duration, current_value, previous_value):
     power_increase = current_value - previous_value
     if current_value > stats["max_value"]:
         stats["max_value"] = current_value
-        stats["max_duration"] = format_duration(duration)
+        stats["max_duration"] = format_record_duration(duration)
 
     if percentage_increase > stats["max_increase_percentage"]:
         stats["max_increase_percentage"] = percentage_increase
@@ -42,7 +26,7 @@ def update_stats(stats, duration, current_value, previous_value):
     stats["total_increase_percentage"] += percentage_increase
     stats["count"] += 1
     records = {
-        "duration": format_duration(duration),
+        "duration": format_record_duration(duration),
         "current_value": current_value,
         "previous_value": previous_value,
         "power_increase": power_increase,
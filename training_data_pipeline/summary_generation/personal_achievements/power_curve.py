@@ -0,0 +1,98 @@
+import numpy as np
+
+from graig_nlp.utils import RECORD_DURATIONS
+
+
+def resample_1hz(timestamps, power):
+    """
+    Resamples a power stream to 1 Hz, filling recording gaps with 0 W.
+
+    Args:
+        timestamps (array): Sample times in seconds, increasing.
+        power (array): Power of every sample in watts.
+
+    Returns:
+        ndarray: Power of every second since the first sample.
+
+    Raises:
+        ValueError: If there are no timestamps, or they are not increasing.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if not len(timestamps):
+        raise ValueError("Cannot resample a stream without samples")
+    if (np.diff(timestamps) <= 0).any():
+        raise ValueError("Timestamps of the stream must be increasing")
+
+    seconds = np.round(timestamps).astype(np.int64)
+    seconds -= seconds[0]
+    resampled = np.zeros(seconds[-1] + 1)
+    resampled[seconds] = np.asarray(power, dtype=np.float64)
+    return np.nan_to_num(resampled)
+
+
+def dense_durations(length):
+    """
+    Durations of a full power curve: every second up to 10 minutes, every
+    5 seconds up to 1 hour, then every 30 seconds.
+
+    Args:
+        length (int): Length of the stream in seconds.
+
+    Returns:
+        ndarray: Durations in seconds, up to the stream length.
+    """
+    durations = np.concatenate(
+        [
+            np.arange(1, 601),
+            np.arange(605, 3601, 5),
+            np.arange(3630, max(length, 3630) + 1, 30),
+        ]
+    )
+    return durations[durations <= length]
+
+
+def mean_max_power(power, durations=None):
+    """
+    Computes the mean-maximal power of a 1 Hz stream for every duration.
+
+    Window sums come from a prefix sum, so each duration is a single
+    vectorized O(n) pass instead of re-summing every window.
+
+    Args:
+        power (array): Power of every second in watts; NaN counts as 0 W.
+        durations (array, optional): Durations in seconds, the record
+            profile durations by default.
+
+    Returns:
+        tuple: Durations within the stream length, and their mean-maximal power.
+    """
+    power = np.nan_to_num(np.asarray(power, dtype=np.float64))
+    durations = np.asarray(
+        RECORD_DURATIONS if durations is None else durations, dtype=np.int64
+    )
+    durations = durations[(durations > 0) & (durations <= len(power))]
+
+    prefix = np.concatenate(([0.0], np.cumsum(power)))
+    values = np.empty(len(durations))
+    for i, duration in enumerate(durations):
+        values[i] = (prefix[duration:] - prefix[:-duration]).max() / duration
+    return durations, values
+
+
+def compute_activity_peaks(power, durations=None):
+    """
+    Computes activity peaks from a raw 1 Hz power stream.
+
+    Args:
+        power (array): Power of every second in watts.
+        durations (array, optional): Durations in seconds, the record
+            profile durations by default.
+
+    Returns:
+        list: Activity peaks, in the shape returned by fetch_activity_peaks.
+    """
+    durations, values = mean_max_power(power, durations)
+    return [
+        {"duration": float(duration), "current_value": round(float(value), 1)}
+        for duration, value in zip(durations, values)
+    ]
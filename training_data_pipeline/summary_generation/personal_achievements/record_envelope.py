@@ -0,0 +1,122 @@
+import threading
+import time
+
+# Define constants
+PEAK_VALUE_KEYS = ["past_8_weeks_record", "past_year_record", "all_time_record"]
+# Narrower than the 8 weeks of fetch_peak_values, so that every observed
+# activity is surely inside the queried window
+WINDOW_DAYS = 55
+MAX_OBSERVATIONS = 1024
+# Same as the TTL of the extract_data queries: deletions and downward
+# corrections made by other processes never reach invalidate, so observed
+# peaks must not outlive the query results they were read from
+OBSERVATION_TTL_S = 600
+
+
+def no_peak_values():
+    return {key: [] for key in PEAK_VALUE_KEYS}
+
+
+class RecordEnvelope:
+    """
+    Per-athlete peaks of the activities already processed.
+
+    The maxima of the observed activities within the 8 weeks before an
+    activity are a lower bound of its past_8_weeks_record values, which are
+    in turn below the past-year and all-time ones. An activity whose peaks
+    all stay under that envelope cannot break any record, so its window
+    queries can be skipped.
+
+    Observations expire after ttl_s, so peaks of an activity since deleted or
+    corrected downward cannot hide a record for longer than the query cache.
+    """
+
+    def __init__(self, max_observations=MAX_OBSERVATIONS, ttl_s=OBSERVATION_TTL_S):
+        self.max_observations = max_observations
+        self.ttl_s = ttl_s
+        # Day, observation time and peaks keyed by activity ID, keyed by athlete ID
+        self.observations = {}
+        self.lock = threading.Lock()
+        self.skipped = 0
+        self.queried = 0
+
+    def observe(self, athlete_id, activity_id, activity_date, activity_peaks):
+        """
+        Records the peaks of a processed activity.
+
+        Args:
+            athlete_id (int): The ID of the athlete.
+            activity_id (int): The ID of the activity.
+            activity_date (datetime): The date of the activity.
+            activity_peaks (list): Peaks as returned by fetch_activity_peaks.
+        """
+        peaks = {
+            peak["duration"]: peak["current_value"]
+            for peak in activity_peaks
+            if peak["current_value"] is not None
+        }
+        now = time.time()
+        with self.lock:
+            athlete = self.observations.setdefault(athlete_id, {})
+            for key in [
+                key for key, entry in athlete.items() if now - entry[1] > self.ttl_s
+            ]:
+                del athlete[key]
+            athlete[int(activity_id)] = (activity_date.toordinal(), now, peaks)
+            if len(athlete) > self.max_observations:
+                del athlete[min(athlete, key=lambda key: athlete[key][0])]
+
+    def prior_maxima(self, athlete_id, activity_date):
+        """
+        Computes the maxima of the unexpired observations in the 8-week window.
+
+        Args:
+            athlete_id (int): The ID of the athlete.
+            activity_date (datetime): The date of the activity.
+
+        Returns:
+            dict: Maximum value keyed by duration.
+        """
+        day = activity_date.toordinal()
+        now = time.time()
+        maxima = {}
+        with self.lock:
+            observations = list(self.observations.get(athlete_id, {}).values())
+        for observed_day, observed_at, peaks in observations:
+            if now - observed_at > self.ttl_s:
+                continue
+            if not day - WINDOW_DAYS <= observed_day < day:
+                continue
+            for duration, value in peaks.items():
+                if duration not in maxima or value > maxima[duration]:
+                    maxima[duration] = value
+        return maxima
+
+    def can_skip(self, athlete_id, activity_date, activity_peaks):
+        """
+        Checks whether an activity cannot break any record.
+
+        Args:
+            athlete_id (int): The ID of the athlete.
+            activity_date (datetime): The date of the activity.
+            activity_peaks (list): Peaks as returned by fetch_activity_peaks.
+
+        Returns:
+            bool: Whether every peak is at most its envelope value.
+        """
+        maxima = self.prior_maxima(athlete_id, activity_date)
+        skip = all(
+            peak["duration"] in maxima
+            and peak["current_value"] <= maxima[peak["duration"]]
+            for peak in activity_peaks
+        )
+        if skip:
+            self.skipped += 1
+        else:
+            self.queried += 1
+        return skip
+
+    def invalidate(self, activity_id):
+        with self.lock:
+            for athlete in self.observations.values():
+                athlete.pop(int(activity_id), None)
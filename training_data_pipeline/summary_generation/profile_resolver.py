@@ -0,0 +1,146 @@
+import numpy as np
+
+from graig_nlp.summary_generation.replica import nearest_values, to_float, to_seconds
+from graig_nlp.summary_generation.scheduler import scheduled_query
+
+# Define query constants
+ATHLETE_QUERY = """
+SELECT u.first_name, u.last_name, p.team_id
+FROM `interface-db-prod-1`.`profiles_athlete` p
+LEFT JOIN `interface-db-prod-1`.`accounts_useraccount` u ON u.id = p.user_id
+WHERE p.id = :athlete_id
+"""
+
+WEIGHT_SERIES_QUERY = """
+SELECT m.date, m.value
+FROM `interface-db-prod-1`.metrics_metric AS m
+WHERE m.athlete_id = :athlete_id
+AND m.metric_type = 'WG'
+AND m.unit = 'kg'
+ORDER BY m.date
+"""
+
+CRITICAL_POWER_SERIES_QUERY = """
+SELECT e.date, e.critical_power AS value
+FROM `interface-db-prod-1`.daily_metrics_dailyestimation AS e
+WHERE e.athlete_id = :athlete_id
+ORDER BY e.date
+"""
+
+
+def fetch_metric_series(query, connection, athlete_id):
+    """
+    Fetches the dated metric history of an athlete.
+
+    Args:
+        query (str): SQL query to execute.
+        connection (object): Database connection object.
+        athlete_id (int): The ID of the athlete.
+
+    Returns:
+        tuple: Sorted epoch seconds and the value at every date.
+    """
+    series = scheduled_query(
+        connection, query, params={"athlete_id": athlete_id}, ttl=600
+    )
+    series = series.sort_values("date")
+    return to_seconds(series["date"]), to_float(series["value"])
+
+
+class ProfileResolver:
+    """
+    Resolves athlete profiles of many activities without per-activity queries.
+
+    The name, weight series and critical power series of every athlete are
+    loaded once; the weight and critical power of an activity are then the
+    values of the nearest dates, as in ATHLETE_PROFILE_QUERY, found for all
+    activities of the athlete at once.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.athletes = {}
+
+    def athlete(self, athlete_id):
+        if athlete_id not in self.athletes:
+            details = scheduled_query(
+                self.connection,
+                ATHLETE_QUERY,
+                params={"athlete_id": athlete_id},
+                ttl=600,
+            ).to_dict(orient="records")
+            self.athletes[athlete_id] = {
+                "details": details[0] if details else {},
+                "weight": fetch_metric_series(
+                    WEIGHT_SERIES_QUERY, self.connection, athlete_id
+                ),
+                "critical_power": fetch_metric_series(
+                    CRITICAL_POWER_SERIES_QUERY, self.connection, athlete_id
+                ),
+            }
+        return self.athletes[athlete_id]
+
+    def resolve(self, athlete_id, activity_dates, restrict=None):
+        """
+        Resolves the profile details of activities of one athlete.
+
+        Args:
+            athlete_id (int): The ID of the athlete.
+            activity_dates (list): Date of every activity.
+            restrict (int, optional): Restrict data by team ID.
+
+        Returns:
+            list: Profile details of every activity, in the shape of a
+            fetch_profile_details row, or None when restricted.
+        """
+        athlete = self.athlete(athlete_id)
+        details = athlete["details"]
+        if restrict and details.get("team_id") != restrict:
+            return [None] * len(activity_dates)
+
+        targets = np.array(activity_dates, dtype="datetime64[s]").astype(np.int64)
+        metrics = {
+            name: nearest_values(*athlete[name], targets)
+            for name in ["weight", "critical_power"]
+        }
+        return [
+            {
+                "first_name": details.get("first_name"),
+                "last_name": details.get("last_name"),
+                "weight": None if np.isnan(weight) else float(weight),
+                "critical_power": None if np.isnan(cp) else float(cp),
+                "athlete_id": athlete_id,
+                "activity_date": activity_date,
+            }
+            for activity_date, weight, cp in zip(
+                activity_dates, metrics["weight"], metrics["critical_power"]
+            )
+        ]
+
+    def resolve_activities(self, activities, restrict=None):
+        """
+        Resolves the profile details of activities of any athletes.
+
+        Args:
+            activities (list): Activities with activity_id, athlete_id and
+            activity_date.
+            restrict (int, optional): Restrict data by team ID.
+
+        Returns:
+            dict: Profile details keyed by activity ID, without restricted ones.
+        """
+        by_athlete = {}
+        for activity in activities:
+            by_athlete.setdefault(activity["athlete_id"], []).append(activity)
+
+        profiles = {}
+        for athlete_id, athlete_activities in by_athlete.items():
+            resolved = self.resolve(
+                athlete_id,
+                [activity["activity_date"] for activity in athlete_activities],
+                restrict,
+            )
+            for activity, profile in zip(athlete_activities, resolved):
+                if profile is not None:
+                    profiles[activity["activity_id"]] = profile
+        return profiles
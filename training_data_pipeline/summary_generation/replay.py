@@ -0,0 +1,283 @@
+import argparse
+import copy
+import gzip
+import json
+import pickle
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from graig_nlp.summary_generation.extract_data import extract_data
+from graig_nlp.summary_generation.format_table_data import (
+    format_interval_data,
+    format_session_data,
+    format_set_data,
+)
+from graig_nlp.summary_generation.intervals.process_details_intervals import (
+    process_intervals,
+)
+from graig_nlp.summary_generation.model.compaction import (
+    DEFAULT_TOKEN_BUDGET,
+    encode_llm_input,
+)
+from graig_nlp.summary_generation.model.router import percentile
+from graig_nlp.summary_generation.model.summary_generator_model import (
+    prompt_generator,
+)
+from graig_nlp.summary_generation.personal_achievements.personal_achievements import (
+    process_personal_best,
+)
+from graig_nlp.summary_generation.scheduler import use_shared_slots, workload
+
+# Define constants
+FIXTURE_SUFFIX = ".pkl.gz"
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+STUB_SUMMARY = "Stubbed summary."
+
+
+def fixture_path(fixtures_dir, activity_id):
+    return Path(fixtures_dir) / f"{int(activity_id)}{FIXTURE_SUFFIX}"
+
+
+def capture_activities(activity_ids, connection, fixtures_dir, restrict=None):
+    """
+    Records the raw extract_data result of every activity as a fixture.
+
+    The record envelope is bypassed, so that fixtures hold the queried peak
+    values even for activities the envelope would skip. Queries run as batch
+    work of the shared scheduler.
+
+    Args:
+        activity_ids (list): IDs of the activities to capture.
+        connection (object): Database connection object.
+        fixtures_dir (str): Directory of the compressed fixtures.
+        restrict (int, optional): Restrict data by team ID.
+
+    Returns:
+        list: IDs of the captured activities, missing activities are skipped.
+    """
+    Path(fixtures_dir).mkdir(parents=True, exist_ok=True)
+    use_shared_slots()
+    captured = []
+    for activity_id in activity_ids:
+        with workload("batch"):
+            result = extract_data(activity_id, connection, restrict, envelope=None)
+        if result[0] is None:
+            continue
+        with gzip.open(fixture_path(fixtures_dir, activity_id), "wb") as file:
+            pickle.dump(result, file)
+        captured.append(activity_id)
+    return captured
+
+
+def load_fixtures(fixtures_dir):
+    """
+    Loads every fixture of a directory, in activity ID order.
+
+    Args:
+        fixtures_dir (str): Directory of the compressed fixtures.
+
+    Returns:
+        dict: extract_data results keyed by activity ID.
+    """
+    paths = sorted(
+        Path(fixtures_dir).glob(f"*{FIXTURE_SUFFIX}"),
+        key=lambda path: int(path.name.removesuffix(FIXTURE_SUFFIX)),
+    )
+    fixtures = {}
+    for path in paths:
+        with gzip.open(path, "rb") as file:
+            fixtures[int(path.name.removesuffix(FIXTURE_SUFFIX))] = pickle.load(file)
+    return fixtures
+
+
+def render_prompt(llm_input):
+    return prompt_generator(compact=True).format_messages(query=llm_input)
+
+
+def stub_llm(prompt_messages):
+    return STUB_SUMMARY
+
+
+def run_pipeline(extract_result, timings, llm=stub_llm):
+    """
+    Runs the page pipeline on an extract_data result, timing every stage.
+
+    Args:
+        extract_result (tuple): Result of extract_data.
+        timings (defaultdict): Durations in seconds, appended per stage.
+        llm (callable, optional): Called with the prompt messages instead of the LLM.
+
+    Returns:
+        dict: Output of every stage.
+    """
+    activity_data, _, activity_peaks, peak_values = copy.deepcopy(extract_result)
+    outputs = {}
+
+    def stage(name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings[name].append(time.perf_counter() - start)
+        return result
+
+    activity = activity_data[0]
+    activity.pop("Title")
+    activity.pop("Description")
+    intervals = json.loads(activity.pop("intervals"))
+
+    outputs["session"] = stage("format_session_data", format_session_data, activity)
+    outputs["intervals"] = stage(
+        "format_interval_data", format_interval_data, intervals
+    )
+    outputs["sets"] = stage("format_set_data", format_set_data, outputs["intervals"])
+    outputs["interval_stats"] = stage(
+        "process_intervals", process_intervals, outputs["intervals"]
+    )
+    outputs["personal_bests"] = stage(
+        "process_personal_best", process_personal_best, activity_peaks, peak_values
+    )
+    outputs["llm_input"] = stage(
+        "encode_llm_input",
+        encode_llm_input,
+        {**outputs["session"], "sets": outputs["sets"]},
+        True,
+        DEFAULT_TOKEN_BUDGET,
+    )
+    prompt_messages = stage("prompt", render_prompt, outputs["llm_input"])
+    outputs["summary"] = stage("llm", llm, prompt_messages)
+    return outputs
+
+
+def replay(fixtures_dir, repeat=1, llm=stub_llm):
+    """
+    Pushes every fixture through the pipeline.
+
+    Args:
+        fixtures_dir (str): Directory of the compressed fixtures.
+        repeat (int, optional): Number of runs per fixture, for stable timings.
+        llm (callable, optional): Called with the prompt messages instead of the LLM.
+
+    Returns:
+        tuple: Outputs keyed by activity ID, and stage durations.
+    """
+    timings = defaultdict(list)
+    outputs = {}
+    for activity_id, extract_result in load_fixtures(fixtures_dir).items():
+        for _ in range(repeat):
+            outputs[activity_id] = run_pipeline(extract_result, timings, llm)
+    return outputs, dict(timings)
+
+
+def timing_percentiles(timings):
+    """
+    Summarizes stage durations as percentiles in milliseconds.
+
+    Args:
+        timings (dict): Durations in seconds per stage.
+
+    Returns:
+        dict: Percentiles per stage.
+    """
+    return {
+        stage: {
+            name: round(percentile(durations, quantile) * 1000, 4)
+            for name, quantile in QUANTILES.items()
+        }
+        for stage, durations in timings.items()
+    }
+
+
+def normalize_outputs(outputs):
+    # Round-trips through JSON so that captured and baseline outputs compare alike
+    return json.loads(json.dumps(outputs, default=str, sort_keys=True))
+
+
+def save_baseline(path, outputs, timings):
+    """
+    Stores outputs and timing percentiles as the baseline of later replays.
+
+    Args:
+        path (str): Path of the compressed baseline.
+        outputs (dict): Outputs keyed by activity ID.
+        timings (dict): Stage durations.
+    """
+    baseline = {
+        "outputs": normalize_outputs({str(k): v for k, v in outputs.items()}),
+        "percentiles": timing_percentiles(timings),
+    }
+    with gzip.open(path, "wt") as file:
+        json.dump(baseline, file)
+
+
+def compare_with_baseline(path, outputs, timings):
+    """
+    Diffs outputs and timing percentiles against a stored baseline.
+
+    Args:
+        path (str): Path of the compressed baseline.
+        outputs (dict): Outputs keyed by activity ID.
+        timings (dict): Stage durations.
+
+    Returns:
+        dict: Differing outputs, missing activities, and timing ratios per stage.
+    """
+    with gzip.open(path, "rt") as file:
+        baseline = json.load(file)
+
+    current = normalize_outputs({str(k): v for k, v in outputs.items()})
+    diffs = [
+        {
+            "activity_id": int(activity_id),
+            "stage": stage,
+            "baseline": expected.get(stage),
+            "current": current[activity_id].get(stage),
+        }
+        for activity_id, expected in baseline["outputs"].items()
+        if activity_id in current
+        for stage in sorted(set(expected) | set(current[activity_id]))
+        if expected.get(stage) != current[activity_id].get(stage)
+    ]
+    missing = sorted(
+        int(activity_id) for activity_id in set(baseline["outputs"]) ^ set(current)
+    )
+
+    percentiles = timing_percentiles(timings)
+    timing_ratios = {
+        stage: {
+            name: round(value / baseline["percentiles"][stage][name], 2)
+            if baseline["percentiles"].get(stage, {}).get(name)
+            else None
+            for name, value in stage_percentiles.items()
+        }
+        for stage, stage_percentiles in percentiles.items()
+    }
+    return {
+        "diffs": diffs,
+        "missing": missing,
+        "percentiles": percentiles,
+        "timing_ratios": timing_ratios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured activities.")
+    parser.add_argument("fixtures_dir")
+    parser.add_argument("baseline")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    outputs, timings = replay(args.fixtures_dir, args.repeat)
+    if args.save_baseline:
+        save_baseline(args.baseline, outputs, timings)
+        print(json.dumps(timing_percentiles(timings), indent=2))
+        return
+
+    report = compare_with_baseline(args.baseline, outputs, timings)
+    print(json.dumps(report, indent=2, default=str))
+    if report["diffs"] or report["missing"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,573 @@
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Define query constants
+SNAPSHOT_ACTIVITIES_QUERY = """
+SELECT
+    a.id AS activity_id,
+    a.athlete_id,
+    p.team_id,
+    a.activity_date,
+    a.training_stimulus,
+    a.timer_time as duration_s,
+    a.distance as distance_m,
+    a.total_elevation_gain,
+    a.average_power,
+    a.average_heartrate,
+    a.average_speed,
+    tp.Title,
+    tp.Description,
+    u.first_name,
+    u.last_name
+FROM `interface-db-prod-1`.`activities_activitysummary` AS a
+LEFT JOIN `interface-db-prod-1`.`activities_trainingpeaksworkout` tp ON tp.activity_summary_id = a.id
+LEFT JOIN `interface-db-prod-1`.`profiles_athlete` p ON p.id = a.athlete_id
+LEFT JOIN `interface-db-prod-1`.`accounts_useraccount` u ON u.id = p.user_id
+"""
+
+SNAPSHOT_LAPS_QUERY = """
+SELECT
+    l.activity_summary_id AS activity_id,
+    l.end - l.start AS duration_s,
+    l.distance AS distance_m,
+    l.intensity_v2 AS intensity_label_v2,
+    l.characteristic,
+    l.power_mean AS average_power,
+    l.heart_rate_mean AS average_heartrate,
+    l.speed_mean AS average_speed,
+    l.cadence_mean AS average_cadence
+FROM `interface-db-prod-1`.`activities_lap` AS l
+ORDER BY l.activity_summary_id, l.start
+"""
+
+SNAPSHOT_RECORD_PROFILES_QUERY = """
+SELECT rp.activity_summary_id AS activity_id, rp.duration / 1000000 duration, rp.value
+FROM `interface-db-prod-1`.metrics_recordprofile AS rp
+WHERE rp.unit = 'W'
+AND rp.relative_work = 0
+"""
+
+SNAPSHOT_WEIGHTS_QUERY = """
+SELECT m.athlete_id, m.date, m.value
+FROM `interface-db-prod-1`.metrics_metric AS m
+WHERE m.metric_type = 'WG'
+AND m.unit = 'kg'
+"""
+
+SNAPSHOT_CRITICAL_POWER_QUERY = """
+SELECT e.athlete_id, e.date, e.critical_power AS value
+FROM `interface-db-prod-1`.daily_metrics_dailyestimation AS e
+"""
+
+ACTIVITY_COLUMNS = [
+    "duration_s",
+    "distance_m",
+    "total_elevation_gain",
+    "average_power",
+    "average_heartrate",
+    "average_speed",
+]
+
+LAP_COLUMNS = [
+    "duration_s",
+    "distance_m",
+    "average_power",
+    "average_heartrate",
+    "average_speed",
+    "average_cadence",
+]
+
+LAP_CODE_COLUMNS = ["intensity_label_v2", "characteristic"]
+
+
+def encode_codes(values):
+    """
+    Encodes nullable string codes as small integers.
+
+    Args:
+        values (Series): Column of string codes.
+
+    Returns:
+        tuple: Integer codes with -1 for nulls, and the code vocabulary.
+    """
+    vocabulary = sorted({value for value in values if isinstance(value, str)})
+    index = {code: i for i, code in enumerate(vocabulary)}
+    codes = np.array([index.get(value, -1) for value in values], dtype=np.int8)
+    return codes, vocabulary
+
+
+def group_offsets(keys, groups):
+    """
+    Computes the start offset of every group in an array sorted by key.
+
+    Args:
+        keys (ndarray): Sorted group key of every row.
+        groups (ndarray): Sorted group keys to compute offsets for.
+
+    Returns:
+        ndarray: Offsets, with one more entry than groups.
+    """
+    return np.searchsorted(keys, np.append(groups, np.iinfo(np.int64).max)).astype(
+        np.int64
+    )
+
+
+def activity_positions(activity_ids, id_order, ids):
+    """
+    Maps activity IDs to their position in the sorted activities table.
+
+    Args:
+        activity_ids (ndarray): Activity ID of every activity row.
+        id_order (ndarray): Positions that sort activity_ids.
+        ids (Series): Activity IDs to map.
+
+    Returns:
+        ndarray: Position of every ID.
+    """
+    return id_order[np.searchsorted(activity_ids[id_order], ids.to_numpy())]
+
+
+def save_columns(directory, columns):
+    """
+    Saves every column as its own .npy file.
+
+    Args:
+        directory (Path): Directory of the table.
+        columns (dict): Arrays keyed by column name.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, values in columns.items():
+        np.save(directory / f"{name}.npy", values)
+
+
+def to_float(values):
+    """
+    Converts a nullable numeric column to float64 with NaN for nulls.
+
+    Args:
+        values (Series): Column of numeric values.
+
+    Returns:
+        ndarray: Float values.
+    """
+    return values.astype(float).to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def to_seconds(values):
+    """
+    Converts a datetime column to seconds since the epoch.
+
+    Args:
+        values (Series): Column of datetimes.
+
+    Returns:
+        ndarray: Epoch seconds.
+    """
+    return values.astype("datetime64[s]").to_numpy().astype(np.int64)
+
+
+def nearest_values(dates, values, targets):
+    """
+    Finds the value of the nearest date for every target date.
+
+    A vectorized merge-asof in both directions; ties go to the earlier date.
+
+    Args:
+        dates (ndarray): Sorted dates of the series.
+        values (ndarray): Value at every date.
+        targets (array): Dates to look up, in the same unit as dates.
+
+    Returns:
+        ndarray: Nearest value of every target, NaN when the series is empty.
+    """
+    targets = np.asarray(targets, dtype=np.int64)
+    if not len(dates):
+        return np.full(len(targets), np.nan)
+    after = np.searchsorted(dates, targets)
+    before = np.maximum(after - 1, 0)
+    after = np.minimum(after, len(dates) - 1)
+    dates = np.asarray(dates, dtype=np.int64)
+    nearest = np.where(
+        np.abs(dates[after] - targets) < np.abs(targets - dates[before]), after, before
+    )
+    return np.asarray(values, dtype=np.float64)[nearest]
+
+
+def create_snapshot(connection, path):
+    """
+    Snapshots laps, record profiles and athlete metrics into a local store.
+
+    Activities are sorted by athlete and date so that each athlete occupies a
+    contiguous slice of every table; the offsets of those slices are stored
+    next to the columns.
+
+    Args:
+        connection (object): Database connection object.
+        path (str): Directory of the replica.
+    """
+    path = Path(path)
+
+    activities = connection.query(SNAPSHOT_ACTIVITIES_QUERY, ttl=0)
+    activities = activities.sort_values(["athlete_id", "activity_date"])
+    activity_ids = activities["activity_id"].to_numpy(dtype=np.int64)
+    athlete_ids = activities["athlete_id"].to_numpy(dtype=np.int64)
+    athletes = np.unique(athlete_ids)
+    id_order = np.argsort(activity_ids, kind="stable")
+
+    laps = connection.query(SNAPSHOT_LAPS_QUERY, ttl=0)
+    laps = laps[laps["activity_id"].isin(activity_ids)]
+    lap_positions = activity_positions(activity_ids, id_order, laps["activity_id"])
+    lap_order = np.argsort(lap_positions, kind="stable")
+    laps = laps.iloc[lap_order]
+    lap_positions = lap_positions[lap_order]
+
+    record_profiles = connection.query(SNAPSHOT_RECORD_PROFILES_QUERY, ttl=0)
+    record_profiles = record_profiles[record_profiles["activity_id"].isin(activity_ids)]
+    record_positions = activity_positions(
+        activity_ids, id_order, record_profiles["activity_id"]
+    )
+    record_order = np.argsort(record_positions, kind="stable")
+    record_profiles = record_profiles.iloc[record_order]
+    record_positions = record_positions[record_order]
+
+    training_stimulus, stimulus_vocabulary = encode_codes(
+        activities["training_stimulus"]
+    )
+    save_columns(
+        path / "activities",
+        {
+            "activity_id": activity_ids,
+            "athlete_id": athlete_ids,
+            "team_id": activities["team_id"].fillna(-1).to_numpy(dtype=np.int64),
+            "activity_date": to_seconds(activities["activity_date"]),
+            "training_stimulus": training_stimulus,
+            "id_order": id_order,
+            "athlete_offsets": group_offsets(athlete_ids, athletes),
+            "lap_offsets": group_offsets(lap_positions, np.arange(len(activity_ids))),
+            "record_offsets": group_offsets(
+                record_positions, np.arange(len(activity_ids))
+            ),
+            **{column: to_float(activities[column]) for column in ACTIVITY_COLUMNS},
+        },
+    )
+    np.save(path / "athletes.npy", athletes)
+
+    lap_codes = {}
+    vocabularies = {"training_stimulus": stimulus_vocabulary}
+    for column in LAP_CODE_COLUMNS:
+        lap_codes[column], vocabularies[column] = encode_codes(laps[column])
+    save_columns(
+        path / "laps",
+        {**lap_codes, **{column: to_float(laps[column]) for column in LAP_COLUMNS}},
+    )
+
+    save_columns(
+        path / "record_profiles",
+        {
+            "duration": to_float(record_profiles["duration"]),
+            "value": to_float(record_profiles["value"]),
+        },
+    )
+
+    for table_name, query in [
+        ("weights", SNAPSHOT_WEIGHTS_QUERY),
+        ("critical_power", SNAPSHOT_CRITICAL_POWER_QUERY),
+    ]:
+        metrics = connection.query(query, ttl=0)
+        metrics = metrics[metrics["athlete_id"].isin(athletes)]
+        metrics = metrics.sort_values(["athlete_id", "date"])
+        metric_athletes = metrics["athlete_id"].to_numpy(dtype=np.int64)
+        save_columns(
+            path / table_name,
+            {
+                "date": to_seconds(metrics["date"]),
+                "value": to_float(metrics["value"]),
+                "athlete_offsets": group_offsets(metric_athletes, athletes),
+            },
+        )
+
+    strings = {
+        "vocabularies": vocabularies,
+        "titles": activities["Title"].where(activities["Title"].notna()).tolist(),
+        "descriptions": activities["Description"]
+        .where(activities["Description"].notna())
+        .tolist(),
+        "first_names": activities["first_name"].fillna("").tolist(),
+        "last_names": activities["last_name"].fillna("").tolist(),
+    }
+    with open(path / "strings.json", "w") as file:
+        json.dump(strings, file)
+
+
+class LocalReplica:
+    """
+    Memory-mapped, read-only view of a snapshot created by create_snapshot.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.tables = {
+            table_name: {
+                column.stem: np.load(column, mmap_mode="r")
+                for column in (self.path / table_name).glob("*.npy")
+            }
+            for table_name in [
+                "activities",
+                "laps",
+                "record_profiles",
+                "weights",
+                "critical_power",
+            ]
+        }
+        self.athletes = np.load(self.path / "athletes.npy", mmap_mode="r")
+        with open(self.path / "strings.json") as file:
+            self.strings = json.load(file)
+
+    def activity_position(self, activity_id):
+        activities = self.tables["activities"]
+        id_order = activities["id_order"]
+        i = np.searchsorted(activities["activity_id"][id_order], int(activity_id))
+        if i == len(id_order) or activities["activity_id"][id_order[i]] != int(
+            activity_id
+        ):
+            return None
+        return int(id_order[i])
+
+    def athlete_slice(self, table_name, athlete_id):
+        i = np.searchsorted(self.athletes, athlete_id)
+        if i == len(self.athletes) or self.athletes[i] != athlete_id:
+            return slice(0, 0)
+        offsets = self.tables[table_name]["athlete_offsets"]
+        return slice(int(offsets[i]), int(offsets[i + 1]))
+
+    def activity_slice(self, offsets_name, position):
+        offsets = self.tables["activities"][offsets_name]
+        return slice(int(offsets[position]), int(offsets[position + 1]))
+
+    def decode(self, column, code):
+        return None if code < 0 else self.strings["vocabularies"][column][code]
+
+    def nearest_metrics(self, table_name, athlete_id, activity_dates):
+        metric = self.tables[table_name]
+        athlete = self.athlete_slice(table_name, athlete_id)
+        return nearest_values(
+            metric["date"][athlete], metric["value"][athlete], activity_dates
+        )
+
+
+def nan_to_none(value):
+    return None if np.isnan(value) else float(value)
+
+
+def fetch_replica_activity_details(replica, position):
+    """
+    Builds activity details in the shape returned by fetch_activity_details.
+
+    Args:
+        replica (LocalReplica): The local replica.
+        position (int): Position of the activity in the replica.
+
+    Returns:
+        list: Activity details.
+    """
+    activities = replica.tables["activities"]
+    laps = replica.tables["laps"]
+    lap_slice = replica.activity_slice("lap_offsets", position)
+    if lap_slice.start == lap_slice.stop:
+        return None
+
+    intervals = [
+        {
+            **{column: nan_to_none(laps[column][i]) for column in LAP_COLUMNS},
+            **{
+                column: replica.decode(column, int(laps[column][i]))
+                for column in LAP_CODE_COLUMNS
+            },
+        }
+        for i in range(lap_slice.start, lap_slice.stop)
+    ]
+    details = {
+        column: nan_to_none(activities[column][position]) for column in ACTIVITY_COLUMNS
+    }
+    average_power = details["average_power"]
+    return [
+        {
+            "training_stimulus": replica.decode(
+                "training_stimulus", int(activities["training_stimulus"][position])
+            ),
+            "duration_s": details["duration_s"],
+            "distance_m": details["distance_m"],
+            "total_elevation_gain": details["total_elevation_gain"],
+            "total_work_kj": average_power * details["duration_s"] / 1000
+            if average_power is not None and details["duration_s"] is not None
+            else None,
+            "average_power": average_power,
+            "average_heartrate": details["average_heartrate"],
+            "average_speed": details["average_speed"],
+            "Title": replica.strings["titles"][position],
+            "Description": replica.strings["descriptions"][position],
+            "intervals": json.dumps(intervals),
+        }
+    ]
+
+
+def fetch_replica_athlete_profiles(replica, positions):
+    """
+    Builds profile details of consecutive activities of one athlete at once.
+
+    Args:
+        replica (LocalReplica): The local replica.
+        positions (slice): Positions of activities of a single athlete.
+
+    Returns:
+        list: Profile details of every activity, as fetch_profile_details.
+    """
+    activities = replica.tables["activities"]
+    athlete_id = int(activities["athlete_id"][positions.start])
+    activity_dates = activities["activity_date"][positions]
+    metrics = {
+        table_name: replica.nearest_metrics(table_name, athlete_id, activity_dates)
+        for table_name in ["weights", "critical_power"]
+    }
+    return [
+        [
+            {
+                "first_name": replica.strings["first_names"][position],
+                "last_name": replica.strings["last_names"][position],
+                "weight": nan_to_none(weight),
+                "critical_power": nan_to_none(critical_power),
+                "athlete_id": athlete_id,
+                "activity_date": datetime(1970, 1, 1)
+                + timedelta(seconds=int(activity_date)),
+            }
+        ]
+        for position, activity_date, weight, critical_power in zip(
+            range(positions.start, positions.stop),
+            activity_dates,
+            metrics["weights"],
+            metrics["critical_power"],
+        )
+    ]
+
+
+def fetch_replica_profile_details(replica, position):
+    """
+    Builds profile details in the shape returned by fetch_profile_details.
+
+    Args:
+        replica (LocalReplica): The local replica.
+        position (int): Position of the activity in the replica.
+
+    Returns:
+        list: Profile details.
+    """
+    return fetch_replica_athlete_profiles(replica, slice(position, position + 1))[0]
+
+
+def fetch_replica_activity_peaks(replica, position):
+    """
+    Builds activity peaks in the shape returned by fetch_activity_peaks.
+
+    Args:
+        replica (LocalReplica): The local replica.
+        position (int): Position of the activity in the replica.
+
+    Returns:
+        list: Activity peaks.
+    """
+    record_profiles = replica.tables["record_profiles"]
+    records = replica.activity_slice("record_offsets", position)
+    return [
+        {
+            "duration": float(duration),
+            "current_value": float(value),
+        }
+        for duration, value in zip(
+            record_profiles["duration"][records], record_profiles["value"][records]
+        )
+    ]
+
+
+def fetch_replica_peak_values(replica, profile_details):
+    """
+    Builds peak values in the shape returned by fetch_peak_values.
+
+    Args:
+        replica (LocalReplica): The local replica.
+        profile_details (list): Profile details containing athlete_id and activity_date.
+
+    Returns:
+        dict: Peak values.
+    """
+    activities = replica.tables["activities"]
+    record_profiles = replica.tables["record_profiles"]
+    athlete_id = profile_details[0]["athlete_id"]
+    activity_date = profile_details[0]["activity_date"]
+    date_ranges = {
+        "past_8_weeks_record": activity_date - timedelta(weeks=8),
+        "past_year_record": activity_date - timedelta(days=365),
+        "all_time_record": datetime(2000, 1, 1),
+    }
+    end_date = activity_date - timedelta(days=1)
+
+    athlete = replica.athlete_slice("activities", athlete_id)
+    activity_days = activities["activity_date"][athlete] // 86400
+    epoch = datetime(1970, 1, 1)
+    record_offsets = activities["record_offsets"]
+    records = slice(
+        int(record_offsets[athlete.start]), int(record_offsets[athlete.stop])
+    )
+    record_days = np.repeat(
+        activity_days, np.diff(record_offsets[athlete.start : athlete.stop + 1])
+    )
+    durations = record_profiles["duration"][records]
+    values = record_profiles["value"][records]
+
+    peak_values = {}
+    end_day = (end_date - epoch).days
+    for key, start_date in date_ranges.items():
+        start_day = (start_date - epoch).days
+        in_range = (record_days >= start_day) & (record_days <= end_day)
+        window_durations, inverse = np.unique(durations[in_range], return_inverse=True)
+        window_values = np.full(len(window_durations), -np.inf)
+        np.maximum.at(window_values, inverse, values[in_range])
+        peak_values[key] = [
+            {"duration": float(duration), "previous_value": float(value)}
+            for duration, value in zip(window_durations, window_values)
+        ]
+
+    return peak_values
+
+
+def extract_replica_data(activity_id, replica, restrict=None):
+    """
+    Extracts data for a given activity ID from a local replica.
+
+    Serves the same results as extract_data without querying the database.
+
+    Args:
+        activity_id (int): The ID of the activity to extract.
+        replica (LocalReplica): The local replica.
+        restrict (int, optional): Restrict data by team ID.
+
+    Returns:
+        tuple: Contains activity details, profile details, activity peaks, and peak values.
+    """
+    position = replica.activity_position(activity_id)
+    if position is None:
+        return None, None, None, None
+    if restrict and replica.tables["activities"]["team_id"][position] != restrict:
+        return None, None, None, None
+
+    activity_details = fetch_replica_activity_details(replica, position)
+    if activity_details is None:
+        return None, None, None, None
+
+    profile_details = fetch_replica_profile_details(replica, position)
+    activity_peaks = fetch_replica_activity_peaks(replica, position)
+    peak_values = fetch_replica_peak_values(replica, profile_details)
+
+    return activity_details, profile_details, activity_peaks, peak_values
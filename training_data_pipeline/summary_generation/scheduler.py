@@ -0,0 +1,365 @@
+import fcntl
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from graig_nlp.summary_generation.model.router import WINDOW_SIZE, percentile
+
+# Define constants
+# Highest priority first
+PRIORITY_CLASSES = ["interactive", "batch"]
+DEFAULT_PRIORITY_CLASS = "interactive"
+# Batch work never takes the whole capacity, so interactive requests
+# always find a free slot
+DEFAULT_RESOURCE_LIMITS = {
+    "db": {
+        "max_concurrency": 8,
+        "class_limits": {"interactive": 8, "batch": 6},
+        "rate_per_s": 200.0,
+        "burst": 50,
+    },
+    "llm": {
+        "max_concurrency": 4,
+        "class_limits": {"interactive": 4, "batch": 3},
+        "rate_per_s": 5.0,
+        "burst": 10,
+    },
+}
+
+# Wait between attempts to take a slot held by other processes
+SHARED_POLL_INTERVAL_S = 0.005
+# Directory of the slots shared by the app and the batch jobs of a machine,
+# overridden by the SHARED_DIR_ENV environment variable
+SHARED_DIR_ENV = "GRAIG_SCHEDULER_DIR"
+DEFAULT_SHARED_DIR = os.path.join(tempfile.gettempdir(), "graig_nlp-scheduler")
+
+# Priority class of the work running in the current context
+CURRENT_PRIORITY_CLASS = ContextVar("priority_class", default=DEFAULT_PRIORITY_CLASS)
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limit refilled continuously at rate_per_s.
+
+    Not thread-safe on its own; ResourceGate calls it under its lock.
+    """
+
+    def __init__(self, rate_per_s, burst):
+        self.rate_per_s = rate_per_s
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated_at) * self.rate_per_s
+        )
+        self.updated_at = now
+
+    def try_acquire(self):
+        self.refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_token(self):
+        self.refill()
+        return max(0.0, (1 - self.tokens) / self.rate_per_s)
+
+
+class ResourceGate:
+    """
+    Admits work on a shared resource by priority class.
+
+    A request is admitted when it is first in the queue of its class, no
+    higher-priority class is waiting, the total and per-class concurrency
+    limits leave a slot and the token bucket has a token. Running work is
+    never interrupted; interactive requests preempt batch work by jumping
+    ahead of every queued batch request.
+    """
+
+    def __init__(self, max_concurrency, class_limits=None, rate_per_s=None, burst=None):
+        self.max_concurrency = max_concurrency
+        self.class_limits = {
+            priority_class: (class_limits or {}).get(priority_class, max_concurrency)
+            for priority_class in PRIORITY_CLASSES
+        }
+        self.bucket = (
+            TokenBucket(rate_per_s, burst or 1) if rate_per_s is not None else None
+        )
+        self.condition = threading.Condition()
+        self.queues = {priority_class: deque() for priority_class in PRIORITY_CLASSES}
+        self.running = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self.admitted = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self.wait_times = {
+            priority_class: deque(maxlen=WINDOW_SIZE)
+            for priority_class in PRIORITY_CLASSES
+        }
+
+    def has_slot(self, priority_class, ticket):
+        rank = PRIORITY_CLASSES.index(priority_class)
+        return (
+            self.queues[priority_class][0] is ticket
+            and not any(self.queues[c] for c in PRIORITY_CLASSES[:rank])
+            and sum(self.running.values()) < self.max_concurrency
+            and self.running[priority_class] < self.class_limits[priority_class]
+        )
+
+    def acquire(self, priority_class):
+        """
+        Blocks until the request is admitted.
+
+        Args:
+            priority_class (str): One of PRIORITY_CLASSES.
+
+        Returns:
+            float: Time waited in seconds.
+        """
+        ticket = object()
+        start = time.perf_counter()
+        with self.condition:
+            self.queues[priority_class].append(ticket)
+            try:
+                while True:
+                    timeout = None
+                    if self.has_slot(priority_class, ticket):
+                        if self.bucket is None or self.bucket.try_acquire():
+                            break
+                        timeout = self.bucket.time_until_token()
+                    self.condition.wait(timeout)
+            except BaseException:
+                self.queues[priority_class].remove(ticket)
+                self.condition.notify_all()
+                raise
+            self.queues[priority_class].popleft()
+            self.running[priority_class] += 1
+            self.admitted[priority_class] += 1
+            waited_s = time.perf_counter() - start
+            self.wait_times[priority_class].append(waited_s)
+            # The next request of this or a lower class may now be first
+            self.condition.notify_all()
+        return waited_s
+
+    def release(self, priority_class):
+        with self.condition:
+            self.running[priority_class] -= 1
+            self.condition.notify_all()
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                priority_class: {
+                    "queue_depth": len(self.queues[priority_class]),
+                    "running": self.running[priority_class],
+                    "admitted": self.admitted[priority_class],
+                    "p50_wait_s": percentile(
+                        list(self.wait_times[priority_class]), 0.5
+                    ),
+                    "p95_wait_s": percentile(
+                        list(self.wait_times[priority_class]), 0.95
+                    ),
+                }
+                for priority_class in PRIORITY_CLASSES
+            }
+
+
+class SharedSlots:
+    """
+    Concurrency limits of a resource shared by the processes of a machine.
+
+    Every slot is a lock file held with flock; the locks of a process that
+    exits are released by the OS. Lower classes only take the first slots of
+    their class limit, searching upward, while the highest class searches
+    downward, so the slots kept from batch work stay free for interactive
+    requests of any process.
+    """
+
+    def __init__(
+        self,
+        directory,
+        resource,
+        max_concurrency,
+        class_limits=None,
+        poll_interval_s=SHARED_POLL_INTERVAL_S,
+        **_,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.paths = [
+            os.path.join(directory, f"{resource}-{i}.lock")
+            for i in range(max_concurrency)
+        ]
+        self.class_limits = {
+            priority_class: min(
+                max_concurrency,
+                (class_limits or {}).get(priority_class, max_concurrency),
+            )
+            for priority_class in PRIORITY_CLASSES
+        }
+        self.poll_interval_s = poll_interval_s
+
+    def try_acquire(self, priority_class):
+        indices = range(self.class_limits[priority_class])
+        if priority_class == PRIORITY_CLASSES[0]:
+            indices = reversed(indices)
+        for i in indices:
+            fd = os.open(self.paths[i], os.O_RDWR | os.O_CREAT)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            return fd
+        return None
+
+    def acquire(self, priority_class):
+        """
+        Blocks until a slot is free in every process.
+
+        Args:
+            priority_class (str): One of PRIORITY_CLASSES.
+
+        Returns:
+            int: Descriptor of the locked slot file, to pass to release.
+        """
+        while (fd := self.try_acquire(priority_class)) is None:
+            time.sleep(self.poll_interval_s)
+        return fd
+
+    def release(self, fd):
+        os.close(fd)
+
+
+class Scheduler:
+    """
+    Resource gates shared by the app and batch jobs of a process.
+
+    Gates order and limit the work of the process. With a shared_dir, the
+    concurrency limits of every resource also hold across the processes
+    using the same directory; rate limits stay per process.
+    """
+
+    def __init__(self, resource_limits=DEFAULT_RESOURCE_LIMITS, shared_dir=None):
+        self.resource_limits = resource_limits
+        self.shared_dir = shared_dir
+        self.gates = {
+            resource: ResourceGate(**limits)
+            for resource, limits in resource_limits.items()
+        }
+        self.shared_slots = {
+            resource: SharedSlots(shared_dir, resource, **limits)
+            for resource, limits in resource_limits.items()
+            if shared_dir is not None
+        }
+
+    @contextmanager
+    def slot(self, resource, priority_class=None):
+        """
+        Holds a slot of a resource for the duration of the block.
+
+        Args:
+            resource (str): "db" or "llm".
+            priority_class (str, optional): The class of the current context if omitted.
+        """
+        priority_class = priority_class or CURRENT_PRIORITY_CLASS.get()
+        gate = self.gates[resource]
+        shared_slots = self.shared_slots.get(resource)
+        gate.acquire(priority_class)
+        try:
+            fd = shared_slots.acquire(priority_class) if shared_slots else None
+            try:
+                yield
+            finally:
+                if fd is not None:
+                    shared_slots.release(fd)
+        finally:
+            gate.release(priority_class)
+
+    def snapshot(self):
+        return {resource: gate.snapshot() for resource, gate in self.gates.items()}
+
+
+SCHEDULER = Scheduler()
+
+
+def configure_scheduler(resource_limits=DEFAULT_RESOURCE_LIMITS, shared_dir=None):
+    """
+    Replaces the shared scheduler, e.g. with the limits of a deployment.
+
+    The app and the batch jobs running on the same machine should pass the
+    same shared_dir, see use_shared_slots, so that their concurrency limits
+    add up to the limits of the database and LLM quota. Rate limits are per
+    process: give every process its share of the quota.
+
+    Args:
+        resource_limits (dict, optional): Limits keyed by resource, as DEFAULT_RESOURCE_LIMITS.
+        shared_dir (str, optional): Directory of the slots shared between processes.
+    """
+    global SCHEDULER
+    SCHEDULER = Scheduler(resource_limits, shared_dir)
+
+
+def shared_dir():
+    return os.path.abspath(os.environ.get(SHARED_DIR_ENV, DEFAULT_SHARED_DIR))
+
+
+def use_shared_slots():
+    """
+    Makes the scheduler share its concurrency limits through shared_dir.
+
+    The limits of the current scheduler are kept. Called by the app and by
+    every batch entry point, so that they all count against the same slots
+    wherever they are started from; calling it again is a no-op.
+    """
+    if SCHEDULER.shared_dir != shared_dir():
+        configure_scheduler(SCHEDULER.resource_limits, shared_dir())
+
+
+@contextmanager
+def workload(priority_class):
+    """
+    Runs the block, and the scheduled calls it makes, in a priority class.
+
+    The class is a context variable. TaskGraph and LLMRouter run their tasks
+    in a copy of the submitting context, so they inherit it; other threads
+    started inside the block do not and run as DEFAULT_PRIORITY_CLASS.
+
+    Args:
+        priority_class (str): One of PRIORITY_CLASSES.
+    """
+    if priority_class not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {priority_class}")
+    token = CURRENT_PRIORITY_CLASS.set(priority_class)
+    try:
+        yield
+    finally:
+        CURRENT_PRIORITY_CLASS.reset(token)
+
+
+def slot(resource, priority_class=None):
+    return SCHEDULER.slot(resource, priority_class)
+
+
+def scheduled_query(connection, query, **kwargs):
+    """
+    Runs connection.query in a "db" slot of the current priority class.
+
+    The slot and a rate token are taken before st.connection looks up its
+    cache, so a cached result costs them too, though only for the lookup.
+    Pass ttl=0 where a hit is unlikely, as the extract cache does on misses.
+
+    Args:
+        connection (object): Database connection object.
+        query (str): SQL query to execute.
+        **kwargs: Arguments of connection.query.
+
+    Returns:
+        DataFrame: The query result.
+    """
+    with SCHEDULER.slot("db"):
+        return connection.query(query, **kwargs)
@@ -0,0 +1,233 @@
+import argparse
+import json
+import multiprocessing
+import tempfile
+import threading
+import time
+from collections import deque
+
+from graig_nlp.summary_generation.replay import timing_percentiles
+from graig_nlp.summary_generation.scheduler import Scheduler, workload
+
+# Define constants
+DB_CONNECTIONS = 8
+DEFAULT_QUERY_S = 0.02
+DEFAULT_BATCH_THREADS = 24
+DEFAULT_PAGES = 40
+QUERIES_PER_PAGE = 5
+PAGE_INTERVAL_S = 0.05
+SIMULATED_LIMITS = {
+    "db": {
+        "max_concurrency": DB_CONNECTIONS,
+        "class_limits": {"interactive": DB_CONNECTIONS, "batch": 6},
+    }
+}
+RATE_LIMITED_LIMITS = {
+    "db": {**SIMULATED_LIMITS["db"], "rate_per_s": 200.0, "burst": 20}
+}
+
+
+class FifoDatabase:
+    """
+    Stand-in database handing out its connections in arrival order.
+    """
+
+    def __init__(self, query_s, connections=DB_CONNECTIONS):
+        self.query_s = query_s
+        self.free = connections
+        self.waiting = deque()
+        self.condition = threading.Condition()
+
+    def query(self):
+        ticket = object()
+        with self.condition:
+            self.waiting.append(ticket)
+            while not (self.free and self.waiting[0] is ticket):
+                self.condition.wait()
+            self.waiting.popleft()
+            self.free -= 1
+            self.condition.notify_all()
+        time.sleep(self.query_s)
+        with self.condition:
+            self.free += 1
+            self.condition.notify_all()
+
+
+class SharedDatabase:
+    """
+    Stand-in database server queried by several processes.
+
+    Each process opens its own connections, so queries are not queued: past
+    DB_CONNECTIONS concurrent queries, every query slows down as the server
+    shares its capacity.
+    """
+
+    def __init__(self, running, query_s, connections=DB_CONNECTIONS):
+        # multiprocessing.Value counting the running queries of every process
+        self.running = running
+        self.query_s = query_s
+        self.connections = connections
+
+    def query(self):
+        with self.running.get_lock():
+            self.running.value += 1
+            load = self.running.value / self.connections
+        try:
+            time.sleep(self.query_s * max(1.0, load))
+        finally:
+            with self.running.get_lock():
+                self.running.value -= 1
+
+
+def scheduled_call(database, scheduler):
+    if scheduler is None:
+        return database.query()
+    with scheduler.slot("db"):
+        return database.query()
+
+
+def start_batch_threads(database, scheduler, n_threads, stop):
+    """
+    Starts batch threads querying the database until stop is set.
+
+    Args:
+        database (object): Stand-in database.
+        scheduler (Scheduler): Scheduler of the process, None to query directly.
+        n_threads (int): Number of batch threads.
+        stop (Event): Set to stop the threads.
+
+    Returns:
+        list: The started threads.
+    """
+
+    def batch():
+        with workload("batch"):
+            while not stop.is_set():
+                scheduled_call(database, scheduler)
+
+    threads = [threading.Thread(target=batch) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def batch_process(running, shared_dir, query_s, n_threads, stop):
+    # Backfill running next to the app, on the same database
+    database = SharedDatabase(running, query_s)
+    scheduler = (
+        Scheduler(SIMULATED_LIMITS, shared_dir) if shared_dir is not None else None
+    )
+    for thread in start_batch_threads(database, scheduler, n_threads, stop):
+        thread.join()
+
+
+def page_latencies(database, scheduler, n_pages):
+    """
+    Runs pages of sequential interactive queries.
+
+    Args:
+        database (object): Stand-in database.
+        scheduler (Scheduler): Scheduler of the process, None to query directly.
+        n_pages (int): Number of pages.
+
+    Returns:
+        list: Latency of every page in seconds.
+    """
+    latencies = []
+    for _ in range(n_pages):
+        start = time.perf_counter()
+        for _ in range(QUERIES_PER_PAGE):
+            scheduled_call(database, scheduler)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(PAGE_INTERVAL_S)
+    return latencies
+
+
+def in_process_latencies(resource_limits, query_s, n_batch_threads, n_pages):
+    database = FifoDatabase(query_s)
+    scheduler = Scheduler(resource_limits) if resource_limits is not None else None
+    stop = threading.Event()
+    threads = start_batch_threads(database, scheduler, n_batch_threads, stop)
+    try:
+        return page_latencies(database, scheduler, n_pages)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def cross_process_latencies(shared, query_s, n_batch_threads, n_pages):
+    with tempfile.TemporaryDirectory() as directory:
+        shared_dir = directory if shared else None
+        running = multiprocessing.Value("i", 0)
+        database = SharedDatabase(running, query_s)
+        scheduler = Scheduler(SIMULATED_LIMITS, shared_dir) if shared else None
+        stop = multiprocessing.Event()
+        process = multiprocessing.Process(
+            target=batch_process,
+            args=(running, shared_dir, query_s, n_batch_threads, stop),
+        )
+        process.start()
+        try:
+            # Let the backfill saturate the database first
+            time.sleep(10 * query_s)
+            return page_latencies(database, scheduler, n_pages)
+        finally:
+            stop.set()
+            process.join()
+
+
+def measure_scheduler_latency(
+    query_s=DEFAULT_QUERY_S,
+    n_batch_threads=DEFAULT_BATCH_THREADS,
+    n_pages=DEFAULT_PAGES,
+):
+    """
+    Simulates page latency while a backfill saturates the database.
+
+    Pages run QUERIES_PER_PAGE sequential interactive queries against a
+    stand-in database of DB_CONNECTIONS connections, with the backfill in
+    the same process or in another one.
+
+    Args:
+        query_s (float, optional): Duration of every query.
+        n_batch_threads (int, optional): Number of backfill threads.
+        n_pages (int, optional): Number of pages per mode.
+
+    Returns:
+        dict: Page latency percentiles in milliseconds per mode.
+    """
+    timings = {
+        "idle": in_process_latencies(SIMULATED_LIMITS, query_s, 0, n_pages),
+        "unscheduled": in_process_latencies(None, query_s, n_batch_threads, n_pages),
+        "scheduled": in_process_latencies(
+            SIMULATED_LIMITS, query_s, n_batch_threads, n_pages
+        ),
+        "scheduled_rate_limited": in_process_latencies(
+            RATE_LIMITED_LIMITS, query_s, n_batch_threads, n_pages
+        ),
+        "cross_process_unscheduled": cross_process_latencies(
+            False, query_s, n_batch_threads, n_pages
+        ),
+        "cross_process_shared_scheduler": cross_process_latencies(
+            True, query_s, n_batch_threads, n_pages
+        ),
+    }
+    return timing_percentiles(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Simulate page latency under a backfill with and without scheduling."
+    )
+    parser.add_argument("--query-s", type=float, default=DEFAULT_QUERY_S)
+    parser.add_argument("--batch-threads", type=int, default=DEFAULT_BATCH_THREADS)
+    parser.add_argument("--pages", type=int, default=DEFAULT_PAGES)
+    args = parser.parse_args()
+
+    report = measure_scheduler_latency(args.query_s, args.batch_threads, args.pages)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
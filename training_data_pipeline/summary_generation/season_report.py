@@ -0,0 +1,279 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache, partial
+
+import numpy as np
+
+from graig_nlp.enums import UNKNOWN_INDEX, IntensityV2, TrainingStimulus
+from graig_nlp.summary_generation.format_table_data import format_interval_data
+from graig_nlp.summary_generation.intervals.process_details_intervals import (
+    detect_separate_sets,
+)
+from graig_nlp.summary_generation.personal_achievements.personal_achievements import (
+    process_personal_best,
+)
+from graig_nlp.summary_generation.personal_achievements.record_envelope import (
+    RecordEnvelope,
+    no_peak_values,
+)
+from graig_nlp.summary_generation.replica import (
+    LocalReplica,
+    fetch_replica_activity_details,
+    fetch_replica_activity_peaks,
+    fetch_replica_athlete_profiles,
+    fetch_replica_peak_values,
+)
+
+# Define constants
+EPOCH = datetime(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+
+
+class WeeklyAccumulator:
+    """
+    Mergeable training totals of one week.
+
+    Zone times and set counts are arrays indexed by the IntensityV2 and
+    TrainingStimulus code indexes; labels are only attached by to_dict.
+    """
+
+    def __init__(self):
+        self.activities = 0
+        self.duration_s = 0.0
+        self.total_work_kj = 0.0
+        self.zone_duration_s = np.zeros(len(IntensityV2))
+        self.set_counts = np.zeros(len(TrainingStimulus), dtype=np.int64)
+        self.unlabelled_sets = 0
+
+    def add_activity(self, activity, intervals, sets):
+        """
+        Adds an activity to the week.
+
+        Args:
+            activity (dict): Activity details as returned by fetch_activity_details.
+            intervals (list): Raw laps of the activity.
+            sets (list): Sets detected in the formatted laps.
+        """
+        self.activities += 1
+        self.duration_s += activity["duration_s"] or 0
+        self.total_work_kj += activity["total_work_kj"] or 0
+
+        for interval in intervals:
+            zone = IntensityV2.encode(interval["intensity_label_v2"])
+            if zone != UNKNOWN_INDEX:
+                self.zone_duration_s[zone] += interval["duration_s"] or 0
+
+        stimulus = TrainingStimulus.encode(activity["training_stimulus"])
+        if stimulus == UNKNOWN_INDEX:
+            self.unlabelled_sets += len(sets)
+        else:
+            self.set_counts[stimulus] += len(sets)
+
+    def merge(self, other):
+        """
+        Adds the totals of another accumulator of the same week.
+
+        Args:
+            other (WeeklyAccumulator): Accumulator to merge.
+
+        Returns:
+            WeeklyAccumulator: This accumulator.
+        """
+        self.activities += other.activities
+        self.duration_s += other.duration_s
+        self.total_work_kj += other.total_work_kj
+        self.zone_duration_s += other.zone_duration_s
+        self.set_counts += other.set_counts
+        self.unlabelled_sets += other.unlabelled_sets
+        return self
+
+    def to_dict(self):
+        return {
+            "activities": self.activities,
+            "duration_s": round(self.duration_s),
+            "total_work_kj": round(self.total_work_kj),
+            "zone_duration_s": {
+                label: round(float(duration))
+                for label, duration in zip(
+                    IntensityV2.label_table(), self.zone_duration_s
+                )
+            },
+            "set_counts": {
+                label: int(count)
+                for label, count in zip(TrainingStimulus.label_table(), self.set_counts)
+                if count
+            },
+            "unlabelled_sets": self.unlabelled_sets,
+        }
+
+
+def merge_weeks(reports):
+    """
+    Merges weekly accumulators of several reports, e.g. into a team total.
+
+    Args:
+        reports (list): Weekly accumulators keyed by week start.
+
+    Returns:
+        dict: Merged weekly accumulators keyed by week start.
+    """
+    merged = {}
+    for weeks in reports:
+        for week_start, accumulator in weeks.items():
+            merged.setdefault(week_start, WeeklyAccumulator()).merge(accumulator)
+    return dict(sorted(merged.items()))
+
+
+def week_start(activity_day):
+    """
+    Returns the Monday of the week of a day counted from the epoch.
+
+    Args:
+        activity_day (int): Days since 1970-01-01, a Thursday.
+
+    Returns:
+        date: Start of the week.
+    """
+    return (EPOCH + timedelta(days=activity_day - (activity_day + 3) % 7)).date()
+
+
+def detect_sets(intervals):
+    """
+    Detects the sets of an activity with the criteria of process_intervals.
+
+    Args:
+        intervals (list): Raw laps of the activity.
+
+    Returns:
+        list: Formatted laps of every set.
+    """
+    return detect_separate_sets(format_interval_data(intervals))
+
+
+@lru_cache(maxsize=4)
+def open_replica(path):
+    # One memory-mapped view per worker process
+    return LocalReplica(path)
+
+
+def athlete_season_report(replica_path, athlete_id, start_date, end_date):
+    """
+    Reduces the activities of an athlete into weekly aggregates and PRs.
+
+    Args:
+        replica_path (str): Directory of the local replica.
+        athlete_id (int): The ID of the athlete.
+        start_date (datetime): First day of the season.
+        end_date (datetime): Last day of the season.
+
+    Returns:
+        dict: Weekly accumulators keyed by week start and the PR timeline.
+    """
+    replica = open_replica(replica_path)
+    activities = replica.tables["activities"]
+    athlete = replica.athlete_slice("activities", athlete_id)
+    activity_days = activities["activity_date"][athlete] // SECONDS_PER_DAY
+    first, last = np.searchsorted(
+        activity_days, [(start_date - EPOCH).days, (end_date - EPOCH).days + 1]
+    )
+
+    weeks = {}
+    personal_bests = []
+    envelope = RecordEnvelope()
+    positions = slice(athlete.start + first, athlete.start + last)
+    profiles = (
+        fetch_replica_athlete_profiles(replica, positions) if last > first else []
+    )
+    for position, profile_details in zip(
+        range(positions.start, positions.stop), profiles
+    ):
+        activity_details = fetch_replica_activity_details(replica, position)
+        if activity_details is None:
+            continue
+        activity = activity_details[0]
+        intervals = json.loads(activity["intervals"])
+        activity_day = int(activities["activity_date"][position]) // SECONDS_PER_DAY
+        weeks.setdefault(week_start(activity_day), WeeklyAccumulator()).add_activity(
+            activity, intervals, detect_sets(intervals)
+        )
+
+        activity_date = profile_details[0]["activity_date"]
+        activity_peaks = fetch_replica_activity_peaks(replica, position)
+        if envelope.can_skip(athlete_id, activity_date, activity_peaks):
+            peak_values = no_peak_values()
+        else:
+            peak_values = fetch_replica_peak_values(replica, profile_details)
+        envelope.observe(athlete_id, position, activity_date, activity_peaks)
+        message = process_personal_best(activity_peaks, peak_values)
+        if message:
+            personal_bests.append(
+                {
+                    "activity_id": int(activities["activity_id"][position]),
+                    "activity_date": profile_details[0]["activity_date"],
+                    "message": message,
+                }
+            )
+
+    return {"athlete_id": athlete_id, "weeks": weeks, "personal_bests": personal_bests}
+
+
+def generate_season_reports(
+    replica_path, start_date, end_date, athlete_ids=None, max_workers=None
+):
+    """
+    Generates the season report of every athlete in parallel.
+
+    Athletes are sharded in chunks across worker processes, each opening the
+    replica memory-mapped, so that only athlete IDs and reports cross processes.
+
+    Args:
+        replica_path (str): Directory of the local replica.
+        start_date (datetime): First day of the season.
+        end_date (datetime): Last day of the season.
+        athlete_ids (list, optional): Athletes to report, all athletes by default.
+        max_workers (int, optional): Number of worker processes.
+
+    Returns:
+        list: Report of every athlete, in the order of athlete_ids.
+    """
+    replica_path = str(replica_path)
+    if athlete_ids is None:
+        athlete_ids = [int(a) for a in open_replica(replica_path).athletes]
+    max_workers = max_workers or os.cpu_count() or 1
+    report_athlete = partial(
+        athlete_season_report, replica_path, start_date=start_date, end_date=end_date
+    )
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            executor.map(
+                report_athlete,
+                athlete_ids,
+                chunksize=max(1, len(athlete_ids) // (4 * max_workers)),
+            )
+        )
+
+
+def format_season_report(report):
+    """
+    Formats an athlete season report for display.
+
+    Args:
+        report (dict): Report returned by athlete_season_report.
+
+    Returns:
+        dict: Weekly rows and PR timeline with labels.
+    """
+    return {
+        "athlete_id": report["athlete_id"],
+        "weeks": [
+            {"week_start": start.isoformat(), **accumulator.to_dict()}
+            for start, accumulator in sorted(report["weeks"].items())
+        ],
+        "personal_bests": [
+            {**record, "activity_date": record["activity_date"].date().isoformat()}
+            for record in report["personal_bests"]
+        ],
+    }
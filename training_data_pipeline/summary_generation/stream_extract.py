@@ -0,0 +1,209 @@
+import json
+
+from sqlalchemy import text
+
+from graig_nlp.summary_generation.derived_features import ingest_batch_features
+from graig_nlp.summary_generation.scheduler import slot, use_shared_slots
+
+# Define constants
+DEFAULT_BATCH_SIZE = 500
+STREAM_BUFFER_ROWS = 1000
+ROW_KEYS = ["activity_id", "athlete_id", "activity_date"]
+
+# Define query constants
+BACKFILL_ACTIVITIES_QUERY = """
+SELECT
+    a.id AS activity_id,
+    a.athlete_id,
+    a.activity_date,
+    a.training_stimulus,
+    a.timer_time as duration_s,
+    a.distance as distance_m,
+    a.total_elevation_gain,
+    a.average_power * a.timer_time / 1000 as total_work_kj,
+    a.average_power,
+    a.average_heartrate,
+    a.average_speed,
+    tp.Title,
+    tp.Description
+FROM `interface-db-prod-1`.`activities_activitysummary` AS a
+LEFT JOIN `interface-db-prod-1`.`activities_trainingpeaksworkout` tp ON tp.activity_summary_id = a.id
+LEFT JOIN `interface-db-prod-1`.`profiles_athlete` p ON p.id = a.athlete_id
+WHERE a.id > :after_id
+{filters}
+ORDER BY a.id
+LIMIT :batch_size
+"""
+
+BACKFILL_LAPS_QUERY = """
+SELECT
+    l.activity_summary_id AS activity_id,
+    l.end - l.start AS duration_s,
+    l.distance AS distance_m,
+    l.intensity_v2 AS intensity_label_v2,
+    l.characteristic,
+    l.power_mean AS average_power,
+    l.heart_rate_mean AS average_heartrate,
+    l.speed_mean AS average_speed,
+    l.cadence_mean AS average_cadence
+FROM `interface-db-prod-1`.`activities_lap` AS l
+INNER JOIN `interface-db-prod-1`.`activities_activitysummary` AS a ON a.id = l.activity_summary_id
+LEFT JOIN `interface-db-prod-1`.`profiles_athlete` p ON p.id = a.athlete_id
+WHERE a.id BETWEEN :first_id AND :last_id
+{filters}
+ORDER BY l.activity_summary_id, l.start
+"""
+
+BACKFILL_PEAKS_QUERY = """
+SELECT rp.activity_summary_id AS activity_id, rp.duration / 1000000 duration, rp.value as current_value
+FROM `interface-db-prod-1`.metrics_recordprofile AS rp
+INNER JOIN `interface-db-prod-1`.`activities_activitysummary` AS a ON a.id = rp.activity_summary_id
+LEFT JOIN `interface-db-prod-1`.`profiles_athlete` p ON p.id = a.athlete_id
+WHERE a.id BETWEEN :first_id AND :last_id
+AND rp.unit = 'W'
+AND rp.relative_work = 0
+{filters}
+ORDER BY rp.activity_summary_id
+"""
+
+
+def backfill_filters(athlete_id=None, team_id=None, start_date=None, end_date=None):
+    """
+    Builds the activity filters shared by the backfill queries.
+
+    Args:
+        athlete_id (int, optional): Only extract activities of this athlete.
+        team_id (int, optional): Only extract activities of this team.
+        start_date (datetime, optional): First activity date to include.
+        end_date (datetime, optional): Last activity date to include.
+
+    Returns:
+        tuple: SQL conditions and their bound parameters.
+    """
+    conditions = {
+        "AND a.athlete_id = :athlete_id": ("athlete_id", athlete_id),
+        "AND p.team_id = :team_id": ("team_id", team_id),
+        "AND a.activity_date >= :start_date": ("start_date", start_date),
+        "AND a.activity_date <= :end_date": ("end_date", end_date),
+    }
+    clauses, params = [], {}
+    for clause, (name, value) in conditions.items():
+        if value is not None:
+            clauses.append(clause)
+            params[name] = value
+    return "\n".join(clauses), params
+
+
+def group_rows(result):
+    """
+    Groups streamed rows by activity ID.
+
+    Args:
+        result (Result): Rows whose first column is the activity ID.
+
+    Returns:
+        dict: Rows as dicts without activity_id, keyed by activity ID.
+    """
+    columns = list(result.keys())[1:]
+    groups = {}
+    for activity_id, *values in result:
+        groups.setdefault(activity_id, []).append(dict(zip(columns, values)))
+    return groups
+
+
+def stream_activities(
+    engine,
+    batch_size=DEFAULT_BATCH_SIZE,
+    athlete_id=None,
+    team_id=None,
+    start_date=None,
+    end_date=None,
+    after_id=0,
+    feature_store=None,
+):
+    """
+    Streams activities with their laps and peaks in fixed-size batches.
+
+    Activities are paginated by keyset on their ID, and the laps and peaks of
+    a batch are read through server-side cursors, so memory only depends on
+    batch_size however large the backfill is. Activities without laps are
+    skipped, as extract_data does. Every batch holds one batch class "db"
+    slot of the shared scheduler while it is read.
+
+    Args:
+        engine (Engine): Engine of the source database.
+        batch_size (int, optional): Number of activities per batch.
+        athlete_id (int, optional): Only extract activities of this athlete.
+        team_id (int, optional): Only extract activities of this team.
+        start_date (datetime, optional): First activity date to include.
+        end_date (datetime, optional): Last activity date to include.
+        after_id (int, optional): Resume after this activity ID.
+        feature_store (Engine, optional): Feature store where the lap features
+            of every batch are ingested, see get_feature_store.
+
+    Yields:
+        list: Activities with activity_id, athlete_id, activity_date, and
+        activity_details and activity_peaks in the shape of extract_data,
+        plus lap_features with a feature store.
+    """
+    filters, params = backfill_filters(athlete_id, team_id, start_date, end_date)
+    activities_query = text(BACKFILL_ACTIVITIES_QUERY.format(filters=filters))
+    laps_query = text(BACKFILL_LAPS_QUERY.format(filters=filters))
+    peaks_query = text(BACKFILL_PEAKS_QUERY.format(filters=filters))
+
+    use_shared_slots()
+    while True:
+        with slot("db", "batch"), engine.connect() as connection:
+            streaming = connection.execution_options(
+                stream_results=True, yield_per=STREAM_BUFFER_ROWS
+            )
+            activities = (
+                connection.execute(
+                    activities_query,
+                    {**params, "after_id": after_id, "batch_size": batch_size},
+                )
+                .mappings()
+                .all()
+            )
+            if not activities:
+                return
+            bounds = {
+                **params,
+                "first_id": activities[0]["activity_id"],
+                "last_id": activities[-1]["activity_id"],
+            }
+            laps = group_rows(streaming.execute(laps_query, bounds))
+            peaks = group_rows(streaming.execute(peaks_query, bounds))
+
+        batch = []
+        for activity in activities:
+            intervals = laps.get(activity["activity_id"])
+            if not intervals:
+                continue
+            details = {
+                key: value for key, value in activity.items() if key not in ROW_KEYS
+            }
+            details["intervals"] = json.dumps(intervals, default=float)
+            batch.append(
+                {
+                    **{key: activity[key] for key in ROW_KEYS},
+                    "activity_details": [details],
+                    "activity_peaks": peaks.get(activity["activity_id"], []),
+                }
+            )
+        if batch and feature_store is not None:
+            features = ingest_batch_features(
+                feature_store,
+                {
+                    activity["activity_id"]: laps[activity["activity_id"]]
+                    for activity in batch
+                },
+            )
+            for activity in batch:
+                activity["lap_features"] = features[activity["activity_id"]]
+        if batch:
+            yield batch
+
+        after_id = activities[-1]["activity_id"]
+        if len(activities) < batch_size:
+            return
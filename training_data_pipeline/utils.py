@@ -1,6 +1,18 @@
 from collections.abc import Iterable
+from functools import lru_cache
 from typing import Any, Callable
 
+# Durations of the power record profile, in seconds
+RECORD_DURATIONS = [
+    1, 2, 3, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240, 300, 360, 420, 480,
+    540, 600, 720, 900, 1200, 1500, 1800, 2400, 2700, 3600, 5400, 7200, 10800,
+    14400, 18000, 21600,
+]  # fmt: skip
+DURATION_CACHE_SIZE = 4096
+# Iterable, but never expanded: their items are themselves strings
+LEAF_TYPES = (str, bytes)
+RECORD_TABLE_STATS = {"hits": 0, "misses": 0}
+
 
 def nested_enumerate(
     nested_iterable: Iterable,
@@ -8,13 +20,22 @@ def nested_enumerate(
     key: Callable[[Any], Any | Iterable] | None = None,
     nested_index: tuple[int, ...] = (),
 ):
-    for i, el in enumerate(nested_iterable, start=start):
-        yield (nested_index + (i,), el)
-        nested_iterable = el if key is None else key(el)
-        if isinstance(nested_iterable, Iterable):
-            yield from nested_enumerate(
-                nested_iterable, start, key, nested_index + (i,)
-            )
+    # Depth-first with an explicit stack of (enumerator, parent index) frames
+    stack = [(enumerate(nested_iterable, start=start), nested_index)]
+    while stack:
+        enumerator, parent_index = stack[-1]
+        for i, el in enumerator:
+            yield (parent_index + (i,), el)
+            nested_iterable = el if key is None else key(el)
+            if isinstance(nested_iterable, Iterable) and not isinstance(
+                nested_iterable, LEAF_TYPES
+            ):
+                stack.append(
+                    (enumerate(nested_iterable, start=start), parent_index + (i,))
+                )
+                break
+        else:
+            stack.pop()
 
 
 def flatten_nested_repeatable_iterable(
@@ -22,17 +43,36 @@ def flatten_nested_repeatable_iterable(
     nested_iterable_key: Callable[[Any], Iterable],
     repeatable_key: Callable[[Any], int],
 ):
-    for el in nested_repeatable_iterable:
-        nested_repeatable_iterable = nested_iterable_key(el)
-        if isinstance(nested_repeatable_iterable, Iterable):
-            for _ in range(repeatable_key(el)):
-                yield from flatten_nested_repeatable_iterable(
-                    nested_repeatable_iterable, nested_iterable_key, repeatable_key
-                )
+    # Depth-first with an explicit stack of [iterable, iterator, remaining repeats]
+    stack = [[None, iter(nested_repeatable_iterable), 1]]
+    while stack:
+        frame = stack[-1]
+        for el in frame[1]:
+            nested_repeatable_iterable = nested_iterable_key(el)
+            if isinstance(nested_repeatable_iterable, Iterable) and not isinstance(
+                nested_repeatable_iterable, LEAF_TYPES
+            ):
+                repeats = repeatable_key(el)
+                if repeats > 0:
+                    stack.append(
+                        [
+                            nested_repeatable_iterable,
+                            iter(nested_repeatable_iterable),
+                            repeats,
+                        ]
+                    )
+                    break
+            else:
+                yield el
         else:
-            yield el
+            frame[2] -= 1
+            if frame[2] > 0:
+                frame[1] = iter(frame[0])
+            else:
+                stack.pop()
 
 
+@lru_cache(maxsize=DURATION_CACHE_SIZE)
 def format_duration(duration):
     """
     Formats the duration into a more readable string format.
@@ -62,6 +102,7 @@ def format_duration(duration):
     return f"{hours}h {minutes}m"
 
 
+@lru_cache(maxsize=DURATION_CACHE_SIZE)
 def time_to_seconds(time_str):
     """
     Converts time from "HH:MM:SS" format to seconds.
@@ -74,3 +115,84 @@ def time_to_seconds(time_str):
     """
     h, m, s = map(int, time_str.split(":"))
     return h * 3600 + m * 60 + s
+
+
+def compute_record_duration(seconds):
+    """
+    Formats a record duration in seconds, e.g. 5s, 1.5m or 2h.
+
+    Args:
+        seconds (float): Duration in seconds.
+
+    Returns:
+        str: Formatted duration.
+    """
+    if seconds < 60:
+        return f"{int(seconds)}s"
+    elif seconds < 3600:
+        minutes = seconds / 60
+        if minutes.is_integer():
+            return f"{int(minutes)}m"
+        else:
+            return f"{minutes:.1f}m"
+    else:
+        hours = seconds / 3600
+        if hours.is_integer():
+            return f"{int(hours)}h"
+        else:
+            return f"{hours:.1f}h"
+
+
+RECORD_DURATION_LABELS = {
+    duration: compute_record_duration(duration) for duration in RECORD_DURATIONS
+}
+
+cached_record_duration = lru_cache(maxsize=DURATION_CACHE_SIZE)(compute_record_duration)
+
+
+def format_record_duration(seconds):
+    """
+    Formats a record duration from the precomputed table, or the LRU cache
+    for durations outside of the record profile.
+
+    Args:
+        seconds (float): Duration in seconds.
+
+    Returns:
+        str: Formatted duration.
+    """
+    label = RECORD_DURATION_LABELS.get(seconds)
+    if label is None:
+        RECORD_TABLE_STATS["misses"] += 1
+        return cached_record_duration(seconds)
+    RECORD_TABLE_STATS["hits"] += 1
+    return label
+
+
+def hit_rate(hits, misses):
+    return hits / (hits + misses) if hits + misses else None
+
+
+def duration_cache_stats():
+    """
+    Reports the hits, misses and hit rate of the duration formatting caches.
+
+    Returns:
+        dict: Statistics per cache.
+    """
+    stats = {"record_table": dict(RECORD_TABLE_STATS)}
+    for name, cached in [
+        ("record_lru", cached_record_duration),
+        ("format_duration", format_duration),
+        ("time_to_seconds", time_to_seconds),
+    ]:
+        info = cached.cache_info()
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "max_size": info.maxsize,
+        }
+    for cache_stats in stats.values():
+        cache_stats["hit_rate"] = hit_rate(cache_stats["hits"], cache_stats["misses"])
+    return stats
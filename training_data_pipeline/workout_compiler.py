@@ -0,0 +1,227 @@
+import json
+import math
+from functools import lru_cache
+
+import numpy as np
+
+# Define constants
+STEP = 0
+BEGIN_REPEAT = 1
+END_REPEAT = 2
+COMPILED_CACHE_SIZE = 256
+
+
+def block_ends(program):
+    """
+    Matches every BEGIN_REPEAT instruction with its END_REPEAT.
+
+    Args:
+        program (ndarray): Instructions as (opcode, argument) rows.
+
+    Returns:
+        dict: Position of the END_REPEAT keyed by position of the BEGIN_REPEAT.
+    """
+    ends = {}
+    stack = []
+    for pc, opcode in enumerate(program[:, 0]):
+        if opcode == BEGIN_REPEAT:
+            stack.append(pc)
+        elif opcode == END_REPEAT:
+            ends[stack.pop()] = pc
+    return ends
+
+
+class CompiledWorkout:
+    """
+    Flat, array-backed form of a structured workout.
+
+    Leaf steps are stored once in a step table, with the product of their
+    enclosing repeat counts as multiplier. The expanded order of the steps
+    and a per-second step table are precomputed so that the step at a given
+    time is a single array lookup.
+    """
+
+    def __init__(
+        self, durations, target_low, target_high, multipliers, program, sequence
+    ):
+        self.durations = durations
+        self.target_low = target_low
+        self.target_high = target_high
+        self.multipliers = multipliers
+        # Instructions as (opcode, argument) rows; see iter_steps
+        self.program = program
+        self.block_ends = block_ends(program)
+        self.sequence = sequence
+        sequence_durations = durations[sequence]
+        self.starts = np.concatenate(([0], np.cumsum(sequence_durations)[:-1]))
+        self.total_duration_s = int(sequence_durations.sum())
+        self.second_steps = np.repeat(sequence, sequence_durations)
+
+    def __len__(self):
+        return len(self.sequence)
+
+    def step_at(self, second):
+        """
+        Returns the step table index of the step running at a given second.
+
+        Args:
+            second (int): Seconds since the start of the workout.
+
+        Returns:
+            int: Index of the step, or None past the end of the workout.
+        """
+        if not 0 <= second < self.total_duration_s:
+            return None
+        return int(self.second_steps[int(second)])
+
+    def iter_steps(self):
+        """
+        Iterates the expanded steps by running the program with an explicit
+        stack of repeat counters, without materializing the expansion.
+
+        Yields:
+            int: Index of every step in the step table, in workout order.
+        """
+        stack = []
+        pc = 0
+        opcodes, arguments = self.program[:, 0], self.program[:, 1]
+        while pc < len(opcodes):
+            opcode = opcodes[pc]
+            if opcode == STEP:
+                yield int(arguments[pc])
+            elif opcode == BEGIN_REPEAT:
+                if arguments[pc] == 0:
+                    pc = self.block_ends[pc]
+                else:
+                    stack.append([pc, int(arguments[pc])])
+            else:
+                frame = stack[-1]
+                frame[1] -= 1
+                if frame[1]:
+                    pc = frame[0]
+                else:
+                    stack.pop()
+            pc += 1
+
+    def steps(self):
+        """
+        Lists the expanded steps.
+
+        Returns:
+            list: Start, duration and target range of every step.
+        """
+        return [
+            {
+                "start_s": int(start),
+                "duration_s": int(self.durations[i]),
+                "target_low": float(self.target_low[i]),
+                "target_high": float(self.target_high[i]),
+            }
+            for start, i in zip(self.starts, self.sequence)
+        ]
+
+
+def expanded_size(structure, steps_key="steps", repeat_key="repeat"):
+    """
+    Computes the size of the expansion of a nested workout structure, without
+    expanding it, so that oversized structures can be rejected before compiling.
+
+    Args:
+        structure (list): Nested workout items, as accepted by compile_workout.
+        steps_key (str, optional): Key of the items of a repeat block.
+        repeat_key (str, optional): Key of the repeat count of a block.
+
+    Returns:
+        tuple: Number of expanded steps, and total duration in seconds.
+    """
+    n_steps = 0
+    total_duration_s = 0
+    # Every frame: item iterator, product of the enclosing repeat counts
+    stack = [(iter(structure), 1)]
+    end = object()
+    while stack:
+        items, multiplier = stack[-1]
+        item = next(items, end)
+        if item is end:
+            stack.pop()
+        elif steps_key in item:
+            count = int(item.get(repeat_key, 1))
+            stack.append((iter(item[steps_key]), multiplier * count))
+        else:
+            n_steps += multiplier
+            total_duration_s += multiplier * int(round(item["duration_s"]))
+    return n_steps, total_duration_s
+
+
+def compile_workout(structure, steps_key="steps", repeat_key="repeat"):
+    """
+    Compiles a nested workout structure into a CompiledWorkout.
+
+    A structure is a list of items; a step is {"duration_s": 30, "target": 400}
+    or {"duration_s": 30, "target": [380, 420]}, and a repeat block is
+    {"repeat": 40, "steps": [...]}. Blocks are parsed with an explicit stack
+    and expanded by tiling index arrays, so depth and repeat counts are not
+    limited by recursion.
+
+    Args:
+        structure (list): Nested workout items.
+        steps_key (str, optional): Key of the items of a repeat block.
+        repeat_key (str, optional): Key of the repeat count of a block.
+
+    Returns:
+        CompiledWorkout: The compiled workout.
+    """
+    durations, target_low, target_high, multipliers = [], [], [], []
+    program = []
+    # Every frame: item iterator, repeat count, expanded parts of the block
+    stack = [[iter(structure), 1, []]]
+    end = object()
+    while stack:
+        frame = stack[-1]
+        item = next(frame[0], end)
+        if item is end:
+            stack.pop()
+            body = np.concatenate(frame[2]) if frame[2] else np.empty(0, np.int64)
+            if not stack:
+                sequence = body
+                break
+            program.append((END_REPEAT, 0))
+            stack[-1][2].append(np.tile(body, frame[1]))
+        elif steps_key in item:
+            count = int(item.get(repeat_key, 1))
+            program.append((BEGIN_REPEAT, count))
+            stack.append([iter(item[steps_key]), count, []])
+        else:
+            target = item.get("target")
+            low, high = (
+                target if isinstance(target, (list, tuple)) else (target, target)
+            )
+            program.append((STEP, len(durations)))
+            frame[2].append(np.array([len(durations)]))
+            durations.append(int(round(item["duration_s"])))
+            target_low.append(np.nan if low is None else low)
+            target_high.append(np.nan if high is None else high)
+            multipliers.append(math.prod(f[1] for f in stack))
+
+    return CompiledWorkout(
+        np.array(durations, dtype=np.int64),
+        np.array(target_low, dtype=np.float64),
+        np.array(target_high, dtype=np.float64),
+        np.array(multipliers, dtype=np.int64),
+        np.array(program, dtype=np.int64).reshape(-1, 2),
+        sequence,
+    )
+
+
+@lru_cache(maxsize=COMPILED_CACHE_SIZE)
+def compile_generated_structure(generated_structure):
+    """
+    Parses and compiles a GeneratedSessionStructure.generated_structure once.
+
+    Args:
+        generated_structure (str): Workout structure as JSON.
+
+    Returns:
+        CompiledWorkout: The cached compiled workout.
+    """
+    return compile_workout(json.loads(generated_structure))